@@ -0,0 +1,136 @@
+import airsim
+import threading
+import time
+
+from airsim_connection import ConnectionManager
+from capture_pacing import CapturePacer
+from frame_decode import (
+    DecodePipeline, TransferModeSelector, TRANSFER_AUTO, TRANSFER_MODES, TRANSFER_PNG, TRANSFER_RAW,
+)
+from frame_ring import FrameRing
+from pipeline_latency import FRAME_META_DTYPE
+
+# AirSim Camera Handler Class
+class AirSimCameraHandler:
+    def __init__(self, num_slots=8, target_fps=30, idle_fps=1, idle_after=5.0,
+                 transfer_mode=TRANSFER_RAW, decode_workers=2, connection=None):
+        if transfer_mode not in TRANSFER_MODES:
+            raise ValueError(f"transfer_mode must be one of {TRANSFER_MODES}")
+        self.frame_ring = FrameRing(max(num_slots, decode_workers + 2), meta_dtype=FRAME_META_DTYPE)
+        self.pacer = CapturePacer(target_fps, idle_fps, idle_after)
+        self.transfer_mode = transfer_mode
+        self.decode_workers = decode_workers
+        self.mode_selector = TransferModeSelector(decode_workers)
+        self.decoder = None
+        self.connection = connection or ConnectionManager()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def connect_airsim(self):
+        """Establish connection to AirSim"""
+        if self.connection.connect():
+            print("AirSim Connected Successfully")
+            return True
+        return False
+
+    def capture_frames(self):
+        """Thread function to capture frames"""
+        while not self.stop_event.is_set():
+            # Pick raw or PNG transfer for this frame
+            if self.transfer_mode == TRANSFER_AUTO:
+                mode = self.mode_selector.next_mode()
+            else:
+                mode = self.transfer_mode
+
+            # Capture frame from AirSim; a failed call reconnects and the stream carries on
+            rpc_start = time.time()
+            try:
+                responses = self.connection.call('simGetImages', [airsim.ImageRequest(
+                    '0', airsim.ImageType.Scene, False, mode == TRANSFER_PNG
+                )])
+            except Exception as e:
+                print(f"Frame Capture Error: {e}")
+                self.connection.backoff(self.stop_event)
+                continue
+            rpc_end = time.time()
+            self.mode_selector.record_rpc(mode, rpc_end - rpc_start)
+
+            # AirSim answers with empty 0x0 images while the camera warms up
+            if responses and responses[0].width and responses[0].height:
+                # Decoding and colour conversion happen on the worker pool
+                try:
+                    self.decoder.submit(responses[0], rpc_start, rpc_end)
+                except Exception as e:
+                    print(f"Frame Decode Error: {e}")
+
+            if self.transfer_mode == TRANSFER_AUTO:
+                self.mode_selector.update()
+
+            # Sleep only what is left of the frame period; slower when nobody reads
+            self.pacer.wait(self.stop_event)
+
+    def start_capture(self):
+        """Start the camera capture thread"""
+        # If thread is already running, don't start again; it reconnects on its own
+        if self.thread and self.thread.is_alive():
+            return True
+
+        # Ensure AirSim connection is established
+        if not self.connect_airsim():
+            return False
+
+        # Clear any existing stop event
+        self.stop_event.clear()
+
+        if self.decoder is None:
+            self.decoder = DecodePipeline(
+                self.frame_ring, self.decode_workers, on_decoded=self._record_decode
+            )
+
+        # Create and start the thread
+        self.thread = threading.Thread(target=self.capture_frames)
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+
+    def stop_capture(self):
+        """Stop the camera capture thread"""
+        if self.thread:
+            self.stop_event.set()
+            self.pacer.wake()
+            self.thread.join()
+            self.thread = None
+        if self.decoder:
+            self.decoder.shutdown()
+            self.decoder = None
+
+    def _record_decode(self, response, seconds):
+        """Feed decode timings back into the transfer mode selector"""
+        self.mode_selector.record_decode(TRANSFER_PNG if response.compress else TRANSFER_RAW, seconds)
+
+    def mark_read(self):
+        """Keep capture at the active rate for a viewer that reads frames indirectly"""
+        self.pacer.mark_read()
+
+    def get_latest_frame(self):
+        """Get a read-only view of the latest frame without consuming it"""
+        self.pacer.mark_read()
+        return self.frame_ring.read_latest()[1]
+
+    def read_latest(self):
+        """Get (seq, read-only frame) so a consumer can tell new frames from repeats"""
+        self.pacer.mark_read()
+        return self.frame_ring.read_latest()
+
+    def read_meta(self, seq):
+        """Pipeline timestamps of a frame (None once its slot is reused)"""
+        return self.frame_ring.read_meta(seq)
+
+    def wait_for_frame(self, after_seq=-1, timeout=None):
+        """Block until a frame newer than after_seq is captured"""
+        self.pacer.mark_read()
+        return self.frame_ring.wait_for_frame(after_seq, timeout)
+
+    def request_burst(self, duration=2.0):
+        """Capture at full simulator rate for a while (e.g. while a detector is tracking)"""
+        self.pacer.request_burst(duration)
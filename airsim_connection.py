@@ -0,0 +1,80 @@
+import airsim
+import random
+import threading
+import time
+
+
+# Hands out one AirSim RPC client per thread and reconnects with backoff on failure
+class ConnectionManager:
+    def __init__(self, ip='', port=41451, timeout=5.0, min_backoff=0.5, max_backoff=10.0):
+        self.ip = ip
+        self.port = port
+        # Per-call RPC timeout, so a stalled simulator raises instead of hanging the thread
+        self.timeout = timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.last_error = None
+        self.last_success = None
+
+    def client(self):
+        """Return the calling thread's client, connecting on first use"""
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = airsim.MultirotorClient(ip=self.ip, port=self.port, timeout_value=self.timeout)
+            client.confirmConnection()
+            self.local.client = client
+            with self.lock:
+                self.last_success = time.monotonic()
+        return client
+
+    def connect(self):
+        """Connect the calling thread; returns False instead of raising"""
+        try:
+            self.client()
+            return True
+        except Exception as e:
+            print(f"AirSim Connection Error: {e}")
+            self.reset()
+            return False
+
+    def reset(self):
+        """Drop the calling thread's client; the next call reconnects"""
+        client = getattr(self.local, 'client', None)
+        self.local.client = None
+        if client is not None:
+            try:
+                client.client.close()
+            except Exception:
+                pass
+
+    def call(self, method, *args, **kwargs):
+        """Run one RPC on this thread's client; a failed call drops the client and re-raises"""
+        try:
+            result = getattr(self.client(), method)(*args, **kwargs)
+        except Exception as e:
+            with self.lock:
+                self.last_error = e
+            self.local.failures = getattr(self.local, 'failures', 0) + 1
+            self.reset()
+            raise
+        self.local.failures = 0
+        with self.lock:
+            self.last_success = time.monotonic()
+        return result
+
+    def backoff(self, stop_event=None):
+        """Sleep with exponential backoff and jitter after this thread's latest failure"""
+        failures = max(getattr(self.local, 'failures', 0), 1)
+        delay = min(self.max_backoff, self.min_backoff * (2 ** (failures - 1)))
+        delay *= random.uniform(0.5, 1.0)
+        if stop_event is not None:
+            stop_event.wait(delay)
+        else:
+            time.sleep(delay)
+
+    def is_healthy(self, max_age=5.0):
+        """True if some thread completed an RPC within the last max_age seconds"""
+        with self.lock:
+            return self.last_success is not None and time.monotonic() - self.last_success < max_age
@@ -0,0 +1,385 @@
+"""Local AirSim stand-in: a msgpack-RPC server that answers the calls the dashboards make.
+
+Run it instead of Unreal to benchmark or test the pipeline on a plain Linux box:
+
+    python airsim_standin.py --vehicles 5 --width 1280 --height 720 --fps 30 --latency 0.005
+
+Every entry point connects to 127.0.0.1:41451 by default, so nothing else needs changing.
+"""
+import argparse
+import asyncio
+import math
+import random
+import threading
+import time
+import msgpack
+import numpy as np
+import cv2
+
+SERVER_VERSION = 1
+MIN_CLIENT_VERSION = 1
+
+# ImageType values that AirSim returns as float32 depth data
+FLOAT_IMAGE_TYPES = {1, 2, 3, 4}
+
+# Landed states as reported by getMultirotorState
+LANDED = 0
+FLYING = 1
+
+EARTH_RADIUS = 6378137.0
+
+# Survey-style camera: pitched straight down, 90 degree horizontal FOV
+CAMERA_PITCH = -90.0
+CAMERA_FOV = 90.0
+
+
+def _vector(x=0.0, y=0.0, z=0.0):
+    return {'x_val': float(x), 'y_val': float(y), 'z_val': float(z)}
+
+
+def _quaternion(w=1.0, x=0.0, y=0.0, z=0.0):
+    return {'w_val': float(w), 'x_val': float(x), 'y_val': float(y), 'z_val': float(z)}
+
+
+# One simulated multirotor: kinematics integrated lazily on every query
+class StandinVehicle:
+    def __init__(self, name, index, home=(28.6139, 77.2090, 200.0)):
+        self.name = name
+        self.index = index
+        self.home = home
+        # Spread vehicles out so their GPS fixes differ
+        self.position = np.array([index * 20.0, 0.0, 0.0])
+        self.velocity = np.zeros(3)
+        self.velocity_until = 0.0
+        self.landed_state = LANDED
+        self.armed = False
+        self.api_control = False
+        self.updated = time.monotonic()
+
+    def update(self):
+        now = time.monotonic()
+        moving_for = max(0.0, min(now, self.velocity_until) - self.updated)
+        self.position += self.velocity * moving_for
+        if now >= self.velocity_until:
+            self.velocity[:] = 0.0
+        self.updated = now
+
+    def geo_point(self):
+        """NED position converted to lat/lon/alt around the home point"""
+        lat0, lon0, alt0 = self.home
+        north, east, down = self.position
+        lat = lat0 + math.degrees(north / EARTH_RADIUS)
+        lon = lon0 + math.degrees(east / (EARTH_RADIUS * math.cos(math.radians(lat0))))
+        return {'latitude': lat, 'longitude': lon, 'altitude': alt0 - down}
+
+    def gps_data(self):
+        self.update()
+        return {
+            'time_stamp': time.time_ns(),
+            'gnss': {
+                'geo_point': self.geo_point(),
+                'eph': 0.1,
+                'epv': 0.1,
+                'velocity': _vector(*self.velocity),
+                'fix_type': 3,
+                'time_utc': time.time_ns() // 1000,
+            },
+            'is_valid': True,
+        }
+
+    def multirotor_state(self):
+        self.update()
+        return {
+            'kinematics_estimated': {
+                'position': _vector(*self.position),
+                'orientation': _quaternion(),
+                'linear_velocity': _vector(*self.velocity),
+                'angular_velocity': _vector(),
+                'linear_acceleration': _vector(),
+                'angular_acceleration': _vector(),
+            },
+            'gps_location': self.geo_point(),
+            'timestamp': time.time_ns(),
+            'landed_state': self.landed_state,
+            'ready': True,
+            'ready_message': '',
+            'can_arm': True,
+        }
+
+
+# Renders synthetic camera frames; each (vehicle, camera, type, format, frame) is built once
+class StandinRenderer:
+    def __init__(self, width, height, fps):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.cache = {}
+        # A gradient plus a grid of "people" blobs; frames scroll it to fake motion
+        ys, xs = np.mgrid[0:height, 0:width]
+        base = np.zeros((height, width * 2, 3), dtype=np.uint8)
+        base[:, :width, 0] = (xs * 255 // max(width - 1, 1)).astype(np.uint8)
+        base[:, :width, 1] = (ys * 255 // max(height - 1, 1)).astype(np.uint8)
+        base[:, :width, 2] = 96
+        for cy in range(height // 8, height, height // 4 or 1):
+            for cx in range(width // 8, width, width // 4 or 1):
+                cv2.circle(base[:, :width], (cx, cy), max(2, height // 60), (40, 40, 200), -1)
+        base[:, width:] = base[:, :width]
+        self.base = base
+
+    def frame_index(self):
+        return int(time.monotonic() * self.fps)
+
+    def raw(self, vehicle_index, frame_index):
+        """BGR frame for a vehicle at a frame index"""
+        key = ('raw', vehicle_index, frame_index)
+        frame = self.cache.get(key)
+        if frame is None:
+            offset = (frame_index * 4 + vehicle_index * 37) % self.width
+            frame = np.ascontiguousarray(self.base[:, offset:offset + self.width])
+            self._store(key, frame)
+        return frame
+
+    def encoded(self, vehicle_index, frame_index, ext='.png'):
+        key = (ext, vehicle_index, frame_index)
+        data = self.cache.get(key)
+        if data is None:
+            data = cv2.imencode(ext, self.raw(vehicle_index, frame_index))[1].tobytes()
+            self._store(key, data)
+        return data
+
+    def depth(self, vehicle_index, frame_index):
+        key = ('depth', vehicle_index, frame_index)
+        data = self.cache.get(key)
+        if data is None:
+            ramp = np.linspace(5.0, 100.0, self.height, dtype=np.float32)
+            data = np.repeat(ramp, self.width).tolist()
+            self._store(key, data)
+        return data
+
+    def _store(self, key, value):
+        # Only the current frames are worth keeping
+        if len(self.cache) > 256:
+            self.cache.clear()
+        self.cache[key] = value
+
+
+# msgpack-RPC server implementing the AirSim calls used by this repo
+class AirSimStandin:
+    def __init__(self, host='127.0.0.1', port=41451, vehicles=('Drone-1',), width=640,
+                 height=360, fps=30, latency=0.0, jitter=0.0):
+        self.host = host
+        self.port = port
+        self.vehicles = {name: StandinVehicle(name, i) for i, name in enumerate(vehicles)}
+        self.default_vehicle = next(iter(self.vehicles.values()))
+        self.renderer = StandinRenderer(width, height, fps)
+        self.latency = latency
+        self.jitter = jitter
+        self.server = None
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.calls = 0
+
+    def vehicle(self, name):
+        return self.vehicles.get(name) or self.default_vehicle
+
+    # --- RPC handlers (names match the AirSim server) ---------------------------------
+
+    def ping(self):
+        return True
+
+    def getServerVersion(self):
+        return SERVER_VERSION
+
+    def getMinRequiredClientVersion(self):
+        return MIN_CLIENT_VERSION
+
+    def enableApiControl(self, is_enabled, vehicle_name=''):
+        self.vehicle(vehicle_name).api_control = bool(is_enabled)
+
+    def isApiControlEnabled(self, vehicle_name=''):
+        return self.vehicle(vehicle_name).api_control
+
+    def armDisarm(self, arm, vehicle_name=''):
+        self.vehicle(vehicle_name).armed = bool(arm)
+        return True
+
+    def reset(self):
+        for vehicle in self.vehicles.values():
+            vehicle.position[:] = (vehicle.index * 20.0, 0.0, 0.0)
+            vehicle.velocity[:] = 0.0
+            vehicle.landed_state = LANDED
+
+    def simGetImages(self, requests, vehicle_name='', external=False):
+        vehicle = self.vehicle(vehicle_name)
+        frame_index = self.renderer.frame_index()
+        return [self._image_response(vehicle, request, frame_index) for request in requests]
+
+    def simGetImage(self, camera_name, image_type, vehicle_name='', external=False):
+        vehicle = self.vehicle(vehicle_name)
+        return self.renderer.encoded(vehicle.index, self.renderer.frame_index())
+
+    def getGpsData(self, gps_name='', vehicle_name=''):
+        return self.vehicle(vehicle_name).gps_data()
+
+    def getMultirotorState(self, vehicle_name=''):
+        return self.vehicle(vehicle_name).multirotor_state()
+
+    def simGetCameraInfo(self, camera_name, vehicle_name='', external=False):
+        vehicle = self.vehicle(vehicle_name)
+        vehicle.update()
+        half_pitch = math.radians(CAMERA_PITCH) / 2
+        return {
+            'pose': {
+                'position': _vector(*vehicle.position),
+                'orientation': _quaternion(math.cos(half_pitch), 0.0, math.sin(half_pitch), 0.0),
+            },
+            'fov': CAMERA_FOV,
+            'proj_mat': {'matrix': np.eye(4).tolist()},
+        }
+
+    async def takeoff(self, timeout_sec=20, vehicle_name=''):
+        vehicle = self.vehicle(vehicle_name)
+        vehicle.update()
+        vehicle.velocity[:] = (0.0, 0.0, -3.0)
+        vehicle.velocity_until = time.monotonic() + 1.0
+        await asyncio.sleep(1.0)
+        vehicle.landed_state = FLYING
+        return True
+
+    async def land(self, timeout_sec=60, vehicle_name=''):
+        vehicle = self.vehicle(vehicle_name)
+        vehicle.update()
+        descent = max(0.0, -vehicle.position[2])
+        duration = min(descent / 3.0, 5.0)
+        vehicle.velocity[:] = (0.0, 0.0, 3.0)
+        vehicle.velocity_until = time.monotonic() + duration
+        await asyncio.sleep(duration)
+        vehicle.position[2] = 0.0
+        vehicle.landed_state = LANDED
+        return True
+
+    async def moveByVelocity(self, vx, vy, vz, duration, drivetrain=0, yaw_mode=None, vehicle_name=''):
+        vehicle = self.vehicle(vehicle_name)
+        vehicle.update()
+        vehicle.velocity[:] = (vx, vy, vz)
+        vehicle.velocity_until = time.monotonic() + duration
+        await asyncio.sleep(duration)
+        return True
+
+    def _image_response(self, vehicle, request, frame_index):
+        image_type = request.get('image_type', 0)
+        response = {
+            'image_data_uint8': b'',
+            'image_data_float': [],
+            'camera_position': _vector(*vehicle.position),
+            'camera_orientation': _quaternion(),
+            'time_stamp': time.time_ns(),
+            'message': '',
+            'pixels_as_float': False,
+            'compress': False,
+            'width': self.renderer.width,
+            'height': self.renderer.height,
+            'image_type': image_type,
+        }
+        if request.get('pixels_as_float') or image_type in FLOAT_IMAGE_TYPES:
+            response['pixels_as_float'] = True
+            response['image_data_float'] = self.renderer.depth(vehicle.index, frame_index)
+        elif request.get('compress'):
+            response['compress'] = True
+            response['image_data_uint8'] = self.renderer.encoded(vehicle.index, frame_index)
+        else:
+            response['image_data_uint8'] = self.renderer.raw(vehicle.index, frame_index).tobytes()
+        return response
+
+    # --- Transport --------------------------------------------------------------------
+
+    async def _dispatch(self, writer, msgid, method, params):
+        """Answer one request; slow calls (takeoff, moves) don't block the connection"""
+        self.calls += 1
+        error, result = None, None
+        handler = getattr(self, method, None) if not method.startswith('_') else None
+        try:
+            if self.latency or self.jitter:
+                await asyncio.sleep(self.latency + random.uniform(0.0, self.jitter))
+            if handler is None:
+                raise AttributeError(f"rpc method '{method}' not found")
+            result = handler(*params)
+            if asyncio.iscoroutine(result):
+                result = await result
+        except Exception as e:
+            error = str(e)
+        if not writer.is_closing():
+            writer.write(msgpack.packb([1, msgid, error, result], use_bin_type=True))
+
+    async def _handle(self, reader, writer):
+        unpacker = msgpack.Unpacker(raw=False)
+        try:
+            while True:
+                data = await reader.read(1 << 16)
+                if not data:
+                    break
+                unpacker.feed(data)
+                for message in unpacker:
+                    if message[0] == 0:
+                        _, msgid, method, params = message
+                        asyncio.ensure_future(self._dispatch(writer, msgid, method, params))
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        """Serve until cancelled"""
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Port 0 picks a free port; report the real one
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.ready.set()
+        async with self.server:
+            try:
+                await self.server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    def start(self):
+        """Serve from a background thread; returns once the port is listening"""
+        self.thread = threading.Thread(target=asyncio.run, args=(self.serve(),))
+        self.thread.daemon = True
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def stop(self):
+        if self.loop and self.server:
+            self.loop.call_soon_threadsafe(self.server.close)
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local AirSim stand-in server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=41451)
+    parser.add_argument('--vehicles', type=int, default=5, help="number of drones (Drone-1..Drone-N)")
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=360)
+    parser.add_argument('--fps', type=float, default=30, help="how often the rendered frame changes")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every call")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random latency, seconds")
+    args = parser.parse_args()
+
+    names = [f"Drone-{i + 1}" for i in range(args.vehicles)]
+    standin = AirSimStandin(args.host, args.port, names, args.width, args.height,
+                            args.fps, args.latency, args.jitter)
+    print(f"AirSim stand-in on {args.host}:{args.port} with {', '.join(names)} "
+          f"at {args.width}x{args.height}, {args.fps} FPS")
+    try:
+        asyncio.run(standin.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
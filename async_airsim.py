@@ -0,0 +1,146 @@
+import airsim
+import asyncio
+import itertools
+import msgpack
+import random
+
+
+def _to_msgpack(obj):
+    """msgpack default hook for AirSim request types (ImageRequest, Vector3r, ...)"""
+    if hasattr(obj, 'to_msgpack'):
+        return obj.to_msgpack()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+# Minimal asyncio msgpack-rpc client speaking the AirSim protocol
+class AsyncAirSimClient:
+    def __init__(self, ip='127.0.0.1', port=41451, timeout=5.0):
+        self.ip = ip or '127.0.0.1'
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.read_task = None
+        self.pending = {}
+        self.msgids = itertools.count()
+
+    async def connect(self):
+        """Open the TCP connection and start the response reader"""
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.ip, self.port), self.timeout
+        )
+        self.read_task = asyncio.create_task(self._read_responses())
+
+    async def close(self):
+        """Close the connection and fail every outstanding call"""
+        if self.read_task:
+            self.read_task.cancel()
+            self.read_task = None
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+            self.writer = None
+        self._fail_pending(ConnectionError("AirSim connection closed"))
+
+    @property
+    def connected(self):
+        return self.writer is not None and not self.writer.is_closing()
+
+    def _fail_pending(self, error):
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self.pending.clear()
+
+    async def _read_responses(self):
+        """Match [1, msgid, error, result] responses to their waiting calls"""
+        unpacker = msgpack.Unpacker(raw=False)
+        try:
+            while True:
+                data = await self.reader.read(1 << 20)
+                if not data:
+                    raise ConnectionError("AirSim closed the connection")
+                unpacker.feed(data)
+                for _, msgid, error, result in unpacker:
+                    future = self.pending.pop(msgid, None)
+                    if future is None or future.done():
+                        continue
+                    if error is not None:
+                        future.set_exception(RuntimeError(f"AirSim RPC error: {error}"))
+                    else:
+                        future.set_result(result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._fail_pending(e)
+            if self.writer:
+                self.writer.close()
+
+    async def call(self, method, *args):
+        """Send one request; many calls may be in flight on the same connection"""
+        if not self.connected:
+            raise ConnectionError("AirSim client is not connected")
+        msgid = next(self.msgids) & 0xFFFFFFFF
+        future = asyncio.get_running_loop().create_future()
+        self.pending[msgid] = future
+        self.writer.write(msgpack.packb([0, msgid, method, list(args)], default=_to_msgpack))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            self.pending.pop(msgid, None)
+
+    async def ping(self):
+        return await self.call('ping')
+
+    async def sim_get_images(self, requests, vehicle_name='', external=False):
+        responses = await self.call('simGetImages', requests, vehicle_name, external)
+        return [airsim.ImageResponse.from_msgpack(response) for response in responses]
+
+    async def get_gps_data(self, gps_name='', vehicle_name=''):
+        return airsim.GpsData.from_msgpack(await self.call('getGpsData', gps_name, vehicle_name))
+
+    async def get_multirotor_state(self, vehicle_name=''):
+        return airsim.MultirotorState.from_msgpack(await self.call('getMultirotorState', vehicle_name))
+
+
+# Small pool of async connections with reconnect and backoff
+class AsyncConnectionPool:
+    def __init__(self, ip='127.0.0.1', port=41451, size=2, timeout=5.0,
+                 min_backoff=0.5, max_backoff=10.0):
+        self.clients = [AsyncAirSimClient(ip, port, timeout) for _ in range(size)]
+        self.failures = [0] * size
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.next_index = itertools.cycle(range(size))
+        self.locks = [asyncio.Lock() for _ in range(size)]
+
+    async def call(self, method, *args):
+        """Round-robin a call over the pool, reconnecting the chosen client if needed"""
+        index = next(self.next_index)
+        client = self.clients[index]
+        async with self.locks[index]:
+            if not client.connected:
+                if self.failures[index]:
+                    delay = min(self.max_backoff, self.min_backoff * 2 ** (self.failures[index] - 1))
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                try:
+                    await client.connect()
+                except Exception:
+                    self.failures[index] += 1
+                    raise
+        try:
+            result = await getattr(client, method)(*args)
+        except (asyncio.TimeoutError, ConnectionError, OSError):
+            # A stalled or broken socket poisons every call behind it; start over
+            self.failures[index] += 1
+            await client.close()
+            raise
+        self.failures[index] = 0
+        return result
+
+    async def close(self):
+        for client in self.clients:
+            await client.close()
@@ -0,0 +1,220 @@
+import airsim
+import asyncio
+import numpy as np
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from async_airsim import AsyncConnectionPool
+from capture_pacing import next_deadline
+from fleet_capture import FLOAT_IMAGE_TYPES
+from frame_decode import write_response
+from frame_ring import FrameRing
+from pipeline_latency import FRAME_META_DTYPE
+
+
+# Latest-value subscription: a slow subscriber only ever sees the newest message
+class AsyncSubscription:
+    def __init__(self, engine, topic):
+        self.engine = engine
+        self.topic = topic
+        self.queue = asyncio.Queue(maxsize=1)
+
+    def push(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.engine.unsubscribe(self)
+
+
+# Asyncio capture and telemetry engine: the whole fleet from one event loop
+class AsyncFleetEngine:
+    def __init__(self, vehicles, cameras=('0',), image_types=(airsim.ImageType.Scene,),
+                 ip='127.0.0.1', port=41451, fps=10, telemetry_fps=2, max_in_flight=16,
+                 connections=4, decode_workers=2, num_slots=8, timeout=5.0):
+        self.vehicles = list(vehicles)
+        self.stream_keys = [(camera, image_type) for camera in cameras for image_type in image_types]
+        self.requests = [
+            airsim.ImageRequest(camera, image_type, image_type in FLOAT_IMAGE_TYPES, False)
+            for camera, image_type in self.stream_keys
+        ]
+        self.ip = ip
+        self.port = port
+        self.fps = fps
+        self.telemetry_fps = telemetry_fps
+        self.max_in_flight = max_in_flight
+        self.connections = connections
+        self.timeout = timeout
+        self.decode_workers = decode_workers
+        self.decode_executor = None
+
+        # Frames land in the same FrameRings the threaded engines use
+        self.streams = {
+            (vehicle, camera, image_type): FrameRing(
+                num_slots, dtype=np.float32 if image_type in FLOAT_IMAGE_TYPES else np.uint8,
+                meta_dtype=FRAME_META_DTYPE
+            )
+            for vehicle in self.vehicles for camera, image_type in self.stream_keys
+        }
+        self.telemetry = {}
+        self.subscribers = {}
+
+        self.loop = None
+        self.pool = None
+        self.semaphore = None
+        self.tasks = []
+        self.thread = None
+        self.stopped = None
+        self.stop_requested = False
+
+    def subscribe(self, topic):
+        """Subscribe to ('frames', vehicle) or ('telemetry', vehicle); call from the engine loop"""
+        subscription = AsyncSubscription(self, topic)
+        self.subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers.get(subscription.topic, set()).discard(subscription)
+
+    def publish(self, topic, message):
+        for subscription in list(self.subscribers.get(topic, ())):
+            subscription.push(message)
+
+    async def _rpc(self, method, *args):
+        """Run one RPC under the fleet-wide concurrency limit"""
+        async with self.semaphore:
+            return await self.pool.call(method, *args)
+
+    async def _pace(self, deadline, period):
+        """Sleep to the next deadline, on the same schedule as CapturePacer"""
+        now = time.monotonic()
+        deadline = next_deadline(deadline, period, now)
+        await asyncio.sleep(max(0.0, deadline - now))
+        return deadline
+
+    async def _image_loop(self, vehicle):
+        """Fetch every camera of one vehicle in a single batched RPC per tick"""
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic()
+        # Also checks stopped: before 3.12, wait_for can swallow a cancel that lands
+        # just as its RPC completes
+        while not self.stopped.is_set():
+            rpc_start = time.time()
+            try:
+                responses = await self._rpc('sim_get_images', self.requests, vehicle)
+            except Exception as e:
+                print(f"Frame Capture Error ({vehicle}): {e}")
+                responses = []
+            rpc_end = time.time()
+
+            for (camera, image_type), response in zip(self.stream_keys, responses):
+                if response.width == 0 or response.height == 0:
+                    continue
+                ring = self.streams[(vehicle, camera, image_type)]
+                # Colour conversion releases the GIL, so it runs off the loop; a corrupt
+                # image costs that frame only, not this vehicle's task
+                try:
+                    seq = await loop.run_in_executor(
+                        self.decode_executor, write_response, ring, response, rpc_start, rpc_end
+                    )
+                except Exception as e:
+                    print(f"Frame Decode Error ({vehicle}): {e}")
+                    continue
+                self.publish(('frames', vehicle), (camera, image_type, seq, response.time_stamp))
+
+            deadline = await self._pace(deadline, 1.0 / self.fps)
+
+    async def _telemetry_loop(self, vehicle):
+        """Poll GPS and multirotor state for one vehicle"""
+        deadline = time.monotonic()
+        while not self.stopped.is_set():
+            try:
+                gps, state = await asyncio.gather(
+                    self._rpc('get_gps_data', '', vehicle),
+                    self._rpc('get_multirotor_state', vehicle),
+                )
+                self.telemetry[vehicle] = (gps, state)
+                self.publish(('telemetry', vehicle), (gps, state))
+            except Exception as e:
+                print(f"Telemetry Error ({vehicle}): {e}")
+            deadline = await self._pace(deadline, 1.0 / self.telemetry_fps)
+
+    async def run(self):
+        """Run every vehicle's image and telemetry loops until cancelled"""
+        self.loop = asyncio.get_running_loop()
+        self.semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.pool = AsyncConnectionPool(self.ip, self.port, self.connections, self.timeout)
+        self.stopped = asyncio.Event()
+        if self.stop_requested:
+            self.stopped.set()
+        self.decode_executor = ThreadPoolExecutor(self.decode_workers, thread_name_prefix='async-decode')
+        self.tasks = [asyncio.create_task(self._image_loop(v)) for v in self.vehicles]
+        if self.telemetry_fps:
+            self.tasks += [asyncio.create_task(self._telemetry_loop(v)) for v in self.vehicles]
+        try:
+            await self.stopped.wait()
+        finally:
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            await self.pool.close()
+            self.decode_executor.shutdown(wait=True)
+
+    def start(self):
+        """Run the engine on one background thread (for sync apps like Gradio)"""
+        if self.thread and self.thread.is_alive():
+            return True
+        self.stop_requested = False
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop)
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.run())
+        finally:
+            self.loop.close()
+
+    def _request_stop(self):
+        self.stop_requested = True
+        if self.stopped:
+            self.stopped.set()
+
+    def stop(self):
+        """Stop the engine and its background thread"""
+        if self.thread:
+            # The loop closes on its own if run() already ended
+            if not self.loop.is_closed():
+                self.loop.call_soon_threadsafe(self._request_stop)
+            self.thread.join()
+            self.thread = None
+
+    def stream(self, vehicle, camera='0', image_type=airsim.ImageType.Scene):
+        """Return the FrameRing for one vehicle/camera/image type"""
+        return self.streams[(vehicle, camera, image_type)]
+
+    def get_latest_frame(self, vehicle, camera='0', image_type=airsim.ImageType.Scene):
+        """Thread-safe read of the newest frame of one stream"""
+        return self.stream(vehicle, camera, image_type).read_latest()[1]
+
+    def wait_for_frame(self, vehicle, after_seq=-1, timeout=None, camera='0', image_type=airsim.ImageType.Scene):
+        """Block (from any thread but the engine's) until one stream has a newer frame"""
+        return self.stream(vehicle, camera, image_type).wait_for_frame(after_seq, timeout)
+
+    def get_telemetry(self, vehicle):
+        """Newest (gps, state) for a vehicle, or None"""
+        return self.telemetry.get(vehicle)
@@ -0,0 +1,190 @@
+import threading
+import time
+
+from detection_worker import (
+    frame_time, locate_result, make_result, model_ready, passthrough_result, reuse_result,
+    stamp_inference, track_result, unpack_boxes,
+)
+
+
+# Batches the newest frame of many drone streams into one model call and routes results back
+class BatchInferenceServer:
+    def __init__(self, model, streams, classes=(0,), max_batch=8, window=0.01,
+                 latency_budget=0.25, poll_interval=0.002, on_result=None, gates=None, trackers=None,
+                 annotate=True, geolocators=None, **predict_kwargs):
+        self.model = model
+        # stream key (e.g. (vehicle, camera, image_type)) -> FrameRing
+        self.streams = dict(streams)
+        self.classes = list(classes) if classes is not None else None
+        self.max_batch = max_batch
+        self.window = window
+        self.latency_budget = latency_budget
+        self.poll_interval = poll_interval
+        self.on_result = on_result
+        self.predict_kwargs = predict_kwargs
+        # Optional per-stream ChangeGates: unchanged frames reuse that stream's last result
+        self.gates = dict(gates or {})
+        # Optional per-stream Trackers: frames between detector refreshes are tracked only
+        self.trackers = dict(trackers or {})
+        # annotate=False skips drawing; consumers render the boxes themselves
+        self.annotate = annotate
+        # Optional per-stream Geolocators (one per vehicle camera): lat/lon per box
+        self.geolocators = dict(geolocators or {})
+
+        self.last_seqs = {key: -1 for key in self.streams}
+        # When each stream was last served, so a full batch rotates fairly
+        self.served_at = {key: 0.0 for key in self.streams}
+        self.frame_time = None
+        self.condition = threading.Condition()
+        self.results = {}
+        self.batches = 0
+        self.frames = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start the batching thread (no-op if it is already running)"""
+        if self.thread and self.thread.is_alive():
+            return True
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name='batch-inference')
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+
+    def stop(self):
+        """Stop the batching thread after the batch in progress"""
+        if self.thread:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def batch_limit(self):
+        """Largest batch whose estimated run time still fits the latency budget"""
+        if self.frame_time is None:
+            return 1
+        return max(1, min(self.max_batch, int(self.latency_budget / self.frame_time)))
+
+    def ready_streams(self):
+        """Streams holding a frame newer than the one last inferred"""
+        return [
+            key for key, ring in self.streams.items()
+            if ring.latest_seq > self.last_seqs[key]
+        ]
+
+    def collect(self):
+        """Wait for a first fresh frame, then up to `window` for other drones to catch up"""
+        ready = self.ready_streams()
+        while not ready and not self.stop_event.wait(self.poll_interval):
+            ready = self.ready_streams()
+        limit = self.batch_limit()
+        deadline = time.monotonic() + self.window
+        while len(ready) < min(limit, len(self.streams)) and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            ready = self.ready_streams()
+        # Longest-waiting streams first when there are more than fit in one batch
+        ready.sort(key=self.served_at.get)
+        return ready[:limit]
+
+    def run(self):
+        """Thread function: collect, infer as one batch, route each result to its stream"""
+        while not self.stop_event.is_set():
+            keys = self.collect()
+            batch = []
+            for key in keys:
+                ring = self.streams[key]
+                seq, frame = ring.wait_for_frame(self.last_seqs[key], timeout=self.poll_interval)
+                if frame is None:
+                    # Newest slot was rewritten (or resized) under us: count it as seen so
+                    # collect() waits for the next commit instead of spinning on this one
+                    self.last_seqs[key] = max(self.last_seqs[key], ring.latest_seq)
+                    continue
+                meta = ring.read_meta(seq)
+                # Own the pixels: capture may reuse the slot mid-inference
+                image = frame.copy()
+                if not ring.is_valid(seq):
+                    continue
+                self.last_seqs[key] = seq
+                if not model_ready(self.model):
+                    self.publish(key, passthrough_result(seq, image, meta, self.model.status(), self.annotate))
+                    continue
+                tracker = self.trackers.get(key)
+                if tracker and key in self.results and not tracker.needs_detection():
+                    self.publish(key, track_result(seq, tracker.predict(frame_time(meta)), image, meta, self.annotate))
+                    continue
+                gate = self.gates.get(key)
+                if gate and not gate.needs_inference(image) and key in self.results:
+                    if tracker:
+                        self.publish(key, track_result(seq, tracker.predict(frame_time(meta)), image, meta, self.annotate))
+                    else:
+                        self.publish(key, reuse_result(self.results[key], seq, image, meta, self.annotate))
+                    continue
+                batch.append((key, seq, image, meta))
+            if not batch:
+                continue
+            try:
+                self.infer(batch)
+            except Exception as e:
+                print(f"Batch Inference Error: {e}")
+
+    def infer(self, batch):
+        """Run the model once over a batch and publish one result per stream"""
+        inference_start = time.time()
+        results = self.model.predict(
+            [image for _, _, image, _ in batch], classes=self.classes, verbose=False, **self.predict_kwargs
+        )
+        inference_end = time.time()
+
+        # Per-frame cost drives the next batch size
+        seconds = (inference_end - inference_start) / len(batch)
+        self.frame_time = seconds if self.frame_time is None else 0.8 * self.frame_time + 0.2 * seconds
+        self.batches += 1
+        self.frames += len(batch)
+
+        for (key, seq, image, meta), result in zip(batch, results):
+            self.served_at[key] = inference_end
+            if key in self.gates:
+                self.gates[key].mark_inferred()
+            tracker = self.trackers.get(key)
+            if tracker is None:
+                self.publish(key, make_result(
+                    seq, result, meta, inference_start, inference_end, image.shape[:2], self.annotate
+                ))
+                continue
+            stamp_inference(meta, inference_start, inference_end)
+            tracks = tracker.update(*unpack_boxes(result), timestamp=frame_time(meta))
+            self.publish(key, track_result(seq, tracks, image, meta, self.annotate))
+
+    def publish(self, key, result):
+        result = locate_result(result, self.geolocators.get(key))
+        with self.condition:
+            self.results[key] = result
+            self.condition.notify_all()
+        if self.on_result:
+            # A failing consumer must not take the batching thread (or the rest of the batch) down
+            try:
+                self.on_result(key, result)
+            except Exception as e:
+                print(f"Detection Callback Error ({key}): {e}")
+
+    def latest(self, key):
+        """Newest DetectionResult for one stream, or None"""
+        return self.results.get(key)
+
+    def wait_for_result(self, key, after_seq=-1, timeout=None):
+        """Block until a result newer than after_seq is ready for one stream"""
+        with self.condition:
+            if not self.condition.wait_for(
+                lambda: key in self.results and self.results[key].seq > after_seq, timeout
+            ):
+                return None
+            return self.results[key]
+
+    def stats(self):
+        """Throughput counters: batches run, frames inferred, mean batch size"""
+        return {
+            'batches': self.batches,
+            'frames': self.frames,
+            'mean_batch': self.frames / self.batches if self.batches else 0.0,
+            'batch_limit': self.batch_limit(),
+        }
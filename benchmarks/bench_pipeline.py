@@ -0,0 +1,517 @@
+"""End-to-end camera pipeline benchmark against the local AirSim stand-in.
+
+Drives the display paths at several resolutions and viewer counts:
+
+  push      the dashboards' feed: ring -> RingBroadcaster -> PushServer /ws/video, N acking
+            WebSocket clients driven in-process through the ASGI app
+  mjpeg     web/server.py broadcaster served over HTTP, N clients reading /video_feed
+  png-poll  the gr.Image polling the dashboards used before the push feed, for comparison
+
+and the multi-drone capture engine at several fleet sizes (one reader per drone):
+
+  fleet        FleetCaptureEngine, one batched simGetImages per vehicle per tick
+  async-fleet  AsyncFleetEngine, the same requests from one asyncio loop
+
+With --batch-detector BACKEND the fleet paths also run BatchInferenceServer over every
+drone stream and report its batch sizes (needs the detector weights and ultralytics).
+
+Reports throughput, p50/p95/p99 latency, CPU and peak RSS, writes JSON results and
+exits non-zero when a case regresses past the stored baselines (benchmarks/baselines.json,
+recorded on the stand-in with the default cases, worst of three runs). With --ci (or CI set in the environment)
+a missing baselines file or a case without a baseline fails too, so the check can't pass
+by having nothing to compare:
+
+    python benchmarks/bench_pipeline.py --resolutions 640x360,1280x720 --viewers 1,4
+    python benchmarks/bench_pipeline.py --paths push,png-poll --viewers 1,16
+    python benchmarks/bench_pipeline.py --paths fleet,async-fleet --vehicles 1,5
+    python benchmarks/bench_pipeline.py --update-baselines   # record this box's numbers
+    python benchmarks/bench_pipeline.py --ci
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+
+def percentiles(samples):
+    """p50/p95/p99 in milliseconds"""
+    if not samples:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000.0, [50, 95, 99])
+    return {'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3), 'p99_ms': round(float(p99), 3)}
+
+
+def rss_mb():
+    """Current resident set size of this process in MB (Linux)"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+# Runs airsim_standin.py in its own process so its CPU isn't billed to the pipeline
+class StandinProcess:
+    def __init__(self, port, width, height, fps, latency, vehicles=1):
+        self.args = [
+            sys.executable, os.path.join(ROOT, 'airsim_standin.py'), '--port', str(port),
+            '--vehicles', str(vehicles), '--width', str(width), '--height', str(height),
+            '--fps', str(fps), '--latency', str(latency),
+        ]
+        self.port = port
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.args, stdout=subprocess.DEVNULL)
+        if not wait_for_port(self.port):
+            self.process.kill()
+            raise RuntimeError(f"AirSim stand-in did not start on port {self.port}")
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait(timeout=5)
+
+
+# Samples CPU and RSS of this process while a case runs
+class ResourceMonitor:
+    def __enter__(self):
+        self.cpu_start = cpu_seconds()
+        self.wall_start = time.monotonic()
+        self.peak_rss = rss_mb()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def _sample(self):
+        while not self.stop_event.wait(0.1):
+            self.peak_rss = max(self.peak_rss, rss_mb())
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+        wall = time.monotonic() - self.wall_start
+        self.cpu_percent = 100.0 * (cpu_seconds() - self.cpu_start) / wall if wall else 0.0
+
+
+def gradio_encoder():
+    """The encode gr.Image applies to a numpy frame (PNG), falling back to cv2 without gradio"""
+    try:
+        import gradio as gr
+        image = gr.Image(format='png')
+        return 'gradio', image.postprocess
+    except Exception:
+        import cv2
+        return 'cv2-png', lambda frame: cv2.imencode('.png', frame)[1]
+
+
+def run_poll_case(port, viewers, duration, capture_fps):
+    """N viewers polling the newest frame and PNG-encoding it, as gr.Image polling did"""
+    from airsim_camera import AirSimCameraHandler
+    from airsim_connection import ConnectionManager
+
+    encoder_name, encode = gradio_encoder()
+    handler = AirSimCameraHandler(target_fps=capture_fps, connection=ConnectionManager(port=port))
+    if not handler.start_capture():
+        raise RuntimeError("Could not connect the camera handler to the stand-in")
+
+    latencies = [[] for _ in range(viewers)]
+    delivered = [0] * viewers
+    stop_event = threading.Event()
+
+    def update_camera_feed():
+        # The old dashboard callback: ensure capture, grab the latest frame
+        handler.start_capture()
+        return handler.get_latest_frame()
+
+    def viewer(index):
+        last_seq = -1
+        while not stop_event.is_set():
+            start = time.perf_counter()
+            frame = update_camera_feed()
+            seq = handler.frame_ring.latest_seq
+            if frame is None or seq == last_seq:
+                time.sleep(0.001)
+                continue
+            encode(frame)
+            latencies[index].append(time.perf_counter() - start)
+            delivered[index] += 1
+            last_seq = seq
+
+    # Let the first frame arrive before the clock starts
+    handler.wait_for_frame(-1, timeout=10)
+    first_seq = handler.frame_ring.latest_seq
+    threads = [threading.Thread(target=viewer, args=(i,), daemon=True) for i in range(viewers)]
+    with ResourceMonitor() as monitor:
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+    captured = handler.frame_ring.latest_seq - first_seq
+    handler.stop_capture()
+
+    return dict(
+        capture_fps=round(captured / duration, 2),
+        delivered_fps=round(sum(delivered) / duration, 2),
+        per_viewer_fps=round(sum(delivered) / duration / viewers, 2),
+        encoder=encoder_name,
+        latency_metric='callback',
+        cpu_percent=round(monitor.cpu_percent, 1),
+        peak_rss_mb=round(monitor.peak_rss, 1),
+        **percentiles([sample for samples in latencies for sample in samples]),
+    )
+
+
+async def read_push(app, intervals, counts, index, stop_event):
+    """One /ws/video client: acks each frame as soon as it arrives, as a drawing browser does"""
+    from frame_push import FRAME_HEADER
+
+    messages = asyncio.Queue()
+    messages.put_nowait({'type': 'websocket.connect'})
+    last = time.perf_counter()
+
+    async def receive():
+        return await messages.get()
+
+    async def send(message):
+        nonlocal last
+        if message['type'] != 'websocket.send':
+            return
+        now = time.perf_counter()
+        intervals[index].append(now - last)
+        counts[index] += 1
+        last = now
+        seq = FRAME_HEADER.unpack_from(message['bytes'])[0]
+        messages.put_nowait({'type': 'websocket.receive', 'text': f'ack {seq}'})
+
+    scope = {'type': 'websocket', 'path': '/ws/video', 'query_string': b''}
+    client = asyncio.ensure_future(app(scope, receive, send))
+    await stop_event.wait()
+    messages.put_nowait({'type': 'websocket.disconnect', 'code': 1000})
+    await asyncio.wait_for(client, 5)
+
+
+def run_push_case(port, viewers, duration, capture_fps):
+    """N WebSocket clients on the PushServer feed the dashboards ship, captured at the
+    simulator's frame rate as the dashboards do (uncapped, the case only measures spare CPU)"""
+    from airsim_camera import AirSimCameraHandler
+    from airsim_connection import ConnectionManager
+    from frame_broadcast import RingBroadcaster
+    from frame_push import PushServer
+
+    handler = AirSimCameraHandler(target_fps=capture_fps, connection=ConnectionManager(port=port))
+    if not handler.start_capture():
+        raise RuntimeError("Could not connect the camera handler to the stand-in")
+    broadcaster = RingBroadcaster(handler)
+    # Served through its ASGI app directly; only the uvicorn socket layer is left out
+    push_server = PushServer(broadcaster)
+    handler.wait_for_frame(-1, timeout=10)
+
+    intervals = [[] for _ in range(viewers)]
+    counts = [0] * viewers
+
+    async def run_viewers():
+        stop_event = asyncio.Event()
+        clients = [
+            asyncio.ensure_future(read_push(push_server.app, intervals, counts, i, stop_event))
+            for i in range(viewers)
+        ]
+        await asyncio.sleep(duration)
+        stop_event.set()
+        await asyncio.gather(*clients)
+        push_server.feed.close()
+
+    with ResourceMonitor() as monitor:
+        asyncio.run(run_viewers())
+    broadcaster.stop()
+    handler.stop_capture()
+
+    return dict(
+        delivered_fps=round(sum(counts) / duration, 2),
+        per_viewer_fps=round(sum(counts) / duration / viewers, 2),
+        latency_metric='frame_interval',
+        cpu_percent=round(monitor.cpu_percent, 1),
+        peak_rss_mb=round(monitor.peak_rss, 1),
+        **percentiles([sample for samples in intervals for sample in samples]),
+    )
+
+
+def read_mjpeg(port, duration, intervals, counts, index, stop_event):
+    """HTTP client counting multipart frame boundaries on /video_feed"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    connection.request('GET', '/video_feed')
+    response = connection.getresponse()
+    boundary = b'--frame\r\n'
+    carry = b''
+    last = time.perf_counter()
+    try:
+        while not stop_event.is_set():
+            chunk = response.read1(1 << 16)
+            if not chunk:
+                break
+            data = carry + chunk
+            found = data.count(boundary)
+            if found:
+                now = time.perf_counter()
+                intervals[index].append((now - last) / found)
+                counts[index] += found
+                last = now
+            carry = data[-(len(boundary) - 1):]
+    finally:
+        connection.close()
+
+
+def run_mjpeg_case(port, http_port, viewers, duration):
+    """N HTTP clients on web/server.py's /video_feed"""
+    from werkzeug.serving import make_server
+
+    # Re-import per case so every case starts with a fresh broadcaster
+    sys.path.insert(0, os.path.join(ROOT, 'web'))
+    sys.modules.pop('server', None)
+    import server as web_server
+    from airsim_connection import ConnectionManager
+
+    # The module-level broadcaster connects on the first viewer; point it at this stand-in
+    web_server.broadcaster.connection = ConnectionManager(port=port)
+
+    httpd = make_server('127.0.0.1', http_port, web_server.app, threaded=True)
+    server_thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    server_thread.start()
+
+    intervals = [[] for _ in range(viewers)]
+    counts = [0] * viewers
+    stop_event = threading.Event()
+    threads = [
+        threading.Thread(target=read_mjpeg, args=(http_port, duration, intervals, counts, i, stop_event), daemon=True)
+        for i in range(viewers)
+    ]
+    with ResourceMonitor() as monitor:
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop_event.set()
+        for thread in threads:
+            thread.join(timeout=5)
+    httpd.shutdown()
+    httpd.server_close()
+    web_server.broadcaster.stop()
+
+    return dict(
+        delivered_fps=round(sum(counts) / duration, 2),
+        per_viewer_fps=round(sum(counts) / duration / viewers, 2),
+        latency_metric='frame_interval',
+        cpu_percent=round(monitor.cpu_percent, 1),
+        peak_rss_mb=round(monitor.peak_rss, 1),
+        **percentiles([sample for samples in intervals for sample in samples]),
+    )
+
+
+def read_fleet_stream(engine, vehicle, latencies, counts, index, stop_event):
+    """One reader per drone: waits for each new frame, timing capture start -> readable"""
+    last_seq = -1
+    while not stop_event.is_set():
+        seq, frame = engine.wait_for_frame(vehicle, last_seq, timeout=0.5)
+        if frame is None:
+            continue
+        meta = engine.stream(vehicle).read_meta(seq)
+        if meta is not None and meta['rpc_start']:
+            latencies[index].append(time.time() - meta['rpc_start'])
+        counts[index] += 1
+        last_seq = seq
+
+
+def run_fleet_case(port, vehicles, duration, engine_kind='threaded', batch_detector=None):
+    """A fleet engine over `vehicles` stand-in drones, each stream read as it arrives"""
+    names = [f"Drone-{i + 1}" for i in range(vehicles)]
+    if engine_kind == 'async':
+        from async_fleet import AsyncFleetEngine
+        engine = AsyncFleetEngine(names, port=port, fps=1000, telemetry_fps=0)
+        start, stop = engine.start, engine.stop
+    else:
+        from airsim_connection import ConnectionManager
+        from fleet_capture import FleetCaptureEngine
+        engine = FleetCaptureEngine(names, target_fps=1000, connection=ConnectionManager(port=port))
+        start, stop = engine.start_capture, engine.stop_capture
+
+    # Load the detector before capture starts, so a missing backend fails cleanly
+    batcher = None
+    if batch_detector:
+        from batch_inference import BatchInferenceServer
+        from detector_backends import load_detector
+        batcher = BatchInferenceServer(load_detector(batch_detector), engine.streams, annotate=False)
+    start()
+    if batcher:
+        batcher.start()
+
+    latencies = [[] for _ in range(vehicles)]
+    counts = [0] * vehicles
+    stop_event = threading.Event()
+    # Let every drone deliver a first frame before the clock starts
+    for name in names:
+        engine.wait_for_frame(name, -1, timeout=10)
+    threads = [
+        threading.Thread(target=read_fleet_stream, args=(engine, name, latencies, counts, i, stop_event), daemon=True)
+        for i, name in enumerate(names)
+    ]
+    with ResourceMonitor() as monitor:
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+    batch_stats = {}
+    if batcher:
+        batcher.stop()
+        batch_stats = {'batch_' + name: value for name, value in batcher.stats().items()}
+    stop()
+
+    return dict(
+        delivered_fps=round(sum(counts) / duration, 2),
+        per_viewer_fps=round(sum(counts) / duration / vehicles, 2),
+        latency_metric='capture_to_ring',
+        **batch_stats,
+        cpu_percent=round(monitor.cpu_percent, 1),
+        peak_rss_mb=round(monitor.peak_rss, 1),
+        **percentiles([sample for samples in latencies for sample in samples]),
+    )
+
+
+def check_regressions(results, baselines, tolerance, require=False):
+    """Compare against baselines: throughput may drop and p95 may rise by `tolerance`;
+    with require, a case that has no baseline is a failure too"""
+    failures = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if not baseline:
+            if require:
+                failures.append(f"{name}: no baseline")
+            continue
+        if baseline.get('per_viewer_fps') and result['per_viewer_fps'] < baseline['per_viewer_fps'] * (1 - tolerance):
+            failures.append(f"{name}: per_viewer_fps {result['per_viewer_fps']} < baseline {baseline['per_viewer_fps']}")
+        if baseline.get('p95_ms') and result['p95_ms'] and result['p95_ms'] > baseline['p95_ms'] * (1 + tolerance):
+            failures.append(f"{name}: p95_ms {result['p95_ms']} > baseline {baseline['p95_ms']}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera pipeline benchmark")
+    parser.add_argument('--paths', default='push,mjpeg')
+    parser.add_argument('--resolutions', default='640x360,1280x720,1920x1080')
+    parser.add_argument('--viewers', default='1,4,16')
+    parser.add_argument('--vehicles', default='1,4', help="fleet sizes for the fleet paths")
+    parser.add_argument('--batch-detector', help="detector backend to batch over the fleet streams")
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds per case")
+    parser.add_argument('--sim-fps', type=float, default=30)
+    parser.add_argument('--latency', type=float, default=0.0, help="injected RPC latency, seconds")
+    parser.add_argument('--port', type=int, default=41451, help="stand-in port")
+    parser.add_argument('--http-port', type=int, default=5055)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baselines', default=DEFAULT_BASELINES)
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--update-baselines', action='store_true')
+    parser.add_argument('--ci', action='store_true', default=bool(os.environ.get('CI')),
+                        help="fail when baselines are missing instead of skipping the check")
+    args = parser.parse_args()
+
+    resolutions = [tuple(int(v) for v in r.split('x')) for r in args.resolutions.split(',')]
+    viewer_counts = [int(v) for v in args.viewers.split(',')]
+    vehicle_counts = [int(v) for v in args.vehicles.split(',')]
+    paths = args.paths.split(',')
+
+    results = {}
+    for width, height in resolutions:
+        with StandinProcess(args.port, width, height, args.sim_fps, args.latency, max(vehicle_counts)):
+            for path in paths:
+                # Display paths scale by viewers, fleet paths by drones
+                counts = vehicle_counts if path in ('fleet', 'async-fleet') else viewer_counts
+                for count in counts:
+                    if path == 'push':
+                        name = f"{path}/{width}x{height}/{count}v"
+                        result = run_push_case(args.port, count, args.duration, args.sim_fps)
+                    elif path == 'png-poll':
+                        name = f"{path}/{width}x{height}/{count}v"
+                        result = run_poll_case(args.port, count, args.duration, args.sim_fps)
+                    elif path == 'mjpeg':
+                        name = f"{path}/{width}x{height}/{count}v"
+                        result = run_mjpeg_case(args.port, args.http_port, count, args.duration)
+                    elif path == 'fleet':
+                        name = f"{path}/{width}x{height}/{count}d"
+                        result = run_fleet_case(args.port, count, args.duration, 'threaded', args.batch_detector)
+                    elif path == 'async-fleet':
+                        name = f"{path}/{width}x{height}/{count}d"
+                        result = run_fleet_case(args.port, count, args.duration, 'async', args.batch_detector)
+                    else:
+                        raise SystemExit(f"Unknown path: {path}")
+                    results[name] = result
+                    print(f"{name:28s} {json.dumps(result)}")
+
+    with open(args.output, 'w') as output:
+        json.dump({'timestamp': time.time(), 'args': vars(args), 'results': results}, output, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.update_baselines:
+        # Cases not run this time keep their stored numbers
+        baselines = {}
+        if os.path.exists(args.baselines):
+            with open(args.baselines) as baseline_file:
+                baselines = json.load(baseline_file)
+        baselines.update({
+            name: {'per_viewer_fps': r['per_viewer_fps'], 'p95_ms': r['p95_ms']}
+            for name, r in results.items()
+        })
+        with open(args.baselines, 'w') as output:
+            json.dump(baselines, output, indent=2, sort_keys=True)
+        print(f"Baselines written to {args.baselines}")
+        return
+
+    if not os.path.exists(args.baselines):
+        print(f"No baselines at {args.baselines}; run with --update-baselines to record them")
+        if args.ci:
+            sys.exit(1)
+        return
+    with open(args.baselines) as baseline_file:
+        failures = check_regressions(results, json.load(baseline_file), args.tolerance, args.ci)
+    if failures:
+        print("Regressions:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("No regressions against baselines")
+
+
+if __name__ == '__main__':
+    main()
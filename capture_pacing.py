@@ -0,0 +1,79 @@
+import threading
+import time
+
+
+def next_deadline(deadline, period, now):
+    """Deadline one period after the last (None: first capture); if that leaves us more
+    than a period behind (slow RPC, mode change), restart the schedule from now"""
+    deadline = (now if deadline is None else deadline) + period
+    return now if deadline < now - period else deadline
+
+
+# Demand-driven pacing for a capture loop
+class CapturePacer:
+    def __init__(self, target_fps=30, idle_fps=1, idle_after=5.0, burst_fps=0):
+        self.target_fps = target_fps
+        self.idle_fps = idle_fps
+        self.idle_after = idle_after
+        # 0 means "as fast as the simulator answers"
+        self.burst_fps = burst_fps
+        self.lock = threading.Lock()
+        self.wake_event = threading.Event()
+        self.last_read = time.monotonic()
+        self.burst_until = 0.0
+        self.next_deadline = None
+
+    def mark_read(self):
+        """Record that a consumer read a frame; leaves idle mode immediately"""
+        now = time.monotonic()
+        with self.lock:
+            was_idle = now - self.last_read > self.idle_after
+            self.last_read = now
+        if was_idle:
+            self.wake_event.set()
+
+    def request_burst(self, duration=2.0):
+        """Capture at burst rate for the next `duration` seconds"""
+        with self.lock:
+            self.burst_until = max(self.burst_until, time.monotonic() + duration)
+            self.last_read = time.monotonic()
+        self.wake_event.set()
+
+    def wake(self):
+        """Cut the current wait short (e.g. when stopping the capture thread)"""
+        self.wake_event.set()
+
+    def mode(self, now=None):
+        """Return the current pacing mode: 'burst', 'active' or 'idle'"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if now < self.burst_until:
+                return 'burst'
+            if now - self.last_read > self.idle_after:
+                return 'idle'
+            return 'active'
+
+    def period(self, now=None):
+        """Seconds between captures for the current mode"""
+        mode = self.mode(now)
+        if mode == 'burst':
+            return 1.0 / self.burst_fps if self.burst_fps else 0.0
+        if mode == 'idle':
+            return 1.0 / self.idle_fps if self.idle_fps else 1.0
+        return 1.0 / self.target_fps if self.target_fps else 0.0
+
+    def wait(self, stop_event):
+        """Sleep until the next capture deadline, minus time already spent on the RPC"""
+        # Clear first so a wake-up arriving while we compute the delay is not lost
+        self.wake_event.clear()
+        if stop_event.is_set():
+            return False
+
+        now = time.monotonic()
+        self.next_deadline = next_deadline(self.next_deadline, self.period(now), now)
+        delay = self.next_deadline - now
+        if delay > 0:
+            if self.wake_event.wait(delay):
+                # Demand changed mid-sleep: capture now and reschedule from here
+                self.next_deadline = time.monotonic()
+        return not stop_event.is_set()
@@ -0,0 +1,63 @@
+import time
+import numpy as np
+
+
+def thumbnail(frame, grid=64, stride=4):
+    """Block-averaged single-channel thumbnail (grid x grid cells) of an RGB or gray frame"""
+    # Strided sampling first: the gate only has to see coarse structure, so skip most pixels
+    sampled = frame[::stride, ::stride]
+    if sampled.ndim == 3:
+        # Green carries most of the luminance; good enough for change detection
+        sampled = sampled[..., 1]
+    height, width = sampled.shape
+    cell_h, cell_w = max(1, height // grid), max(1, width // grid)
+    rows, cols = height // cell_h, width // cell_w
+    cells = sampled[:rows * cell_h, :cols * cell_w].astype(np.float32)
+    return cells.reshape(rows, cell_h, cols, cell_w).mean(axis=(1, 3))
+
+
+# Skips inference while the scene matches the frame detections were last computed on
+class ChangeGate:
+    def __init__(self, grid=64, stride=4, cell_threshold=8.0, changed_fraction=0.0005, max_age=2.0):
+        self.grid = grid
+        self.stride = stride
+        # A cell counts as changed when its mean moves by more than this (0-255 scale)
+        self.cell_threshold = cell_threshold
+        # Fraction of changed cells that means "new scene"
+        self.changed_fraction = changed_fraction
+        # Cached detections are never trusted for longer than this, in seconds
+        self.max_age = max_age
+        self.reference = None
+        self.reference_time = 0.0
+        self.pending = None
+        self.inferred = 0
+        self.skipped = 0
+
+    def difference(self, thumb):
+        """Fraction of cells that differ from the reference by more than cell_threshold"""
+        if self.reference is None or self.reference.shape != thumb.shape:
+            return 1.0
+        return float(np.count_nonzero(np.abs(thumb - self.reference) > self.cell_threshold)) / thumb.size
+
+    def needs_inference(self, frame):
+        """True if the frame must go through the model; False to reuse the cached result"""
+        self.pending = thumbnail(frame, self.grid, self.stride)
+        stale = time.monotonic() - self.reference_time > self.max_age
+        if stale or self.difference(self.pending) > self.changed_fraction:
+            self.inferred += 1
+            return True
+        self.skipped += 1
+        return False
+
+    def mark_inferred(self):
+        """Make the frame last passed to needs_inference the new reference"""
+        self.reference = self.pending
+        self.reference_time = time.monotonic()
+
+    def reset(self):
+        """Forget the reference so the next frame is always inferred"""
+        self.reference = None
+
+    def skip_ratio(self):
+        total = self.inferred + self.skipped
+        return self.skipped / total if total else 0.0
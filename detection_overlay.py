@@ -0,0 +1,78 @@
+import numpy as np
+
+# Keeps the overlay stream small: pixel boxes as ints, scores to two decimals
+SCORE_DECIMALS = 2
+
+
+def detection_payload(result, status='ready'):
+    """Compact JSON-able detections for one frame: the client draws them over the video"""
+    if result is None:
+        return {'status': status, 'seq': -1, 'width': 0, 'height': 0, 'boxes': [], 'scores': [], 'ids': [],
+                'locations': []}
+    height, width = result.shape if result.shape is not None else (0, 0)
+    return {
+        'status': status,
+        'seq': int(result.seq),
+        'width': int(width),
+        'height': int(height),
+        'boxes': np.rint(result.boxes).astype(int).tolist(),
+        'scores': np.round(result.scores.astype(float), SCORE_DECIMALS).tolist(),
+        'ids': result.track_ids.tolist() if result.track_ids is not None else [],
+        # lat/lon to ~10 cm; null where a box could not be put on the ground
+        'locations': [
+            None if np.isnan(lat) else [round(float(lat), 6), round(float(lon), 6)]
+            for lat, lon in result.locations
+        ] if result.locations is not None else [],
+    }
+
+
+# Client-side renderer: draws a payload on a canvas laid over the image (or video) with the
+# given elem_id. Bound as the js= handler of the payload component's change event.
+OVERLAY_JS = """
+(payload) => {
+    const root = document.getElementById('%(elem_id)s');
+    if (!root || !payload) return;
+    // The pushed JPEG <img> or the H.264 <video>, whichever the feed uses
+    const img = root.querySelector('img, video');
+    let canvas = root.querySelector('canvas.detection-overlay');
+    if (!canvas) {
+        canvas = document.createElement('canvas');
+        canvas.className = 'detection-overlay';
+        canvas.style.cssText = 'position:absolute;pointer-events:none;z-index:10;';
+        root.style.position = 'relative';
+        root.appendChild(canvas);
+    }
+    const ctx = canvas.getContext('2d');
+    if (!img || !payload.width) {
+        ctx.clearRect(0, 0, canvas.width, canvas.height);
+        return;
+    }
+    // Match the displayed image, honouring object-fit: contain letterboxing
+    const box = img.getBoundingClientRect(), parent = root.getBoundingClientRect();
+    canvas.style.left = (box.left - parent.left) + 'px';
+    canvas.style.top = (box.top - parent.top) + 'px';
+    canvas.width = box.width;
+    canvas.height = box.height;
+    const scale = Math.min(box.width / payload.width, box.height / payload.height);
+    const dx = (box.width - payload.width * scale) / 2, dy = (box.height - payload.height * scale) / 2;
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    ctx.lineWidth = 2;
+    ctx.font = '12px sans-serif';
+    ctx.strokeStyle = ctx.fillStyle = 'rgb(255,64,64)';
+    payload.boxes.forEach((b, i) => {
+        const x = dx + b[0] * scale, y = dy + b[1] * scale;
+        ctx.strokeRect(x, y, (b[2] - b[0]) * scale, (b[3] - b[1]) * scale);
+        const id = payload.ids.length ? '#' + payload.ids[i] + ' ' : '';
+        ctx.fillText(id + payload.scores[i].toFixed(2), x, Math.max(y - 4, 12));
+    });
+    if (payload.status !== 'ready') {
+        ctx.fillStyle = 'rgb(255,255,0)';
+        ctx.fillText('Detector ' + payload.status + '...', 10, 20);
+    }
+}
+"""
+
+
+def overlay_js(elem_id):
+    """OVERLAY_JS bound to one image component"""
+    return OVERLAY_JS % {'elem_id': elem_id}
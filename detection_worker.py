@@ -0,0 +1,230 @@
+import collections
+import threading
+import time
+import numpy as np
+import cv2
+
+from pipeline_latency import pipeline_latency
+from tracker import draw_tracks
+
+# One finished inference: the frame it ran on, its boxes and the annotated image
+# (annotated is None when the consumer draws its own overlay; track_ids is set when a
+# Tracker produced the boxes; shape is the (height, width) the boxes refer to;
+# locations is an (N, 2) lat/lon array when a Geolocator is attached)
+DetectionResult = collections.namedtuple(
+    'DetectionResult',
+    ['seq', 'boxes', 'scores', 'classes', 'annotated', 'meta', 'track_ids', 'shape', 'locations'],
+    defaults=(None, None, None)
+)
+
+
+def to_numpy(values):
+    """Torch tensor or array-like to a numpy array"""
+    return values.cpu().numpy() if hasattr(values, 'cpu') else np.asarray(values)
+
+
+def unpack_boxes(result):
+    """Pull (xyxy, confidence, class) numpy arrays out of an ultralytics (or tiled) result"""
+    boxes = result.boxes
+    if boxes is None or len(boxes.xyxy) == 0:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64)
+    return (
+        to_numpy(boxes.xyxy).astype(np.float32),
+        to_numpy(boxes.conf).astype(np.float32),
+        to_numpy(boxes.cls).astype(np.int64),
+    )
+
+
+def stamp_inference(meta, inference_start, inference_end):
+    """Record when the detector ran on a frame"""
+    if meta is not None:
+        meta['inference_start'] = inference_start
+        meta['inference_end'] = inference_end
+        pipeline_latency.record_inference(meta)
+
+
+def make_result(seq, result, meta, inference_start, inference_end, shape=None, annotate=True):
+    """Package one ultralytics result with its boxes, annotated frame and latency stamps"""
+    boxes, scores, classes = unpack_boxes(result)
+    stamp_inference(meta, inference_start, inference_end)
+    annotated = result.plot() if annotate else None
+    return DetectionResult(seq, boxes, scores, classes, annotated, meta, shape=shape)
+
+
+def track_result(seq, tracks, image, meta, annotate=True):
+    """Package a Tracker's confirmed tracks, drawn with their IDs onto the frame"""
+    track_ids, boxes, scores, classes = tracks
+    annotated = draw_tracks(image, boxes, track_ids, scores) if annotate else None
+    return DetectionResult(seq, boxes, scores, classes, annotated, meta, track_ids, image.shape[:2])
+
+
+def model_ready(model):
+    """False while a BackgroundModel is still loading; plain models are always ready"""
+    is_ready = getattr(model, 'is_ready', None)
+    return is_ready() if is_ready else True
+
+
+def passthrough_result(seq, image, meta, status, annotate=True):
+    """Un-annotated frame with the model's state written on it, for before the model is ready"""
+    if annotate:
+        cv2.putText(image, f"Detector {status}...", (10, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+    empty = np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64)
+    return DetectionResult(seq, *empty, image if annotate else None, meta, shape=image.shape[:2])
+
+
+def locate_result(result, geolocator):
+    """Attach ground lat/lon to every box (one vectorised projection per frame)"""
+    if geolocator is None or not len(result.boxes) or result.shape is None:
+        return result
+    try:
+        latitude, longitude = geolocator.locate(result.boxes, result.shape)
+    except Exception as e:
+        print(f"Geolocation Error: {e}")
+        return result
+    return result._replace(locations=np.stack([latitude, longitude], axis=1))
+
+
+def frame_time(meta):
+    """Capture time of a frame, for the tracker's motion model"""
+    return meta['rpc_end'] if meta is not None and meta['rpc_end'] else time.time()
+
+
+def draw_boxes(image, boxes, scores):
+    """Draw untracked boxes with their confidences onto an RGB image in place"""
+    for box, score in zip(boxes.astype(int), scores):
+        x1, y1, x2, y2 = box
+        cv2.rectangle(image, (x1, y1), (x2, y2), (255, 64, 64), 2)
+        cv2.putText(image, f"{score:.2f}", (x1, max(y1 - 4, 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 64, 64), 1)
+    return image
+
+
+def reuse_result(result, seq, image, meta, annotate=True):
+    """Carry cached detections over to a newer, unchanged frame, redrawn on that frame
+    (no inference stamps)"""
+    annotated = None
+    if annotate:
+        if result.track_ids is not None:
+            annotated = draw_tracks(image, result.boxes, result.track_ids, result.scores)
+        else:
+            annotated = draw_boxes(image, result.boxes, result.scores)
+    return result._replace(seq=seq, meta=meta, annotated=annotated)
+
+
+# Runs the detector on the freshest frame of a FrameRing on its own thread
+class DetectionWorker:
+    def __init__(self, model, frame_ring, classes=(0,), on_result=None, gate=None, tracker=None,
+                 annotate=True, geolocator=None, demand=None, burst_duration=2.0, **predict_kwargs):
+        self.model = model
+        self.frame_ring = frame_ring
+        # Optional capture handler (mark_read/request_burst): the worker counts as a reader,
+        # and asks for burst-rate capture while it is following people
+        self.demand = demand
+        self.burst_duration = burst_duration
+        # Optional ChangeGate: reuse the last detections while the scene is unchanged
+        self.gate = gate
+        # Optional Tracker: every frame is tracked, the model only runs when the tracker asks
+        self.tracker = tracker
+        # annotate=False skips drawing; consumers render the boxes themselves
+        self.annotate = annotate
+        # Optional Geolocator: every published result carries lat/lon per box
+        self.geolocator = geolocator
+        self.classes = list(classes) if classes is not None else None
+        self.on_result = on_result
+        self.predict_kwargs = predict_kwargs
+        self.condition = threading.Condition()
+        self.result = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start the inference thread (no-op if it is already running)"""
+        if self.thread and self.thread.is_alive():
+            return True
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name='detection-worker')
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+
+    def stop(self):
+        """Stop the inference thread after the frame in progress"""
+        if self.thread:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        """Thread function: always infer on the newest frame, skipping any that went stale"""
+        last_seq = -1
+        while not self.stop_event.is_set():
+            if self.demand:
+                self.demand.mark_read()
+            seq, frame = self.frame_ring.wait_for_frame(last_seq, timeout=0.5)
+            if frame is None:
+                continue
+            last_seq = seq
+            meta = self.frame_ring.read_meta(seq)
+            # Own the pixels: the capture thread may reuse the slot mid-inference
+            image = frame.copy()
+            if not self.frame_ring.is_valid(seq):
+                continue
+            if not model_ready(self.model):
+                self.publish(passthrough_result(seq, image, meta, self.model.status(), self.annotate))
+                continue
+            if self.tracker and self.result is not None and not self.tracker.needs_detection():
+                self.publish(track_result(seq, self.tracker.predict(frame_time(meta)), image, meta, self.annotate))
+                continue
+            if self.gate and not self.gate.needs_inference(image) and self.result is not None:
+                if self.tracker:
+                    self.publish(track_result(seq, self.tracker.predict(frame_time(meta)), image, meta, self.annotate))
+                else:
+                    self.publish(reuse_result(self.result, seq, image, meta, self.annotate))
+                continue
+            try:
+                result = self.infer(seq, image, meta)
+            except Exception as e:
+                print(f"Detection Error: {e}")
+                continue
+            if self.gate:
+                self.gate.mark_inferred()
+            self.publish(result)
+
+    def infer(self, seq, image, meta):
+        """Run the model on one frame and package its detections"""
+        inference_start = time.time()
+        results = self.model.predict(image, classes=self.classes, verbose=False, **self.predict_kwargs)
+        if self.tracker is None:
+            return make_result(
+                seq, results[0], meta, inference_start, time.time(), image.shape[:2], self.annotate
+            )
+        stamp_inference(meta, inference_start, time.time())
+        tracks = self.tracker.update(*unpack_boxes(results[0]), timestamp=frame_time(meta))
+        return track_result(seq, tracks, image, meta, self.annotate)
+
+    def publish(self, result):
+        result = locate_result(result, self.geolocator)
+        with self.condition:
+            self.result = result
+            self.condition.notify_all()
+        # Confirmed tracks (or fresh detections) in view: capture faster while they last
+        if self.demand and len(result.boxes):
+            self.demand.request_burst(self.burst_duration)
+        if self.on_result:
+            # A failing consumer must not take the inference thread down with it
+            try:
+                self.on_result(result)
+            except Exception as e:
+                print(f"Detection Callback Error: {e}")
+
+    def latest(self):
+        """Newest DetectionResult, or None before the first inference finishes"""
+        return self.result
+
+    def wait_for_result(self, after_seq=-1, timeout=None):
+        """Block until a result for a frame newer than after_seq is ready"""
+        with self.condition:
+            if not self.condition.wait_for(
+                lambda: self.result is not None and self.result.seq > after_seq, timeout
+            ):
+                return None
+            return self.result
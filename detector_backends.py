@@ -0,0 +1,282 @@
+"""Exported CPU backends for the RT-DETR person detector.
+
+Export the PyTorch checkpoint once, then pick a backend at startup:
+
+    python detector_backends.py export --backend onnx-int8
+    python detector_backends.py compare --images captures/ --backends pytorch,onnx,onnx-int8
+    DETECTOR_BACKEND=onnx-int8 python olala.py
+    DETECTOR_TILE=640 python olala.py        # tiled inference for high-altitude frames
+    DETECTOR_TILE=640 DETECTOR_TILE_WORKERS=2 python olala.py
+
+Every backend loads through ultralytics, so predict()/plot() behave the same whichever
+one runs. The comparison treats the PyTorch detections as reference and reports person
+recall/precision alongside per-frame latency.
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+import cv2
+
+from detection_worker import unpack_boxes
+from tiled_inference import TiledDetector
+from tracker import box_iou, greedy_match
+
+DEFAULT_WEIGHTS = 'rtdetr.pt'
+PERSON_CLASSES = [0]
+
+# Backend name -> (ultralytics export format, int8)
+BACKENDS = {
+    'pytorch': (None, False),
+    'onnx': ('onnx', False),
+    'onnx-int8': ('onnx', True),
+    'openvino': ('openvino', False),
+    'openvino-int8': ('openvino', True),
+}
+
+
+def backend_path(backend, weights=DEFAULT_WEIGHTS):
+    """Where the exported model for a backend lives, next to the checkpoint"""
+    stem = os.path.splitext(weights)[0]
+    return {
+        'pytorch': weights,
+        'onnx': stem + '.onnx',
+        'onnx-int8': stem + '.int8.onnx',
+        'openvino': stem + '_openvino_model',
+        'openvino-int8': stem + '_int8_openvino_model',
+    }[backend]
+
+
+def quantize_onnx(source, target):
+    """Dynamic int8 quantisation of the MatMul/Gemm-heavy transformer, keeping ultralytics metadata"""
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+    # AutoBackend reads class names, stride and imgsz from the metadata props
+    metadata = onnx.load(source, load_external_data=False).metadata_props
+    quantized = onnx.load(target)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(metadata)
+    onnx.save(quantized, target)
+
+
+def export_detector(backend, weights=DEFAULT_WEIGHTS, imgsz=640, data=None):
+    """Export the checkpoint to a backend's optimised CPU graph and return its path"""
+    from ultralytics import RTDETR
+
+    export_format, int8 = BACKENDS[backend]
+    if export_format is None:
+        return weights
+    target = backend_path(backend, weights)
+    model = RTDETR(weights)
+
+    if export_format == 'onnx':
+        # simplify runs onnx-simplifier's constant folding and op fusion; dynamic axes allow batches
+        exported = model.export(format='onnx', imgsz=imgsz, simplify=True, dynamic=True)
+        if int8:
+            quantize_onnx(exported, target)
+            return target
+    else:
+        # OpenVINO int8 is post-training quantisation; it needs a calibration dataset yaml
+        kwargs = dict(int8=True, data=data) if int8 else {}
+        exported = model.export(format='openvino', imgsz=imgsz, dynamic=True, **kwargs)
+
+    if os.path.abspath(exported) != os.path.abspath(target):
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        shutil.move(exported, target)
+    return target
+
+
+def load_detector(backend=None, weights=DEFAULT_WEIGHTS, tile=None, tile_workers=None):
+    """Load the detector for a backend (default: $DETECTOR_BACKEND, else pytorch),
+    wrapped for tiled inference when tile (default: $DETECTOR_TILE) is set"""
+    from ultralytics import RTDETR
+
+    backend = backend or os.environ.get('DETECTOR_BACKEND', 'pytorch')
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {tuple(BACKENDS)}")
+    path = backend_path(backend, weights)
+    if not os.path.exists(path):
+        print(f"Detector backend {backend} not exported yet ({path}); using PyTorch")
+        backend, path = 'pytorch', weights
+    print(f"Detector backend: {backend} ({path})")
+    tile = tile if tile is not None else int(os.environ.get('DETECTOR_TILE', 0))
+    if not tile:
+        return RTDETR(path)
+    tile_workers = tile_workers or int(os.environ.get('DETECTOR_TILE_WORKERS', 1))
+    print(f"Tiled inference: {tile}px tiles on {tile_workers} worker(s)")
+    # One model instance per tile worker thread
+    return TiledDetector([RTDETR(path) for _ in range(tile_workers)], tile=tile)
+
+
+# Loads and warms the detector on a background thread so the UI can come up first
+class BackgroundModel:
+    def __init__(self, warmup_shape=(640, 640, 3), **load_kwargs):
+        self.warmup_shape = warmup_shape
+        self.load_kwargs = load_kwargs
+        self.model = None
+        self.error = None
+        self.loaded = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        """Begin loading (no-op once started)"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._load, name='model-loader')
+                self.thread.daemon = True
+                self.thread.start()
+        return True
+
+    def _load(self):
+        try:
+            started = time.perf_counter()
+            model = load_detector(**self.load_kwargs)
+            # First predict builds the predictor, allocates buffers and JIT-compiles kernels;
+            # a TiledDetector warms each of its models with a tile of its own size
+            warmup = getattr(model, 'warmup', None)
+            if warmup:
+                warmup(classes=PERSON_CLASSES)
+            else:
+                model.predict(np.zeros(self.warmup_shape, np.uint8), classes=PERSON_CLASSES, verbose=False)
+            self.model = model
+            print(f"Detector ready in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            self.error = e
+            print(f"Detector Load Error: {e}")
+        self.loaded.set()
+
+    def is_ready(self):
+        return self.model is not None
+
+    def wait(self, timeout=None):
+        """Block until loading finished (successfully or not)"""
+        return self.loaded.wait(timeout)
+
+    def status(self):
+        """'ready', 'loading', or the load error"""
+        if self.model is not None:
+            return 'ready'
+        if self.error is not None:
+            return f"model failed to load: {self.error}"
+        return 'loading'
+
+    def predict(self, source, **kwargs):
+        if self.model is None:
+            raise RuntimeError(f"Detector not ready ({self.status()})")
+        return self.model.predict(source, **kwargs)
+
+
+def match_counts(reference, candidate, iou_threshold=0.5):
+    """Greedy one-to-one matching; returns (matched, reference count, candidate count)"""
+    if len(reference) == 0 or len(candidate) == 0:
+        return 0, len(reference), len(candidate)
+    return len(greedy_match(box_iou(reference, candidate), iou_threshold)), len(reference), len(candidate)
+
+
+def load_images(pattern=None, frames=20):
+    """RGB test frames from an image glob/directory, or captured live from AirSim"""
+    if pattern:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*')
+        paths = sorted(p for p in glob.glob(pattern) if os.path.splitext(p)[1].lower() in ('.png', '.jpg', '.jpeg'))
+        return [cv2.cvtColor(cv2.imread(p), cv2.COLOR_BGR2RGB) for p in paths]
+
+    from airsim_camera import AirSimCameraHandler
+
+    handler = AirSimCameraHandler()
+    if not handler.start_capture():
+        raise RuntimeError("No --images given and AirSim is not reachable")
+    images, seq = [], -1
+    while len(images) < frames:
+        seq, frame = handler.wait_for_frame(seq, timeout=5)
+        if frame is None:
+            break
+        images.append(frame.copy())
+    handler.stop_capture()
+    return images
+
+
+def compare_backends(images, backends, weights=DEFAULT_WEIGHTS, conf=0.25, warmup=3):
+    """Latency and person recall/precision of each backend against the PyTorch path"""
+    reference = None
+    report = {}
+    for backend in ['pytorch'] + [b for b in backends if b != 'pytorch']:
+        path = backend_path(backend, weights)
+        if not os.path.exists(path):
+            print(f"Skipping {backend}: {path} not exported")
+            continue
+        model = load_detector(backend, weights)
+        for image in images[:warmup]:
+            model.predict(image, classes=PERSON_CLASSES, conf=conf, verbose=False)
+
+        boxes, latencies = [], []
+        for image in images:
+            start = time.perf_counter()
+            result = model.predict(image, classes=PERSON_CLASSES, conf=conf, verbose=False)[0]
+            latencies.append(time.perf_counter() - start)
+            boxes.append(unpack_boxes(result)[0])
+        if reference is None:
+            reference = boxes
+
+        matched = sum(match_counts(r, c)[0] for r, c in zip(reference, boxes))
+        reference_total = sum(len(r) for r in reference)
+        candidate_total = sum(len(c) for c in boxes)
+        p50, p95 = np.percentile(np.asarray(latencies) * 1000.0, [50, 95])
+        report[backend] = {
+            'path': path,
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'fps': round(len(images) / sum(latencies), 2),
+            'persons': candidate_total,
+            'recall_vs_pytorch': round(matched / reference_total, 3) if reference_total else None,
+            'precision_vs_pytorch': round(matched / candidate_total, 3) if candidate_total else None,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and compare RT-DETR CPU backends")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="export the checkpoint to a backend")
+    export_parser.add_argument('--backend', default='onnx', choices=[b for b in BACKENDS if b != 'pytorch'])
+    export_parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    export_parser.add_argument('--imgsz', type=int, default=640)
+    export_parser.add_argument('--data', default=None, help="calibration dataset yaml (openvino-int8)")
+
+    compare_parser = subparsers.add_parser('compare', help="accuracy/latency report against PyTorch")
+    compare_parser.add_argument('--backends', default=','.join(BACKENDS))
+    compare_parser.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    compare_parser.add_argument('--images', default=None, help="image directory or glob (default: capture from AirSim)")
+    compare_parser.add_argument('--frames', type=int, default=20, help="frames to capture from AirSim")
+    compare_parser.add_argument('--conf', type=float, default=0.25)
+    compare_parser.add_argument('--output', default='detector_report.json')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        print(f"Exported {args.backend}: {export_detector(args.backend, args.weights, args.imgsz, args.data)}")
+        return
+
+    images = load_images(args.images, args.frames)
+    if not images:
+        raise SystemExit("No images to compare on")
+    report = compare_backends(images, args.backends.split(','), args.weights, args.conf)
+    print(f"{'backend':15s} {'p50 ms':>8s} {'p95 ms':>8s} {'fps':>7s} {'persons':>8s} {'recall':>7s} {'precision':>9s}")
+    for backend, row in report.items():
+        print(f"{backend:15s} {row['p50_ms']:8.2f} {row['p95_ms']:8.2f} {row['fps']:7.2f} {row['persons']:8d} "
+              f"{row['recall_vs_pytorch'] or 0:7.3f} {row['precision_vs_pytorch'] or 0:9.3f}")
+    with open(args.output, 'w') as output:
+        json.dump({'images': len(images), 'backends': report}, output, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
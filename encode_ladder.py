@@ -0,0 +1,73 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+
+# (scale, JPEG quality) per rung, best first: operator screen down to a field tablet
+DEFAULT_RUNGS = ((1.0, 85), (0.5, 75), (0.25, 60))
+
+
+# Encodes frames into a ladder of resolutions/qualities on a shared worker pool.
+# Only the rungs someone is watching are encoded, each once per frame; measured
+# rung sizes let viewers pick the best rung their throughput can carry.
+class EncodeLadder:
+    def __init__(self, rungs=DEFAULT_RUNGS, workers=2, headroom=0.8):
+        self.rungs = tuple(rungs)
+        # cv2 releases the GIL while encoding, so rungs and streams encode in parallel
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='jpeg-encode')
+        # Use at most this fraction of a viewer's measured throughput
+        self.headroom = headroom
+        self.lock = threading.Lock()
+        # Moving average of encoded bytes per rung
+        self.sizes = [0.0] * len(self.rungs)
+
+    def encode_rung(self, frame, index, rgb=True):
+        """JPEG bytes of one rung of a frame (RGB, or BGR if rgb is False)"""
+        scale, quality = self.rungs[index]
+        if scale != 1.0:
+            height, width = frame.shape[:2]
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if rgb:
+            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("Could not encode frame")
+        data = encoded.tobytes()
+        self.record_size(index, len(data))
+        return data
+
+    def encode(self, frame, indices, rgb=True):
+        """{rung index: JPEG bytes} for the requested rungs, encoded concurrently"""
+        indices = sorted(indices)
+        if len(indices) == 1:
+            return {indices[0]: self.encode_rung(frame, indices[0], rgb)}
+        futures = {index: self.executor.submit(self.encode_rung, frame, index, rgb) for index in indices}
+        return {index: future.result() for index, future in futures.items()}
+
+    def record_size(self, index, size):
+        with self.lock:
+            previous = self.sizes[index]
+            self.sizes[index] = size if not previous else 0.9 * previous + 0.1 * size
+
+    def size(self, index):
+        """Expected bytes per frame of a rung; unseen rungs are estimated from the top one"""
+        with self.lock:
+            if self.sizes[index]:
+                return self.sizes[index]
+            known = [(i, size) for i, size in enumerate(self.sizes) if size]
+        if not known:
+            return 0.0
+        i, size = known[0]
+        return size * (self.rungs[index][0] / self.rungs[i][0]) ** 2
+
+    def choose(self, throughput, fps):
+        """Best rung whose bytes at `fps` fit in `throughput` bytes/s (the last rung if none do)"""
+        budget = throughput * self.headroom
+        for index in range(len(self.rungs)):
+            if self.size(index) * fps <= budget:
+                return index
+        return len(self.rungs) - 1
+
+
+# Process-wide encoder pool shared by every broadcaster
+encode_ladder = EncodeLadder()
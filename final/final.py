@@ -1,104 +1,27 @@
-import airsim
-import numpy as np
-import cv2
+import os
+import sys
 import gradio as gr
-import threading
-import queue
-import time
 import folium
 import leafmap.foliumap as leafmap
-from io import BytesIO
-import base64
 
-# AirSim Camera Handler Class (Previous implementation remains the same)
-class AirSimCameraHandler:
-    def __init__(self):
-        self.frame_queue = queue.Queue(maxsize=1)
-        self.stop_event = threading.Event()
-        self.thread = None
-        self.client = None
-
-    def connect_airsim(self):
-        """Establish connection to AirSim"""
-        try:
-            self.client = airsim.MultirotorClient()
-            self.client.confirmConnection()
-            print("AirSim Connected Successfully")
-            return True
-        except Exception as e:
-            print(f"AirSim Connection Error: {e}")
-            return False
-
-    def capture_frames(self):
-        """Thread function to capture frames"""
-        try:
-            while not self.stop_event.is_set():
-                # Capture frame from AirSim
-                responses = self.client.simGetImages([airsim.ImageRequest(
-                    '0', airsim.ImageType.Scene, False, False
-                )])
-
-                if responses and len(responses) > 0:
-                    response = responses[0]
-                    
-                    # Convert to numpy array
-                    img1d = np.frombuffer(response.image_data_uint8, dtype=np.uint8)
-                    
-                    # Reshape and convert color
-                    img_rgb = cv2.cvtColor(
-                        img1d.reshape(response.height, response.width, 3), 
-                        cv2.COLOR_BGR2RGB
-                    )
-                    
-                    # Clear queue if full
-                    try:
-                        self.frame_queue.get_nowait()
-                    except queue.Empty:
-                        pass
-                    
-                    self.frame_queue.put(img_rgb)
-                
-                time.sleep(0.1)  # Prevent overwhelming
-        except Exception as e:
-            print(f"Frame Capture Error: {e}")
-
-    def start_capture(self):
-        """Start the camera capture thread"""
-        # Ensure AirSim connection is established
-        if not self.client:
-            if not self.connect_airsim():
-                return False
-        
-        # If thread is already running, don't start again
-        if self.thread and self.thread.is_alive():
-            return True
-        
-        # Clear any existing stop event
-        self.stop_event.clear()
-        
-        # Create and start the thread
-        self.thread = threading.Thread(target=self.capture_frames)
-        self.thread.daemon = True
-        self.thread.start()
-        return True
-
-    def stop_capture(self):
-        """Stop the camera capture thread"""
-        if self.thread:
-            self.stop_event.set()
-            self.thread.join()
-            self.thread = None
-
-    def get_latest_frame(self):
-        """Get the latest frame from the queue"""
-        try:
-            return self.frame_queue.get_nowait()
-        except queue.Empty:
-            return None
+# Shared modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from airsim_camera import AirSimCameraHandler
+from frame_broadcast import RingBroadcaster
+from frame_push import PushServer, push_js
+from h264_stream import H264Stream, h264_js
+from pipeline_latency import pipeline_latency
 
 # Global AirSim handler
 airsim_handler = AirSimCameraHandler()
 
+# Frames are JPEG-encoded once and pushed to every browser over a WebSocket (port 7861).
+# FEED_CODEC=h264 streams H.264 through a local ffmpeg instead, for constrained links.
+feed_codec = os.environ.get('FEED_CODEC', 'jpeg')
+feed_broadcaster = RingBroadcaster(airsim_handler)
+h264_stream = H264Stream(airsim_handler, keyframe_interval=2.0, max_bitrate='1M') if feed_codec == 'h264' else None
+push_server = PushServer(feed_broadcaster, h264=h264_stream)
+
 def create_interactive_map():
     """Create an interactive Folium map"""
     # Default location (can be modified based on actual drone deployment)
@@ -216,21 +139,13 @@ def create_dashboard():
     
     return dashboard_html
 
-def update_camera_feed():
-    """Update camera feed in the dashboard"""
+def start_camera_feed():
+    """Ensure AirSim capture and the frame push server are started"""
     try:
-        # Ensure AirSim capture is started
         airsim_handler.start_capture()
-        
-        # Get latest frame
-        latest_frame = airsim_handler.get_latest_frame()
-        
-        if latest_frame is not None:
-            return latest_frame
-        return None
+        push_server.start()
     except Exception as e:
-        print(f"Error updating camera feed: {e}")
-        return None
+        print(f"Error starting camera feed: {e}")
 
 def main():
     # Create Gradio interface
@@ -238,18 +153,15 @@ def main():
         # Full Dashboard HTML
         dashboard_html = gr.HTML(create_dashboard())
         
-        # Camera feed update
-        camera_feed = gr.Image(label="Drone Camera Feed")
+        # Camera feed, filled by the pushed frames
+        camera_feed = gr.HTML(label="Drone Camera Feed", elem_id="camera_feed")
         
         # Interactive Map
         interactive_map = gr.HTML(label="Drone Deployment Map")
         
         # Start button to begin drone feed
         start_btn = gr.Button("Start Drone Feed")
-        start_btn.click(
-            fn=update_camera_feed, 
-            outputs=camera_feed
-        )
+        start_btn.click(fn=start_camera_feed)
         
         # Update map button
         update_map_btn = gr.Button("Update Map")
@@ -258,8 +170,18 @@ def main():
             outputs=interactive_map
         )
         
-        # Periodic update
-        demo.load(update_camera_feed, outputs=camera_feed, every=1)
+        # Per-stage pipeline latency (also served as JSON at /api/latency)
+        latency_table = gr.Dataframe(
+            headers=["Stage", "Frames", "p50 (ms)", "p95 (ms)", "p99 (ms)"],
+            label="Pipeline Latency"
+        )
+        latency_json = gr.JSON(visible=False)
+
+        # Frames arrive over the push channel; the timer only retries the AirSim connection
+        demo.load(None, js=h264_js("camera_feed") if h264_stream else push_js("camera_feed"))
+        demo.load(start_camera_feed, every=5)
+        demo.load(pipeline_latency.summary_rows, outputs=latency_table, every=2)
+        demo.load(pipeline_latency.snapshot, outputs=latency_json, every=2, api_name="latency")
 
     # Launch the demo
     demo.launch(server_name='127.0.0.1', server_port=7860)
@@ -1,100 +1,25 @@
-import airsim
-import numpy as np
-import cv2
-import threading
-import queue
-import time
+import os
+import sys
 import gradio as gr
 
-# AirSim Camera Handler Class
-class AirSimCameraHandler:
-    def __init__(self):
-        self.frame_queue = queue.Queue(maxsize=1)
-        self.stop_event = threading.Event()
-        self.thread = None
-        self.client = None
-
-    def connect_airsim(self):
-        """Establish connection to AirSim"""
-        try:
-            self.client = airsim.MultirotorClient()
-            self.client.confirmConnection()
-            print("AirSim Connected Successfully")
-            return True
-        except Exception as e:
-            print(f"AirSim Connection Error: {e}")
-            return False
-
-    def capture_frames(self):
-        """Thread function to capture frames"""
-        try:
-            while not self.stop_event.is_set():
-                # Capture frame from AirSim
-                responses = self.client.simGetImages([airsim.ImageRequest(
-                    '0', airsim.ImageType.Scene, False, False
-                )])
-
-                if responses and len(responses) > 0:
-                    response = responses[0]
-                    
-                    # Convert to numpy array
-                    img1d = np.frombuffer(response.image_data_uint8, dtype=np.uint8)
-                    
-                    # Reshape and convert color
-                    img_rgb = cv2.cvtColor(
-                        img1d.reshape(response.height, response.width, 3), 
-                        cv2.COLOR_BGR2RGB
-                    )
-                    
-                    # Clear queue if full
-                    try:
-                        self.frame_queue.get_nowait()
-                    except queue.Empty:
-                        pass
-                    
-                    self.frame_queue.put(img_rgb)
-                
-                time.sleep(0.1)  # Prevent overwhelming
-        except Exception as e:
-            print(f"Frame Capture Error: {e}")
-
-    def start_capture(self):
-        """Start the camera capture thread"""
-        # Ensure AirSim connection is established
-        if not self.client:
-            if not self.connect_airsim():
-                return False
-        
-        # If thread is already running, don't start again
-        if self.thread and self.thread.is_alive():
-            return True
-        
-        # Clear any existing stop event
-        self.stop_event.clear()
-        
-        # Create and start the thread
-        self.thread = threading.Thread(target=self.capture_frames)
-        self.thread.daemon = True
-        self.thread.start()
-        return True
-
-    def stop_capture(self):
-        """Stop the camera capture thread"""
-        if self.thread:
-            self.stop_event.set()
-            self.thread.join()
-            self.thread = None
-
-    def get_latest_frame(self):
-        """Get the latest frame from the queue"""
-        try:
-            return self.frame_queue.get_nowait()
-        except queue.Empty:
-            return None
+# Shared modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from airsim_camera import AirSimCameraHandler
 
 # Global AirSim handler
 airsim_handler = AirSimCameraHandler()
 
+def get_live_feed():
+    """Start capture if needed and return the newest frame, waiting for the first one"""
+    try:
+        if not airsim_handler.start_capture():
+            return None
+        # Right after starting, the ring is still empty until the first capture lands
+        return airsim_handler.wait_for_frame(timeout=5.0)[1]
+    except Exception as e:
+        print(f"Error getting live feed: {e}")
+        return None
+
 def create_interactive_map():
     """Generate an OpenLayers-based interactive map"""
     map_html = """
@@ -174,7 +99,7 @@ def main():
 
         update_feed_btn = gr.Button("Get Live Feed")
         update_feed_btn.click(
-            fn=lambda: airsim_handler.get_latest_frame(),
+            fn=get_live_feed,
             outputs=live_feed
         )
 
@@ -1,3 +1,5 @@
+import os
+import sys
 import gradio as gr
 import airsim
 import numpy as np
@@ -8,26 +10,35 @@ import leafmap.foliumap as leafmap
 import threading
 import time
 
+# Shared modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from airsim_connection import ConnectionManager
+
 class AirSimHandler:
     def __init__(self):
+        # Each Gradio worker thread gets its own RPC client, so a slow camera
+        # poll can't block the GPS poll or the control buttons
+        self.connection = ConnectionManager(timeout=5.0)
+        # Control calls .join() on flight maneuvers, which legitimately take a while
+        self.control = ConnectionManager(timeout=60.0)
+        self.current_position = None
+        self.is_flying = False
         try:
-            self.client = airsim.MultirotorClient()
-            self.client.confirmConnection()
-            self.client.enableApiControl(True)
-            self.current_position = None
-            self.is_flying = False
+            self.control.call('enableApiControl', True)
             print("AirSim connection established successfully.")
         except Exception as e:
             print(f"Error connecting to AirSim: {e}")
-            self.client = None
 
     def get_latest_frame(self):
         """Retrieve the latest camera frame from the drone"""
         try:
-            image = self.client.simGetCameraImage(0, airsim.ImageType.Scene)
-            if image:
+            responses = self.connection.call('simGetImages', [airsim.ImageRequest(
+                '0', airsim.ImageType.Scene, False, False
+            )])
+            if responses:
+                image = responses[0]
                 raw_img = np.frombuffer(image.image_data_uint8, dtype=np.uint8)
-                return Image.fromarray(raw_img.reshape(image.height, image.width, 3))
+                return Image.fromarray(raw_img.reshape(image.height, image.width, 3)[:, :, ::-1])
             return None
         except Exception as e:
             print(f"Error getting camera frame: {e}")
@@ -36,8 +47,8 @@ class AirSimHandler:
     def get_drone_position(self):
         """Get current GPS coordinates of the drone"""
         try:
-            gps_data = self.client.getGpsData(gps_name='')
-            return [gps_data.gnss.latitude, gps_data.gnss.longitude]
+            gps_data = self.connection.call('getGpsData', gps_name='')
+            return [gps_data.gnss.geo_point.latitude, gps_data.gnss.geo_point.longitude]
         except Exception as e:
             print(f"Error getting drone position: {e}")
             return None
@@ -45,37 +56,43 @@ class AirSimHandler:
     def takeoff(self, altitude=10):
         """Initiate drone takeoff"""
         try:
-            self.client.armDisarm(True)
-            self.client.takeoffAsync().join()
+            client = self.control.client()
+            client.armDisarm(True)
+            client.takeoffAsync().join()
             self.is_flying = True
             print(f"Drone taking off to {altitude} meters")
         except Exception as e:
             print(f"Takeoff error: {e}")
+            self.control.reset()
 
     def land(self):
         """Land the drone"""
         try:
-            self.client.landAsync().join()
-            self.client.armDisarm(False)
+            client = self.control.client()
+            client.landAsync().join()
+            client.armDisarm(False)
             self.is_flying = False
             print("Drone landing")
         except Exception as e:
             print(f"Landing error: {e}")
+            self.control.reset()
 
     def move_drone(self, direction, distance=10):
         """Move drone in specified direction"""
         try:
+            client = self.control.client()
             if direction == 'forward':
-                self.client.moveByVelocityAsync(distance, 0, 0, 1).join()
+                client.moveByVelocityAsync(distance, 0, 0, 1).join()
             elif direction == 'backward':
-                self.client.moveByVelocityAsync(-distance, 0, 0, 1).join()
+                client.moveByVelocityAsync(-distance, 0, 0, 1).join()
             elif direction == 'left':
-                self.client.moveByVelocityAsync(0, -distance, 0, 1).join()
+                client.moveByVelocityAsync(0, -distance, 0, 1).join()
             elif direction == 'right':
-                self.client.moveByVelocityAsync(0, distance, 0, 1).join()
+                client.moveByVelocityAsync(0, distance, 0, 1).join()
             print(f"Moving drone {direction}")
         except Exception as e:
             print(f"Movement error: {e}")
+            self.control.reset()
 
 class DroneDashboard:
     def __init__(self):
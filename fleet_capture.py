@@ -0,0 +1,143 @@
+import airsim
+import numpy as np
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from airsim_connection import ConnectionManager
+from capture_pacing import CapturePacer
+from frame_decode import TRANSFER_PNG, TRANSFER_RAW, write_response
+from frame_ring import FrameRing
+from pipeline_latency import FRAME_META_DTYPE
+
+# Image types AirSim returns as float32 depth maps rather than uint8 RGB
+FLOAT_IMAGE_TYPES = {
+    airsim.ImageType.DepthPlanar,
+    airsim.ImageType.DepthPerspective,
+    airsim.ImageType.DepthVis,
+    airsim.ImageType.DisparityNormalized,
+}
+
+# Fleet Capture Engine: one batched simGetImages per vehicle, all vehicles in parallel
+class FleetCaptureEngine:
+    def __init__(self, vehicles, cameras=('0',), image_types=(airsim.ImageType.Scene,),
+                 num_slots=8, target_fps=30, idle_fps=1, idle_after=5.0,
+                 transfer_mode=TRANSFER_RAW, connection=None):
+        # One batched RPC carries every camera, so there is no per-frame mode to adapt
+        if transfer_mode not in (TRANSFER_RAW, TRANSFER_PNG):
+            raise ValueError(f"transfer_mode must be one of {(TRANSFER_RAW, TRANSFER_PNG)}")
+        self.vehicles = list(vehicles)
+        self.cameras = list(cameras)
+        self.image_types = list(image_types)
+        self.pacer = CapturePacer(target_fps, idle_fps, idle_after)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.executor = None
+        # msgpack-rpc clients are not thread-safe, so every pool thread gets its own
+        self.connection = connection or ConnectionManager()
+
+        # One request list per vehicle, and the stream key each response maps to
+        self.stream_keys = [
+            (camera, image_type) for camera in self.cameras for image_type in self.image_types
+        ]
+        # Float images cannot be compressed; everything else follows transfer_mode
+        self.requests = [
+            airsim.ImageRequest(
+                camera, image_type, image_type in FLOAT_IMAGE_TYPES,
+                transfer_mode == TRANSFER_PNG and image_type not in FLOAT_IMAGE_TYPES
+            )
+            for camera, image_type in self.stream_keys
+        ]
+
+        # Per-drone/per-camera/per-type frame rings
+        self.streams = {}
+        for vehicle in self.vehicles:
+            for camera, image_type in self.stream_keys:
+                dtype = np.float32 if image_type in FLOAT_IMAGE_TYPES else np.uint8
+                self.streams[(vehicle, camera, image_type)] = FrameRing(
+                    num_slots, dtype=dtype, meta_dtype=FRAME_META_DTYPE
+                )
+
+    def fetch_vehicle(self, vehicle):
+        """Fetch every camera/type for one vehicle in a single RPC and demultiplex it"""
+        rpc_start = time.time()
+        try:
+            responses = self.connection.call('simGetImages', self.requests, vehicle_name=vehicle)
+        except Exception as e:
+            # The failed client is dropped; this vehicle reconnects on the next tick
+            print(f"Frame Capture Error ({vehicle}): {e}")
+            return 0
+        rpc_end = time.time()
+
+        # Responses come back in request order
+        captured = 0
+        for (camera, image_type), response in zip(self.stream_keys, responses or []):
+            if response.width == 0 or response.height == 0:
+                continue
+            # One corrupt image costs that frame only, not the capture thread
+            try:
+                write_response(self.streams[(vehicle, camera, image_type)], response, rpc_start, rpc_end)
+            except Exception as e:
+                print(f"Frame Decode Error ({vehicle}): {e}")
+                continue
+            captured += 1
+        return captured
+
+    def capture_frames(self):
+        """Thread function: one round of concurrent per-vehicle fetches per tick"""
+        while not self.stop_event.is_set():
+            captured = list(self.executor.map(self.fetch_vehicle, self.vehicles))
+
+            # Whole fleet unreachable: back off instead of hammering a dead simulator
+            if not any(captured):
+                self.connection.backoff(self.stop_event)
+                continue
+            self.pacer.wait(self.stop_event)
+
+    def start_capture(self):
+        """Start the fleet capture thread and its RPC worker pool"""
+        if self.thread and self.thread.is_alive():
+            return True
+
+        self.stop_event.clear()
+        self.executor = ThreadPoolExecutor(
+            max_workers=len(self.vehicles), thread_name_prefix='fleet-capture'
+        )
+        self.thread = threading.Thread(target=self.capture_frames)
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+
+    def stop_capture(self):
+        """Stop the fleet capture thread and release the worker pool"""
+        if self.thread:
+            self.stop_event.set()
+            self.pacer.wake()
+            self.thread.join()
+            self.thread = None
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def stream(self, vehicle, camera='0', image_type=airsim.ImageType.Scene):
+        """Return the FrameRing for one vehicle/camera/image type"""
+        return self.streams[(vehicle, camera, image_type)]
+
+    def get_latest_frame(self, vehicle, camera='0', image_type=airsim.ImageType.Scene):
+        """Get a read-only view of the latest frame of one stream"""
+        self.pacer.mark_read()
+        return self.stream(vehicle, camera, image_type).read_latest()[1]
+
+    def read_latest(self, vehicle, camera='0', image_type=airsim.ImageType.Scene):
+        """Get (seq, read-only frame) for one stream"""
+        self.pacer.mark_read()
+        return self.stream(vehicle, camera, image_type).read_latest()
+
+    def wait_for_frame(self, vehicle, after_seq=-1, timeout=None, camera='0', image_type=airsim.ImageType.Scene):
+        """Block until one stream has a frame newer than after_seq"""
+        self.pacer.mark_read()
+        return self.stream(vehicle, camera, image_type).wait_for_frame(after_seq, timeout)
+
+    def request_burst(self, duration=2.0):
+        """Capture the whole fleet at full simulator rate for a while"""
+        self.pacer.request_burst(duration)
@@ -0,0 +1,467 @@
+"""Flight recorder: frames, telemetry and detections in rolling segment files.
+
+A recording directory holds:
+
+  segment_000000.bin ...  append-only records: header (magic, kind, timestamp, length) + payload
+  index.bin               fixed-width record index (timestamp, kind, segment, offset, length)
+  time_index.bin          first record number of every `bucket` seconds since the start
+  frame_index.bin ...     record numbers of each kind, in order (also telemetry, detections)
+
+All index files are memory-mapped. Scrubbing to a timestamp reads one time_index slot,
+binary-searches that kind's record numbers and reads a single record, so it costs the
+same at minute one or hour six, however sparse the kind, and never decodes anything but
+the frame asked for:
+
+    python flight_recorder.py info recordings
+    python flight_recorder.py frame recordings --offset 3600 --output frame.jpg
+"""
+import argparse
+import collections
+import json
+import os
+import struct
+import threading
+import time
+import numpy as np
+import cv2
+
+from detection_overlay import detection_payload
+from detection_worker import frame_time
+
+RECORD_MAGIC = b'FRC1'
+# magic, kind, timestamp, payload length
+RECORD_HEADER = struct.Struct('<4sBdI')
+
+INDEX_MAGIC = b'FRIDX002'
+# magic, record count, start time, bucket seconds, record count of each kind (padded to 64 bytes)
+INDEX_HEADER = struct.Struct('<8sQdd3Q')
+INDEX_HEADER_SIZE = 64
+INDEX_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('kind', 'u1'),
+    ('segment', '<u4'),
+    ('offset', '<u8'),
+    ('length', '<u4'),
+])
+
+KIND_FRAME = 1
+KIND_TELEMETRY = 2
+KIND_DETECTIONS = 3
+KINDS = {'frame': KIND_FRAME, 'telemetry': KIND_TELEMETRY, 'detections': KIND_DETECTIONS}
+
+# Index files grow by doubling from this many entries
+INITIAL_CAPACITY = 1 << 16
+# Records (of the kind asked for) scanned back for one at or before a timestamp; only
+# has to cover records written slightly out of time order
+SCAN_WINDOW = 4096
+
+
+def kind_index_name(kind):
+    return f"{next(name for name, value in KINDS.items() if value == kind)}_index.bin"
+
+
+def segment_path(directory, number):
+    return os.path.join(directory, f"segment_{number:06d}.bin")
+
+
+def grow_file(path, size):
+    """Extend a file to at least `size` bytes (sparse where the filesystem allows)"""
+    with open(path, 'ab') as f:
+        if f.tell() < size:
+            f.truncate(size)
+
+
+# Writes one mission into a recording directory; safe to call from several threads.
+# With a camera handler it also samples frames (and GPS) on its own thread.
+class FlightRecorder:
+    def __init__(self, directory, camera_handler=None, record_fps=10, quality=80,
+                 segment_bytes=256 * 1024 * 1024, segment_seconds=600.0, max_segments=None,
+                 bucket=0.1, telemetry_every=1.0, vehicle_name='', max_pending=256):
+        self.directory = directory
+        self.camera_handler = camera_handler
+        self.record_fps = record_fps
+        self.quality = quality
+        # A new segment starts once the current one is this big or this old
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        # Oldest segments beyond this many are deleted (None keeps everything)
+        self.max_segments = max_segments
+        self.bucket = bucket
+        self.telemetry_every = telemetry_every
+        self.vehicle_name = vehicle_name
+        # (result, status) of detections waiting for the recording thread; the oldest go
+        # first if it falls behind
+        self.pending = collections.deque(maxlen=max_pending)
+        self.lock = threading.Lock()
+        self.segment = None
+        self.segment_number = -1
+        self.segment_started = None
+        self.index = None
+        self.time_index = None
+        # Kind -> memory-mapped record numbers of that kind, and how many there are
+        self.kind_index = {}
+        self.kind_counts = {kind: 0 for kind in KINDS.values()}
+        self.count = 0
+        self.start_time = None
+        self.last_time = None
+        self.filled_buckets = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    # --- Writing -------------------------------------------------------------------
+
+    def open(self):
+        """Create the directory and index files, or resume an existing recording"""
+        with self.lock:
+            if self.index is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            index_path = os.path.join(self.directory, 'index.bin')
+            if os.path.exists(index_path):
+                with open(index_path, 'rb') as f:
+                    magic, count, start_time, bucket, *kind_counts = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+                if magic != INDEX_MAGIC:
+                    raise ValueError(f"{index_path} is not a flight recorder index")
+                self.count, self.start_time, self.bucket = count, start_time or None, bucket
+                self.kind_counts = dict(zip(KINDS.values(), kind_counts))
+            else:
+                grow_file(index_path, INDEX_HEADER_SIZE + INITIAL_CAPACITY * INDEX_DTYPE.itemsize)
+                with open(index_path, 'r+b') as f:
+                    f.write(self._header())
+            time_path = os.path.join(self.directory, 'time_index.bin')
+            if not os.path.exists(time_path):
+                grow_file(time_path, INITIAL_CAPACITY * 8)
+                np.memmap(time_path, dtype='<i8', mode='r+').fill(-1)
+            for kind in KINDS.values():
+                grow_file(os.path.join(self.directory, kind_index_name(kind)), INITIAL_CAPACITY * 8)
+            self._map()
+            if self.count:
+                last = self.index[self.count - 1]
+                self.last_time = float(last['timestamp'])
+                self.segment_number = int(last['segment'])
+                self.filled_buckets = int(np.count_nonzero(self.time_index >= 0))
+            self._rotate()
+
+    def _map(self):
+        index_path = os.path.join(self.directory, 'index.bin')
+        self.index_header = np.memmap(index_path, dtype='u1', mode='r+', shape=(INDEX_HEADER_SIZE,))
+        self.index = np.memmap(index_path, dtype=INDEX_DTYPE, mode='r+', offset=INDEX_HEADER_SIZE)
+        self.time_index = np.memmap(os.path.join(self.directory, 'time_index.bin'), dtype='<i8', mode='r+')
+        self.kind_index = {
+            kind: np.memmap(os.path.join(self.directory, kind_index_name(kind)), dtype='<i8', mode='r+')
+            for kind in KINDS.values()
+        }
+
+    def _header(self):
+        return INDEX_HEADER.pack(INDEX_MAGIC, self.count, self.start_time or 0.0, self.bucket,
+                                 *(self.kind_counts[kind] for kind in KINDS.values()))
+
+    def _flush(self):
+        for mapped in [self.index, self.time_index, self.index_header, *self.kind_index.values()]:
+            mapped.flush()
+
+    def _grow(self, name, entries, itemsize, header=0, fill=None):
+        """Double a memory-mapped index file until it holds `entries`"""
+        path = os.path.join(self.directory, name)
+        capacity = (os.path.getsize(path) - header) // itemsize
+        if entries <= capacity:
+            return
+        while capacity < entries:
+            capacity *= 2
+        self._flush()
+        old_size = os.path.getsize(path)
+        grow_file(path, header + capacity * itemsize)
+        if fill is not None:
+            with open(path, 'r+b') as f:
+                f.seek(old_size)
+                f.write(np.full((header + capacity * itemsize - old_size) // itemsize, fill, '<i8').tobytes())
+        self._map()
+
+    def _rotate(self, timestamp=None):
+        """Start the next segment file and drop the oldest beyond max_segments"""
+        if self.segment is not None:
+            self.segment.close()
+        self.segment_number += 1
+        self.segment = open(segment_path(self.directory, self.segment_number), 'ab')
+        self.segment_started = timestamp
+        if self.max_segments:
+            stale = segment_path(self.directory, self.segment_number - self.max_segments)
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    def append(self, kind, timestamp, payload):
+        """Write one record and index it; returns its record number"""
+        self.open()
+        with self.lock:
+            # A segment's age counts from its first record, in the records' own clock
+            if self.segment_started is None:
+                self.segment_started = timestamp
+            if (self.segment.tell() >= self.segment_bytes or
+                    timestamp - self.segment_started >= self.segment_seconds):
+                self._rotate(timestamp)
+            offset = self.segment.tell()
+            self.segment.write(RECORD_HEADER.pack(RECORD_MAGIC, kind, timestamp, len(payload)))
+            self.segment.write(payload)
+            # Readers may be another process: the bytes go out before the index points at them
+            self.segment.flush()
+
+            if self.start_time is None:
+                self.start_time = timestamp
+            record = self.count
+            self._grow('index.bin', record + 1, INDEX_DTYPE.itemsize, INDEX_HEADER_SIZE)
+            self.index[record] = (timestamp, kind, self.segment_number, offset + RECORD_HEADER.size, len(payload))
+            kind_name, kind_count = kind_index_name(kind), self.kind_counts[kind]
+            self._grow(kind_name, kind_count + 1, 8)
+            self.kind_index[kind][kind_count] = record
+            self.kind_counts[kind] = kind_count + 1
+
+            # Every bucket that started since the previous record begins at this one;
+            # records slightly out of order (telemetry vs frames) index at the latest time
+            self.last_time = timestamp if self.last_time is None else max(self.last_time, timestamp)
+            bucket = int((self.last_time - self.start_time) / self.bucket)
+            if bucket >= self.filled_buckets:
+                self._grow('time_index.bin', bucket + 1, 8, fill=-1)
+                self.time_index[self.filled_buckets:bucket + 1] = record
+                self.filled_buckets = bucket + 1
+
+            # Publishing the new counts last commits the record
+            self.count = record + 1
+            self.index_header[:INDEX_HEADER.size] = np.frombuffer(self._header(), dtype='u1')
+            return record
+
+    def record_frame(self, frame, timestamp=None):
+        """JPEG-encode an RGB frame into the recording"""
+        ok, encoded = cv2.imencode('.jpg', cv2.cvtColor(frame, cv2.COLOR_RGB2BGR),
+                                   [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise ValueError("Could not encode frame")
+        return self.append(KIND_FRAME, time.time() if timestamp is None else timestamp, encoded.tobytes())
+
+    def record_telemetry(self, values, timestamp=None):
+        """Record a JSON-able telemetry dict"""
+        return self.append(KIND_TELEMETRY, time.time() if timestamp is None else timestamp,
+                           json.dumps(values).encode())
+
+    def record_detections(self, result, status='ready'):
+        """Record a DetectionResult as its overlay payload (with the detector's status), stamped
+        with its frame's time. While the recording thread runs it is queued for that thread,
+        so the detector never waits on the disk; otherwise it is written now."""
+        if result is None:
+            return None
+        if self.thread and self.thread.is_alive():
+            self.pending.append((result, status))
+            return None
+        return self.write_detections(result, status)
+
+    def write_detections(self, result, status='ready'):
+        payload = json.dumps(detection_payload(result, status)).encode()
+        return self.append(KIND_DETECTIONS, frame_time(result.meta), payload)
+
+    def write_pending(self):
+        """Write the detections queued by record_detections"""
+        while self.pending:
+            try:
+                result, status = self.pending.popleft()
+            except IndexError:
+                return
+            self.write_detections(result, status)
+
+    def poll_telemetry(self):
+        """Record the vehicle's GPS fix"""
+        gps = self.camera_handler.connection.call('getGpsData', vehicle_name=self.vehicle_name)
+        point = gps.gnss.geo_point
+        self.record_telemetry({
+            'vehicle': self.vehicle_name,
+            'latitude': point.latitude,
+            'longitude': point.longitude,
+            'altitude': point.altitude,
+        })
+
+    def start(self):
+        """Start sampling the camera handler on a background thread"""
+        if self.camera_handler is None or (self.thread and self.thread.is_alive()):
+            return
+        self.open()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        try:
+            self.write_pending()
+        except Exception as e:
+            print(f"Flight Recorder Error: {e}")
+
+    def run(self):
+        """Thread function: record the newest frame at record_fps, GPS every telemetry_every,
+        and the queued detections"""
+        period = 1.0 / self.record_fps
+        # Straight from the ring: recording alone should not hold capture at the active rate
+        frame_ring = self.camera_handler.frame_ring
+        last_seq = -1
+        next_telemetry = 0.0
+        while not self.stop_event.is_set():
+            started = time.monotonic()
+            try:
+                seq, frame = frame_ring.read_latest()
+                if frame is not None and seq != last_seq:
+                    frame = frame.copy()
+                    # The slot may have been rewritten while we copied it
+                    if frame_ring.is_valid(seq):
+                        self.record_frame(frame, frame_time(frame_ring.read_meta(seq)))
+                        last_seq = seq
+                self.write_pending()
+                if self.telemetry_every and started >= next_telemetry:
+                    next_telemetry = started + self.telemetry_every
+                    self.poll_telemetry()
+            except Exception as e:
+                print(f"Flight Recorder Error: {e}")
+            self.stop_event.wait(max(0.0, period - (time.monotonic() - started)))
+
+    def close(self):
+        self.stop()
+        with self.lock:
+            if self.segment is not None:
+                self.segment.close()
+                self.segment = None
+            if self.index is not None:
+                self._flush()
+                self.index = self.time_index = self.index_header = None
+                self.kind_index = {}
+
+
+# Random access into a recording, including one still being written by another process
+class FlightReader:
+    def __init__(self, directory):
+        self.directory = directory
+        self.segments = {}
+        self.refresh()
+
+    def refresh(self):
+        """Re-map the index files to pick up records written since"""
+        index_path = os.path.join(self.directory, 'index.bin')
+        with open(index_path, 'rb') as f:
+            magic, count, start_time, bucket, *kind_counts = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"{index_path} is not a flight recorder index")
+        self.count, self.start_time, self.bucket = count, start_time, bucket
+        self.index = np.memmap(index_path, dtype=INDEX_DTYPE, mode='r', offset=INDEX_HEADER_SIZE)[:count]
+        self.time_index = np.memmap(os.path.join(self.directory, 'time_index.bin'), dtype='<i8', mode='r')
+        self.kind_index = {
+            kind: np.memmap(os.path.join(self.directory, kind_index_name(kind)), dtype='<i8', mode='r')[:kind_count]
+            for kind, kind_count in zip(KINDS.values(), kind_counts)
+        }
+
+    def span(self):
+        """(first, last) record timestamps, or (None, None) for an empty recording"""
+        if not self.count:
+            return None, None
+        return self.start_time, float(self.index['timestamp'][:self.count].max())
+
+    def locate(self, timestamp, kind=None):
+        """Record number of the latest record (of a kind) at or before timestamp, or None"""
+        if not self.count or timestamp < self.start_time:
+            return None
+        bucket = int((timestamp - self.start_time) / self.bucket)
+        # First record of the following bucket bounds the search; past the end, the last record
+        end = self.time_index[bucket + 1] if bucket + 1 < len(self.time_index) else -1
+        end = self.count if end < 0 or end > self.count else int(end) + 1
+        if kind is None:
+            first = max(0, end - SCAN_WINDOW)
+            hits = np.flatnonzero(self.index['timestamp'][first:end] <= timestamp)
+            return int(first + hits[-1]) if len(hits) else None
+        # That kind's own records before the bound, however many others came in between
+        records = self.kind_index[kind]
+        stop = int(np.searchsorted(records, end))
+        candidates = records[max(0, stop - SCAN_WINDOW):stop]
+        hits = np.flatnonzero(self.index['timestamp'][candidates] <= timestamp)
+        return int(candidates[hits[-1]]) if len(hits) else None
+
+    def read(self, record):
+        """(timestamp, kind, payload bytes) of one record, or None if its segment was rolled off"""
+        entry = self.index[record]
+        segment = int(entry['segment'])
+        f = self.segments.get(segment)
+        if f is None:
+            path = segment_path(self.directory, segment)
+            if not os.path.exists(path):
+                return None
+            f = self.segments[segment] = open(path, 'rb')
+        f.seek(int(entry['offset']))
+        return float(entry['timestamp']), int(entry['kind']), f.read(int(entry['length']))
+
+    def read_at(self, timestamp, kind):
+        record = self.locate(timestamp, kind)
+        return None if record is None else self.read(record)
+
+    def frame_at(self, timestamp):
+        """(timestamp, RGB frame) shown at a moment of the flight, or None"""
+        found = self.read_at(timestamp, KIND_FRAME)
+        if found is None:
+            return None
+        bgr = cv2.imdecode(np.frombuffer(found[2], np.uint8), cv2.IMREAD_COLOR)
+        return found[0], cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
+    def telemetry_at(self, timestamp):
+        found = self.read_at(timestamp, KIND_TELEMETRY)
+        return None if found is None else (found[0], json.loads(found[2]))
+
+    def detections_at(self, timestamp):
+        found = self.read_at(timestamp, KIND_DETECTIONS)
+        return None if found is None else (found[0], json.loads(found[2]))
+
+    def records(self, start, end, kind=None):
+        """(timestamp, kind, payload) of records from start to end, in recording order"""
+        first = self.locate(start) or 0
+        for record in range(first, self.count):
+            entry = self.index[record]
+            if entry['timestamp'] > end:
+                break
+            if entry['timestamp'] >= start and (kind is None or entry['kind'] == kind):
+                found = self.read(record)
+                if found is not None:
+                    yield found
+
+    def close(self):
+        for f in self.segments.values():
+            f.close()
+        self.segments = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a flight recording")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    info_parser = subparsers.add_parser('info', help="time span and record counts")
+    info_parser.add_argument('directory')
+    frame_parser = subparsers.add_parser('frame', help="save the frame shown at a moment")
+    frame_parser.add_argument('directory')
+    frame_parser.add_argument('--offset', type=float, default=0.0, help="seconds since the recording started")
+    frame_parser.add_argument('--output', default='frame.jpg')
+    args = parser.parse_args()
+
+    reader = FlightReader(args.directory)
+    if args.command == 'info':
+        first, last = reader.span()
+        if first is None:
+            print("Empty recording")
+            return
+        kinds = np.bincount(reader.index['kind'], minlength=len(KINDS) + 1)
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(first))}  {last - first:.1f} s")
+        for name, kind in KINDS.items():
+            print(f"  {name:11s} {kinds[kind]}")
+        return
+
+    found = reader.frame_at(reader.start_time + args.offset)
+    if found is None:
+        raise SystemExit("No frame at that time")
+    timestamp, frame = found
+    cv2.imwrite(args.output, cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+    print(f"Frame at +{timestamp - reader.start_time:.2f} s written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
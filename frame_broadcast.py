@@ -0,0 +1,361 @@
+import asyncio
+import threading
+import time
+import airsim
+import cv2
+import numpy as np
+
+from airsim_connection import ConnectionManager
+from capture_pacing import CapturePacer
+from encode_ladder import encode_ladder
+from pipeline_latency import pipeline_latency
+
+PNG_MAGIC = b'\x89PNG'
+
+# Consecutive measurements a viewer must afford a better rung before it moves up
+UPGRADE_AFTER = 10
+
+
+def content_type(data):
+    """MIME type of an encoded frame (simGetImage returns PNG, re-encoders may give JPEG)"""
+    return b'image/png' if data[:4] == PNG_MAGIC else b'image/jpeg'
+
+
+def multipart_chunk(data, boundary=b'frame'):
+    """One multipart/x-mixed-replace part carrying an encoded frame"""
+    return (b'--' + boundary + b'\r\nContent-Type: ' + content_type(data) +
+            b'\r\nContent-Length: ' + str(len(data)).encode() + b'\r\n\r\n' + data + b'\r\n')
+
+
+def pick_rung(frames, rung):
+    """(data, chunk) of the wanted rung, else the nearest one encoded (smaller on a tie)"""
+    if rung in frames:
+        return frames[rung]
+    return frames[min(frames, key=lambda index: (abs(index - rung), -index))]
+
+
+# Per-viewer view of a broadcaster: own frame rate cap and ladder rung, always the newest frame
+class Subscriber:
+    def __init__(self, broadcaster, max_fps=None, timeout=5.0, rung=None):
+        self.broadcaster = broadcaster
+        self.period = 1.0 / max_fps if max_fps else 0.0
+        self.timeout = timeout
+        self.last_seq = -1
+        self.next_due = 0.0
+        self.sent = 0
+        # Frames published while this viewer was still writing the previous one
+        self.dropped = 0
+        # A pinned rung, or None to follow the measured throughput from the top rung down
+        self.adaptive = rung is None
+        self.rung = broadcaster.clamp_rung(rung or 0)
+        self.throughput = 0.0
+        self.upgrades = 0
+
+    def delay(self):
+        """Seconds until this viewer's next frame is due"""
+        return self.next_due - time.monotonic()
+
+    def advance(self, seq):
+        """Count a frame as sent (and any it skipped as dropped), then schedule the next one"""
+        if self.last_seq >= 0:
+            self.dropped += seq - self.last_seq - 1
+        self.last_seq = seq
+        self.sent += 1
+        self.next_due = max(self.next_due + self.period, time.monotonic()) if self.period else 0.0
+
+    def fps(self):
+        return 1.0 / self.period if self.period else self.broadcaster.pacer.target_fps
+
+    def record_send(self, size, seconds):
+        """Feed one frame's delivery time into the throughput estimate and re-pick the rung.
+        Drops a rung as soon as the link can't carry it, climbs one only after it could for a while."""
+        rate = size / max(seconds, 1e-3)
+        self.throughput = rate if not self.throughput else 0.8 * self.throughput + 0.2 * rate
+        ladder = self.broadcaster.ladder
+        if not self.adaptive or ladder is None:
+            return
+        target = ladder.choose(self.throughput, self.fps())
+        if target > self.rung:
+            self.rung, self.upgrades = target, 0
+        elif target < self.rung:
+            self.upgrades += 1
+            if self.upgrades >= UPGRADE_AFTER:
+                self.rung, self.upgrades = self.rung - 1, 0
+        else:
+            self.upgrades = 0
+
+    def next_frame(self):
+        """Block until a newer frame is due for this viewer; (seq, encoded frame, chunk) or None"""
+        delay = self.delay()
+        if delay > 0:
+            time.sleep(delay)
+        frame = self.broadcaster.wait_for_frame(self.last_seq, self.timeout, self.rung)
+        if frame is not None:
+            self.advance(frame[0])
+        return frame
+
+    def chunks(self):
+        """Multipart chunks for a streaming response, until the client goes away"""
+        self.broadcaster.add_subscriber(self)
+        try:
+            while True:
+                frame = self.next_frame()
+                if frame is not None:
+                    # The generator resumes once the server has written the chunk out
+                    started = time.monotonic()
+                    yield frame[2]
+                    self.record_send(len(frame[2]), time.monotonic() - started)
+        finally:
+            self.broadcaster.remove_subscriber(self)
+
+
+# Subscriber for a coroutine stream: waits on the event loop instead of holding a thread
+class AsyncSubscriber(Subscriber):
+    def __init__(self, feed, max_fps=None, timeout=5.0, rung=None):
+        super().__init__(feed.broadcaster, max_fps, timeout, rung)
+        self.feed = feed
+
+    async def next_frame(self):
+        """Wait until a newer frame is due for this viewer; (seq, encoded frame, chunk) or None"""
+        delay = self.delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        frame = await self.feed.wait_for_frame(self.last_seq, self.timeout, self.rung)
+        if frame is not None:
+            self.advance(frame[0])
+        return frame
+
+    async def chunks(self, raw=False):
+        """Multipart chunks (or bare encoded frames if raw) until the consumer stops iterating"""
+        self.broadcaster.add_subscriber(self)
+        try:
+            while True:
+                frame = await self.next_frame()
+                if frame is not None:
+                    data = frame[1] if raw else frame[2]
+                    started = time.monotonic()
+                    yield data
+                    self.record_send(len(data), time.monotonic() - started)
+        finally:
+            self.broadcaster.remove_subscriber(self)
+
+
+# Mirror of a broadcaster's latest-frame slot inside one event loop: the capture thread
+# hops onto the loop once per frame, however many coroutine viewers are waiting
+class AsyncFrameFeed:
+    def __init__(self, broadcaster, loop=None):
+        self.broadcaster = broadcaster
+        self.loop = loop or asyncio.get_running_loop()
+        self.seq = -1
+        self.frames = {}
+        self.new_frame = asyncio.Event()
+        broadcaster.add_listener(self._on_publish)
+
+    def _on_publish(self, seq, frames):
+        """Called on the capture thread"""
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._publish, seq, frames)
+
+    def _publish(self, seq, frames):
+        self.seq, self.frames = seq, frames
+        # Swap in a fresh event so waiters woken by this frame wait for the next one
+        event, self.new_frame = self.new_frame, asyncio.Event()
+        event.set()
+
+    async def wait_for_frame(self, after_seq=-1, timeout=None, rung=0):
+        """(seq, encoded frame, chunk) for the newest frame after after_seq, or None on timeout"""
+        if self.seq <= after_seq:
+            try:
+                await asyncio.wait_for(self.new_frame.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return (self.seq,) + pick_rung(self.frames, rung)
+
+    def subscribe(self, max_fps=None, timeout=5.0, raw=False, rung=None):
+        """Async chunk iterator for one viewer, capped at max_fps (None: every frame);
+        rung pins a ladder rung, None adapts to the viewer's throughput"""
+        return AsyncSubscriber(self, max_fps, timeout, rung).chunks(raw)
+
+    def close(self):
+        self.broadcaster.remove_listener(self._on_publish)
+
+
+# One capture loop for every MJPEG viewer: each frame is fetched and framed once into a
+# shared latest-frame slot. Viewers that fall behind skip straight to the newest frame
+# instead of queueing, so N viewers cost the simulator the same as one. With a ladder,
+# rung 0 is the simulator's image as-is and smaller rungs are re-encoded for slow viewers.
+class FrameBroadcaster:
+    def __init__(self, camera_name='0', image_type=airsim.ImageType.Scene, vehicle_name='',
+                 target_fps=30, connection=None, ladder=None):
+        self.camera_name = camera_name
+        self.image_type = image_type
+        self.vehicle_name = vehicle_name
+        self.connection = connection or ConnectionManager()
+        self.pacer = CapturePacer(target_fps)
+        self.condition = threading.Condition()
+        self.ladder = ladder
+        self.seq = -1
+        # Ladder rung -> (encoded frame, multipart chunk) of the latest frame
+        self.frames = {}
+        self.subscribers = set()
+        # Callables run with (seq, frames) on the capture thread for every new frame
+        self.listeners = []
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start the capture thread if it is not running"""
+        with self.condition:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.capture_frames, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop the capture thread"""
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+        self.pacer.wake()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def add_subscriber(self, subscriber):
+        with self.condition:
+            self.subscribers.add(subscriber)
+            self.condition.notify_all()
+        self.start()
+
+    def remove_subscriber(self, subscriber):
+        with self.condition:
+            self.subscribers.discard(subscriber)
+
+    def add_listener(self, listener):
+        with self.condition:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self.condition:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+    def subscribe(self, max_fps=None, timeout=5.0, rung=None):
+        """Multipart chunk generator for one viewer, capped at max_fps (None: every frame);
+        rung pins a ladder rung, None adapts to the viewer's throughput"""
+        return Subscriber(self, max_fps, timeout, rung).chunks()
+
+    def clamp_rung(self, rung):
+        count = len(self.ladder.rungs) if self.ladder else 1
+        return min(max(int(rung), 0), count - 1)
+
+    def wanted_rungs(self):
+        """Ladder rungs some viewer is currently on"""
+        with self.condition:
+            return {subscriber.rung for subscriber in self.subscribers} or {0}
+
+    def publish(self, encoded):
+        """Frame encoded images ({rung: bytes}, or bytes for rung 0) once and hand them to every viewer"""
+        if not isinstance(encoded, dict):
+            encoded = {0: encoded}
+        frames = {rung: (data, multipart_chunk(data)) for rung, data in encoded.items()}
+        with self.condition:
+            self.seq += 1
+            self.frames = frames
+            self.condition.notify_all()
+            seq, listeners = self.seq, list(self.listeners)
+        for listener in listeners:
+            try:
+                listener(seq, frames)
+            except Exception as e:
+                print(f"Frame Listener Error: {e}")
+        return seq
+
+    def wait_for_frame(self, after_seq=-1, timeout=None, rung=0):
+        """(seq, encoded frame, chunk) for the newest frame after after_seq, or None on timeout"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.seq > after_seq, timeout):
+                return None
+            return (self.seq,) + pick_rung(self.frames, rung)
+
+    def wait_for_demand(self):
+        """Block the capture thread while nobody is watching; False once stopped"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.subscribers or self.stop_event.is_set())
+        return not self.stop_event.is_set()
+
+    def capture_frames(self):
+        """Thread function: capture while anyone is watching, sleep while nobody is"""
+        while self.wait_for_demand():
+            rpc_start = time.time()
+            try:
+                data = self.connection.call('simGetImage', self.camera_name, self.image_type,
+                                            vehicle_name=self.vehicle_name)
+            except Exception as e:
+                print(f"Frame Broadcast Error: {e}")
+                self.connection.backoff(self.stop_event)
+                continue
+            pipeline_latency.record('rpc', time.time() - rpc_start)
+            self.pacer.mark_read()
+
+            if data:
+                try:
+                    self.publish(self.ladder_frames(bytes(data)))
+                except Exception as e:
+                    print(f"Frame Encode Error: {e}")
+            self.pacer.wait(self.stop_event)
+
+    def ladder_frames(self, data):
+        """The simulator's image as rung 0, plus any smaller rungs a viewer is on"""
+        encoded = {0: data}
+        lower = self.wanted_rungs() - {0}
+        if self.ladder is not None:
+            self.ladder.record_size(0, len(data))
+            if lower:
+                bgr = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                encoded.update(self.ladder.encode(bgr, lower, rgb=False))
+        return encoded
+
+    def stats(self):
+        """Viewer count and per-viewer sent/dropped frame counts, rung and throughput"""
+        with self.condition:
+            subscribers = list(self.subscribers)
+        return {
+            'seq': self.seq,
+            'viewers': len(subscribers),
+            'sent': [subscriber.sent for subscriber in subscribers],
+            'dropped': [subscriber.dropped for subscriber in subscribers],
+            'rungs': [subscriber.rung for subscriber in subscribers],
+            'throughput_kbps': [round(subscriber.throughput * 8 / 1000, 1) for subscriber in subscribers],
+            'rung_bytes': [round(self.ladder.size(i)) for i in range(len(self.ladder.rungs))] if self.ladder else [],
+        }
+
+
+# Broadcaster fed from an AirSimCameraHandler's frame ring instead of its own RPC loop:
+# each new decoded frame is JPEG-encoded once per ladder rung in use, however many
+# viewers receive it
+class RingBroadcaster(FrameBroadcaster):
+    def __init__(self, camera_handler, ladder=None):
+        super().__init__(connection=camera_handler.connection, ladder=ladder or encode_ladder)
+        self.camera_handler = camera_handler
+
+    def capture_frames(self):
+        """Thread function: encode each new ring frame while anyone is watching"""
+        last_seq = -1
+        while self.wait_for_demand():
+            # Also keeps the capture loop at its active rate
+            seq, frame = self.camera_handler.wait_for_frame(last_seq, timeout=1.0)
+            if frame is None:
+                continue
+            try:
+                encoded = self.ladder.encode(frame, self.wanted_rungs())
+            except Exception as e:
+                print(f"Frame Encode Error: {e}")
+                continue
+            # The slot may have been rewritten while we encoded it
+            if not self.camera_handler.frame_ring.is_valid(seq):
+                continue
+            last_seq = seq
+            self.publish(encoded)
+            pipeline_latency.record_delivery(self.camera_handler.read_meta(seq))
@@ -0,0 +1,173 @@
+import collections
+import threading
+import time
+import numpy as np
+import cv2
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline_latency import pipeline_latency
+
+# Transfer modes for simGetImages
+TRANSFER_RAW = 'raw'
+TRANSFER_PNG = 'png'
+TRANSFER_AUTO = 'auto'
+TRANSFER_MODES = (TRANSFER_RAW, TRANSFER_PNG, TRANSFER_AUTO)
+
+
+def response_shape(response):
+    """Slot shape for an AirSim image response: (h, w) float depth or (h, w, 3) RGB"""
+    if response.pixels_as_float:
+        return response.height, response.width
+    return response.height, response.width, 3
+
+
+def decode_into(slot, response):
+    """Decode an AirSim image response (float, raw or compressed) into a slot of response_shape"""
+    # Depth-style images arrive as a flat float list
+    if response.pixels_as_float:
+        slot[...] = np.asarray(response.image_data_float, dtype=np.float32).reshape(slot.shape)
+        return
+    if response.compress:
+        # imdecode sniffs PNG/JPEG from the header; always returns 3-channel BGR
+        encoded = np.frombuffer(response.image_data_uint8, dtype=np.uint8)
+        bgr = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+        if bgr is None:
+            raise ValueError("Could not decode compressed image response")
+    else:
+        bgr = np.frombuffer(response.image_data_uint8, dtype=np.uint8).reshape(
+            response.height, response.width, 3
+        )
+    cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=slot)
+
+
+def stamp_capture(frame_ring, seq, response, rpc_start=0.0, rpc_end=0.0):
+    """Record sim/RPC timestamps on a reserved slot, if the ring carries metadata"""
+    if frame_ring.meta is None:
+        return
+    meta = frame_ring.slot_meta(seq)
+    meta['sim_time'] = response.time_stamp / 1e9
+    meta['rpc_start'] = rpc_start
+    meta['rpc_end'] = rpc_end
+
+
+def commit_decoded(frame_ring, seq):
+    """Publish a decoded slot, stamping and recording its capture-side latency"""
+    if frame_ring.meta is None:
+        frame_ring.commit(seq)
+        return
+    meta = frame_ring.slot_meta(seq)
+    meta['decoded'] = time.time()
+    frame_ring.commit(seq)
+    pipeline_latency.record_capture(meta)
+
+
+def write_response(frame_ring, response, rpc_start=0.0, rpc_end=0.0):
+    """Decode an AirSim image response into the next ring slot on the calling thread"""
+    seq, slot = frame_ring.begin_write(response_shape(response))
+    stamp_capture(frame_ring, seq, response, rpc_start, rpc_end)
+    # A failed decode leaves the reserved slot invalid, never half-written
+    decode_into(slot, response)
+    commit_decoded(frame_ring, seq)
+    return seq
+
+
+# Picks raw vs PNG transfer from measured RPC and decode cost
+class TransferModeSelector:
+    def __init__(self, workers=2, probe_every=300):
+        self.workers = workers
+        self.probe_every = probe_every
+        self.frames = 0
+        self.mode = TRANSFER_RAW
+        # Per-mode moving averages of seconds per frame
+        self.rpc_time = {}
+        self.decode_time = {}
+
+    def _average(self, table, mode, seconds):
+        old = table.get(mode)
+        table[mode] = seconds if old is None else 0.8 * old + 0.2 * seconds
+
+    def record_rpc(self, mode, seconds):
+        """Record how long one simGetImages call took in the given mode"""
+        self._average(self.rpc_time, mode, seconds)
+
+    def record_decode(self, mode, seconds):
+        """Record how long one decode took in the given mode"""
+        self._average(self.decode_time, mode, seconds)
+
+    def frame_cost(self, mode):
+        """Estimated seconds per frame: the RPC is serial, decodes run in parallel"""
+        if mode not in self.rpc_time or mode not in self.decode_time:
+            return None
+        return max(self.rpc_time[mode], self.decode_time[mode] / self.workers)
+
+    def next_mode(self):
+        """Return the mode for the next capture, probing the other mode now and then"""
+        self.frames += 1
+        other = TRANSFER_PNG if self.mode == TRANSFER_RAW else TRANSFER_RAW
+        if other not in self.rpc_time or self.frames % self.probe_every == 0:
+            return other
+        return self.mode
+
+    def update(self):
+        """Switch to whichever mode currently measures cheaper"""
+        costs = {mode: self.frame_cost(mode) for mode in (TRANSFER_RAW, TRANSFER_PNG)}
+        if all(cost is not None for cost in costs.values()):
+            self.mode = min(costs, key=costs.get)
+        return self.mode
+
+
+# Decodes responses on a worker pool and commits them to a FrameRing in capture order
+class DecodePipeline:
+    def __init__(self, frame_ring, workers=2, on_decoded=None):
+        if frame_ring.num_slots < workers + 2:
+            raise ValueError("FrameRing needs at least workers + 2 slots for pipelined decode")
+        self.frame_ring = frame_ring
+        self.workers = workers
+        self.on_decoded = on_decoded
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='frame-decode')
+        self.lock = threading.Lock()
+        self.pending = collections.deque()
+        # Bounds in-flight decodes so reserved slots never lap committed ones
+        self.slots_free = threading.Semaphore(workers)
+
+    def submit(self, response, rpc_start=0.0, rpc_end=0.0):
+        """Queue a response for decoding; blocks while all workers are busy"""
+        # Float images need no colour conversion: nothing worth handing to a worker
+        if response.pixels_as_float:
+            return write_response(self.frame_ring, response, rpc_start, rpc_end)
+
+        self.slots_free.acquire()
+        try:
+            seq, slot = self.frame_ring.begin_write(response_shape(response))
+        except Exception:
+            self.slots_free.release()
+            raise
+        stamp_capture(self.frame_ring, seq, response, rpc_start, rpc_end)
+        entry = [seq, False]
+        with self.lock:
+            self.pending.append(entry)
+        self.executor.submit(self._decode, entry, slot, response)
+        return seq
+
+    def _decode(self, entry, slot, response):
+        """Worker: decode into the reserved slot, then publish every finished frame in order"""
+        start = time.perf_counter()
+        try:
+            decode_into(slot, response)
+            if self.on_decoded:
+                self.on_decoded(response, time.perf_counter() - start)
+        except Exception as e:
+            print(f"Frame Decode Error: {e}")
+            entry[0] = None
+
+        with self.lock:
+            entry[1] = True
+            while self.pending and self.pending[0][1]:
+                seq, _ = self.pending.popleft()
+                if seq is not None:
+                    commit_decoded(self.frame_ring, seq)
+                self.slots_free.release()
+
+    def shutdown(self):
+        """Finish queued decodes and stop the workers"""
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,208 @@
+import asyncio
+import collections
+import struct
+import threading
+import time
+from urllib.parse import parse_qs
+
+from frame_broadcast import AsyncFrameFeed, AsyncSubscriber
+from h264_stream import websocket_h264
+
+# Frames a client may have on the wire or in its decoder before the server waits for an ack
+PUSH_WINDOW = 2
+# Frame seq (mod 2**32) ahead of every pushed frame, echoed back by the client's ack
+FRAME_HEADER = struct.Struct('>I')
+
+
+def query_value(scope, name, cast=float):
+    """?name=value from an ASGI scope, or None if absent or malformed"""
+    query = parse_qs(scope.get('query_string', b'').decode())
+    try:
+        return cast(query[name][0]) if name in query else None
+    except ValueError:
+        return None
+
+
+async def websocket_feed(feed, scope, receive, send, window=PUSH_WINDOW):
+    """Push binary encoded frames to one WebSocket client as they are produced.
+
+    Each binary message is a FRAME_HEADER seq followed by the encoded frame. The client
+    sends the text 'ack <seq>' after drawing a frame, or 'drop <seq>' for one it replaced
+    with a newer frame unseen; with `window` frames unanswered the server waits, then
+    sends whatever is newest, so a slow link gets fewer, fresher frames instead of a
+    growing queue. Send-to-ack times of drawn frames are the viewer's measured throughput
+    for picking its ladder rung (?rung=N pins one).
+    """
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    await send({'type': 'websocket.accept'})
+
+    credits = asyncio.BoundedSemaphore(window)
+    closed = asyncio.Event()
+    subscriber = AsyncSubscriber(feed, query_value(scope, 'fps'), timeout=1.0, rung=query_value(scope, 'rung', int))
+    # Header seq -> (sent at, bytes) of frames awaiting their ack, oldest first
+    in_flight = collections.OrderedDict()
+
+    async def read_acks():
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                closed.set()
+                break
+            words = (message.get('text') or '').split()
+            if words and words[0] in ('ack', 'drop'):
+                try:
+                    # A bare 'ack' (older clients) answers the oldest frame
+                    tag = int(words[1]) if len(words) > 1 else next(iter(in_flight), None)
+                except ValueError:
+                    continue
+                sent = in_flight.pop(tag, None)
+                if sent is not None and words[0] == 'ack':
+                    subscriber.record_send(sent[1], time.monotonic() - sent[0])
+                try:
+                    credits.release()
+                except ValueError:
+                    pass
+        # Unblock a sender waiting for credit
+        try:
+            credits.release()
+        except ValueError:
+            pass
+
+    reader = asyncio.ensure_future(read_acks())
+    feed.broadcaster.add_subscriber(subscriber)
+    try:
+        while not closed.is_set():
+            await credits.acquire()
+            frame = None
+            while frame is None and not closed.is_set():
+                frame = await subscriber.next_frame()
+            if frame is None:
+                break
+            tag = frame[0] & 0xFFFFFFFF
+            in_flight[tag] = (time.monotonic(), len(frame[1]))
+            await send({'type': 'websocket.send', 'bytes': FRAME_HEADER.pack(tag) + frame[1]})
+    except (OSError, asyncio.CancelledError):
+        pass
+    finally:
+        feed.broadcaster.remove_subscriber(subscriber)
+        reader.cancel()
+
+
+# Small ASGI server, on its own thread and port, that pushes a broadcaster's frames over
+# WebSocket at /ws/video (and an H264Stream's fMP4 at /ws/h264, if given); lets a Gradio
+# dashboard stream video without polling
+class PushServer:
+    def __init__(self, broadcaster, host='127.0.0.1', port=7861, window=PUSH_WINDOW, h264=None):
+        self.broadcaster = broadcaster
+        self.h264 = h264
+        self.host = host
+        self.port = port
+        self.window = window
+        self.feed = None
+        self.server = None
+        self.thread = None
+
+    async def app(self, scope, receive, send):
+        if scope['type'] == 'websocket' and scope['path'] == '/ws/video':
+            if self.feed is None:
+                self.feed = AsyncFrameFeed(self.broadcaster)
+            await websocket_feed(self.feed, scope, receive, send, self.window)
+        elif scope['type'] == 'websocket' and scope['path'] == '/ws/h264' and self.h264 is not None:
+            await websocket_h264(self.h264, scope, receive, send)
+        elif scope['type'] == 'websocket':
+            await send({'type': 'websocket.close', 'code': 1008})
+        elif scope['type'] == 'http':
+            await send({'type': 'http.response.start', 'status': 404, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b'Not Found'})
+
+    def start(self):
+        """Serve on a daemon thread (uvicorn comes with gradio)"""
+        if self.thread and self.thread.is_alive():
+            return True
+        try:
+            import uvicorn
+        except ImportError:
+            print("Error: frame push needs uvicorn (pip install uvicorn)")
+            return False
+        config = uvicorn.Config(self.app, host=self.host, port=self.port, lifespan='off', log_level='warning')
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        if self.server:
+            self.server.should_exit = True
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        if self.feed:
+            self.feed.close()
+            self.feed = None
+        self.broadcaster.stop()
+        if self.h264 is not None:
+            self.h264.stop()
+
+
+# Browser side: replaces polling by drawing pushed frames into an <img> inside the element
+# with the given elem_id (the detection overlay finds the same <img>). Run once on page load.
+PUSH_JS = """
+() => {
+    const root = document.getElementById('%(elem_id)s');
+    if (!root) return;
+    let img = root.querySelector('img.live-feed');
+    if (!img) {
+        img = document.createElement('img');
+        img.className = 'live-feed';
+        img.style.cssText = 'width:100%%;object-fit:contain;display:block;';
+        root.appendChild(img);
+    }
+    const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+    const connect = () => {
+        const ws = new WebSocket(scheme + '://' + location.hostname + ':%(port)d/ws/video%(query)s');
+        ws.binaryType = 'arraybuffer';
+        const answer = (word, frame) => { if (ws.readyState === WebSocket.OPEN) ws.send(word + ' ' + frame.seq); };
+        let busy = false, pending = null, shown = null;
+        // Every frame is answered exactly once: acked after it is drawn, dropped when a
+        // newer one replaces it first
+        const show = (frame) => {
+            busy = true;
+            const url = URL.createObjectURL(frame.blob);
+            const done = () => {
+                if (shown) URL.revokeObjectURL(shown);
+                shown = url;
+                answer('ack', frame);
+                if (pending) {
+                    const next = pending;
+                    pending = null;
+                    show(next);
+                } else {
+                    busy = false;
+                }
+            };
+            img.onload = done;
+            img.onerror = done;
+            img.src = url;
+        };
+        ws.onmessage = (event) => {
+            // 4-byte big-endian seq, then the encoded image
+            const frame = {seq: new DataView(event.data).getUint32(0), blob: new Blob([event.data.slice(4)])};
+            if (!busy) return show(frame);
+            if (pending) answer('drop', pending);
+            pending = frame;
+        };
+        ws.onclose = () => setTimeout(connect, 1000);
+    };
+    connect();
+}
+"""
+
+
+def push_js(elem_id, port=7861, max_fps=None, rung=None):
+    """PUSH_JS bound to one element and push server port (rung=None adapts the quality)"""
+    params = [f"fps={max_fps}"] if max_fps else []
+    params += [f"rung={rung}"] if rung is not None else []
+    query = "?" + "&".join(params) if params else ""
+    return PUSH_JS % {'elem_id': elem_id, 'port': port, 'query': query}
@@ -0,0 +1,117 @@
+import threading
+import numpy as np
+
+
+# Preallocated ring buffer of frame slots shared by any number of readers
+class FrameRing:
+    def __init__(self, num_slots=8, shape=None, dtype=np.uint8, meta_dtype=None):
+        if num_slots < 2:
+            raise ValueError("FrameRing needs at least 2 slots")
+        self.num_slots = num_slots
+        self.dtype = np.dtype(dtype)
+        self.shape = None
+        self.buffer = None
+        self.read_views = []
+        self.slot_seqs = [-1] * num_slots
+        self.latest_seq = -1
+        self.next_seq = 0
+        # Slots reserved before a resolution change must not be published
+        self.generation_start = 0
+        # Optional fixed-width per-slot metadata (e.g. pipeline timestamps)
+        self.meta = np.zeros(num_slots, dtype=meta_dtype) if meta_dtype is not None else None
+        self.condition = threading.Condition()
+        if shape is not None:
+            self._allocate(tuple(shape))
+
+    def _allocate(self, shape):
+        """Allocate the slot array and its read-only views for a frame shape"""
+        self.shape = shape
+        self.buffer = np.zeros((self.num_slots,) + shape, dtype=self.dtype)
+        self.read_views = []
+        for slot in self.buffer:
+            view = slot.view()
+            view.flags.writeable = False
+            self.read_views.append(view)
+        self.slot_seqs = [-1] * self.num_slots
+        self.generation_start = self.next_seq
+
+    def begin_write(self, shape):
+        """Reserve the next slot and return (seq, writable slot) for in-place writing
+
+        Several slots may be reserved before they are committed (e.g. by a decode
+        pool); commit them in seq order so readers never see the newest go backwards.
+        """
+        shape = tuple(shape)
+        with self.condition:
+            # Frames of a new resolution get a fresh buffer; readers keep the old one
+            if shape != self.shape:
+                self._allocate(shape)
+            seq = self.next_seq
+            self.next_seq += 1
+            index = seq % self.num_slots
+            # Invalidate the frame being overwritten before touching its pixels
+            self.slot_seqs[index] = -1
+            if self.meta is not None:
+                self.meta[index] = 0
+            return seq, self.buffer[index]
+
+    def commit(self, seq):
+        """Publish a slot filled after begin_write() and wake waiting readers"""
+        with self.condition:
+            if seq < self.generation_start:
+                return
+            self.slot_seqs[seq % self.num_slots] = seq
+            self.latest_seq = max(self.latest_seq, seq)
+            self.condition.notify_all()
+
+    def write(self, frame):
+        """Copy a ready-made frame into the ring and return its sequence number"""
+        seq, slot = self.begin_write(frame.shape)
+        np.copyto(slot, frame)
+        self.commit(seq)
+        return seq
+
+    def read_latest(self):
+        """Return (seq, read-only frame) for the newest frame, or (-1, None)"""
+        with self.condition:
+            index = self.latest_seq % self.num_slots
+            if self.latest_seq < 0 or self.slot_seqs[index] != self.latest_seq:
+                return -1, None
+            return self.latest_seq, self.read_views[index]
+
+    def read(self, seq):
+        """Return the read-only frame for seq, or None if it was overwritten"""
+        with self.condition:
+            index = seq % self.num_slots
+            if seq < 0 or self.slot_seqs[index] != seq:
+                return None
+            return self.read_views[index]
+
+    def wait_for_frame(self, after_seq=-1, timeout=None):
+        """Block until a frame newer than after_seq exists and return (seq, frame)"""
+        # The newest slot can be invalid while it is rewritten or the ring is resized;
+        # wait for the next commit then rather than returning (and being called) again at once
+        def ready():
+            return self.latest_seq > after_seq and self.slot_seqs[self.latest_seq % self.num_slots] == self.latest_seq
+
+        with self.condition:
+            if not self.condition.wait_for(ready, timeout):
+                return after_seq, None
+            return self.latest_seq, self.read_views[self.latest_seq % self.num_slots]
+
+    def slot_meta(self, seq):
+        """Writable metadata record of a reserved slot (writers only)"""
+        return self.meta[seq % self.num_slots]
+
+    def read_meta(self, seq):
+        """Copy of a frame's metadata record, or None if it was overwritten"""
+        with self.condition:
+            index = seq % self.num_slots
+            if self.meta is None or seq < 0 or self.slot_seqs[index] != seq:
+                return None
+            return self.meta[index].copy()
+
+    def is_valid(self, seq):
+        """Check a frame a reader is holding has not been overwritten yet"""
+        with self.condition:
+            return seq >= 0 and self.slot_seqs[seq % self.num_slots] == seq
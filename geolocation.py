@@ -0,0 +1,104 @@
+import collections
+import threading
+import time
+import numpy as np
+
+from airsim_connection import ConnectionManager
+
+EARTH_RADIUS = 6378137.0
+
+# Everything needed to project one frame's pixels onto the ground
+CameraPose = collections.namedtuple(
+    'CameraPose', ['latitude', 'longitude', 'height', 'rotation', 'fov', 'time']
+)
+
+
+def quaternion_to_matrix(w, x, y, z):
+    """Rotation matrix of a unit quaternion (AirSim: camera/body frame -> world NED)"""
+    return np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+        [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+        [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)],
+    ])
+
+
+def anchor_points(boxes, anchor='bottom'):
+    """Pixel each box is located by: bottom-centre (feet) or centre, shape (N, 2)"""
+    x = (boxes[:, 0] + boxes[:, 2]) / 2
+    y = boxes[:, 3] if anchor == 'bottom' else (boxes[:, 1] + boxes[:, 3]) / 2
+    return np.stack([x, y], axis=1)
+
+
+def pixel_rays(points, width, height, fov):
+    """Camera-frame rays (x forward, y right, z down) through pixels, for a horizontal FOV in degrees"""
+    focal = (width / 2) / np.tan(np.radians(fov) / 2)
+    rays = np.empty((len(points), 3))
+    rays[:, 0] = focal
+    rays[:, 1] = points[:, 0] - width / 2
+    rays[:, 2] = points[:, 1] - height / 2
+    return rays
+
+
+def project_to_ground(points, width, height, pose):
+    """Lat/lon where each pixel's ray meets flat ground; NaN for rays at or above the horizon"""
+    world = pixel_rays(points, width, height, pose.fov) @ pose.rotation.T
+    down = world[:, 2]
+    valid = down > 1e-6
+    scale = np.where(valid, pose.height / np.where(valid, down, 1.0), np.nan)
+    north = world[:, 0] * scale
+    east = world[:, 1] * scale
+    latitude = pose.latitude + np.degrees(north / EARTH_RADIUS)
+    longitude = pose.longitude + np.degrees(east / (EARTH_RADIUS * np.cos(np.radians(pose.latitude))))
+    return latitude, longitude
+
+
+# Turns detection boxes into lat/lon using the vehicle's GPS and the camera's pose and FOV
+class Geolocator:
+    def __init__(self, connection=None, vehicle_name='', camera_name='0', max_pose_age=0.2, anchor='bottom'):
+        self.connection = connection or ConnectionManager()
+        self.vehicle_name = vehicle_name
+        self.camera_name = camera_name
+        # Pose is re-read at most this often; detections in between reuse it
+        self.max_pose_age = max_pose_age
+        self.anchor = anchor
+        self.pose = None
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        """Read GPS and camera pose from AirSim"""
+        gps = self.connection.call('getGpsData', vehicle_name=self.vehicle_name)
+        # simGetCameraInfo reports the camera pose in world NED, vehicle attitude included
+        info = self.connection.call('simGetCameraInfo', self.camera_name, vehicle_name=self.vehicle_name)
+        orientation = info.pose.orientation
+        pose = CameraPose(
+            latitude=gps.gnss.geo_point.latitude,
+            longitude=gps.gnss.geo_point.longitude,
+            # NED z is measured from the start point, taken as flat ground
+            height=-info.pose.position.z_val,
+            rotation=quaternion_to_matrix(orientation.w_val, orientation.x_val, orientation.y_val, orientation.z_val),
+            fov=info.fov,
+            time=time.monotonic(),
+        )
+        with self.lock:
+            self.pose = pose
+        return pose
+
+    def current_pose(self):
+        """Cached pose, refreshed once it is older than max_pose_age"""
+        pose = self.pose
+        if pose is None or time.monotonic() - pose.time > self.max_pose_age:
+            pose = self.refresh()
+        return pose
+
+    def locate(self, boxes, shape, pose=None):
+        """(latitude, longitude) arrays for (N, 4) xyxy boxes in a frame of shape (height, width)"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        if not len(boxes):
+            return np.zeros(0), np.zeros(0)
+        pose = pose or self.current_pose()
+        height, width = shape[:2]
+        return project_to_ground(anchor_points(boxes, self.anchor), width, height, pose)
+
+    def locate_result(self, result):
+        """Locate every box of a DetectionResult"""
+        return self.locate(result.boxes, result.shape)
@@ -0,0 +1,397 @@
+import asyncio
+import json
+import shutil
+import struct
+import subprocess
+import threading
+import time
+
+# Bit of an MP4 sample's flags that marks it as not a sync sample (not a keyframe)
+NON_SYNC_SAMPLE = 0x10000
+
+
+def read_box(stream):
+    """Next top-level MP4 box (type, bytes including header) from a pipe, or (None, b'') at EOF"""
+    header = stream.read(8)
+    if len(header) < 8:
+        return None, b''
+    size, box_type = struct.unpack('>I4s', header)
+    if size == 1:
+        large = stream.read(8)
+        size = struct.unpack('>Q', large)[0]
+        header += large
+    body = stream.read(size - len(header))
+    if len(body) < size - len(header):
+        return None, b''
+    return box_type, header + body
+
+
+def child_boxes(data, start=8):
+    """{type: payload after the header} of the boxes nested in data[start:]"""
+    boxes = {}
+    offset = start
+    while offset + 8 <= len(data):
+        size, box_type = struct.unpack_from('>I4s', data, offset)
+        if size < 8:
+            break
+        boxes.setdefault(box_type, data[offset + 8:offset + size])
+        offset += size
+    return boxes
+
+
+def fragment_is_keyframe(moof):
+    """True if a moof's first sample is a sync sample, from trun/tfhd sample flags"""
+    traf = child_boxes(moof).get(b'traf')
+    if traf is None:
+        return True
+    boxes = child_boxes(traf, 0)
+    tfhd, trun = boxes.get(b'tfhd'), boxes.get(b'trun')
+    if trun is None:
+        return True
+    flags = struct.unpack_from('>I', trun, 0)[0] & 0xFFFFFF
+    offset = 8 + (4 if flags & 0x1 else 0)
+    if flags & 0x4:
+        return not struct.unpack_from('>I', trun, offset)[0] & NON_SYNC_SAMPLE
+    if flags & 0x400:
+        offset += (4 if flags & 0x100 else 0) + (4 if flags & 0x200 else 0)
+        return not struct.unpack_from('>I', trun, offset)[0] & NON_SYNC_SAMPLE
+    if tfhd is not None:
+        tfhd_flags = struct.unpack_from('>I', tfhd, 0)[0] & 0xFFFFFF
+        if tfhd_flags & 0x20:
+            offset = 8 + sum(size for bit, size in ((0x1, 8), (0x2, 4), (0x8, 4), (0x10, 4)) if tfhd_flags & bit)
+            return not struct.unpack_from('>I', tfhd, offset)[0] & NON_SYNC_SAMPLE
+    return True
+
+
+def codec_mime(init):
+    """MSE mime type for an init segment, e.g. video/mp4; codecs="avc1.42c01f" """
+    index = init.find(b'avcC')
+    if index < 0:
+        return 'video/mp4; codecs="avc1.42E01E"'
+    profile, compatibility, level = init[index + 5:index + 8]
+    return f'video/mp4; codecs="avc1.{profile:02x}{compatibility:02x}{level:02x}"'
+
+
+# Live H.264 encode of a camera handler's frames through one persistent ffmpeg process,
+# cut into fragmented-MP4 fragments: one init segment, then one fragment per frame.
+# Runs only while someone is watching; late joiners get the init segment plus the
+# fragments since the last keyframe.
+class H264Stream:
+    def __init__(self, camera_handler, fps=15, keyframe_interval=2.0, max_bitrate='1M',
+                 preset='veryfast', ffmpeg='ffmpeg'):
+        self.camera_handler = camera_handler
+        self.fps = fps
+        # Seconds between keyframes: how long a newly joined or lagging viewer may wait
+        self.keyframe_interval = keyframe_interval
+        # Cap for the encoder's rate control, ffmpeg syntax ('800k', '2M')
+        self.max_bitrate = max_bitrate
+        self.preset = preset
+        self.ffmpeg = ffmpeg
+        self.condition = threading.Condition()
+        self.listeners = []
+        self.process = None
+        self.init = None
+        self.mime = None
+        # Fragments since the latest keyframe
+        self.gop = []
+        self.shape = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def command(self, width, height):
+        gop = max(1, round(self.fps * self.keyframe_interval))
+        return [
+            self.ffmpeg, '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(self.fps), '-i', '-',
+            '-an', '-c:v', 'libx264', '-preset', self.preset, '-tune', 'zerolatency',
+            '-pix_fmt', 'yuv420p', '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0',
+            '-b:v', self.max_bitrate, '-maxrate', self.max_bitrate, '-bufsize', self.max_bitrate,
+            '-f', 'mp4', '-movflags', 'empty_moov+default_base_moof+frag_every_frame', '-',
+        ]
+
+    def available(self):
+        return shutil.which(self.ffmpeg) is not None
+
+    def add_listener(self, listener):
+        """listener(kind, data, keyframe) on the reader thread; kind is 'init' or 'fragment'"""
+        with self.condition:
+            self.listeners.append(listener)
+            self.condition.notify_all()
+            return self.init, self.mime, list(self.gop)
+
+    def remove_listener(self, listener):
+        with self.condition:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+    def start(self):
+        """Start the feeding thread if it is not running"""
+        if not self.available():
+            print(f"Error: H.264 streaming needs {self.ffmpeg} on the PATH")
+            return False
+        with self.condition:
+            if self.thread and self.thread.is_alive():
+                return True
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.feed_frames, daemon=True)
+            self.thread.start()
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.close_encoder()
+
+    def open_encoder(self, shape):
+        """Start ffmpeg for a frame size, plus the thread that splits its output"""
+        height, width = shape[:2]
+        self.process = subprocess.Popen(self.command(width, height), stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.shape = shape
+        threading.Thread(target=self.read_fragments, args=(self.process,), daemon=True).start()
+
+    def close_encoder(self):
+        with self.condition:
+            process, self.process = self.process, None
+            self.init, self.mime, self.gop = None, None, []
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=2.0)
+        except Exception:
+            process.kill()
+
+    def feed_frames(self):
+        """Thread function: write the newest frame into ffmpeg at a constant rate while anyone
+        watches; repeats of an unchanged frame cost next to nothing after inter-frame coding"""
+        period = 1.0 / self.fps
+        next_due = time.monotonic()
+        while not self.stop_event.is_set():
+            with self.condition:
+                if not self.listeners:
+                    self.condition.wait(1.0)
+                    watching = bool(self.listeners)
+                else:
+                    watching = True
+            if not watching:
+                # Nobody left; the next viewer starts a fresh stream at a keyframe
+                self.close_encoder()
+                next_due = time.monotonic()
+                continue
+
+            seq, frame = self.camera_handler.read_latest()
+            if frame is not None:
+                try:
+                    if self.process is None or frame.shape != self.shape or self.process.poll() is not None:
+                        self.close_encoder()
+                        self.open_encoder(frame.shape)
+                    self.process.stdin.write(frame.tobytes())
+                    self.process.stdin.flush()
+                except Exception as e:
+                    print(f"H.264 Encode Error: {e}")
+                    self.close_encoder()
+                    self.stop_event.wait(1.0)
+
+            next_due = max(next_due + period, time.monotonic())
+            self.stop_event.wait(max(0.0, next_due - time.monotonic()))
+
+    def read_fragments(self, process):
+        """Thread function: split ffmpeg's fMP4 output into init segment and fragments"""
+        init, moof = b'', None
+        while True:
+            box_type, data = read_box(process.stdout)
+            if box_type is None:
+                return
+            if box_type in (b'ftyp', b'moov'):
+                init += data
+                if box_type == b'moov':
+                    self.publish('init', init, True, process)
+            elif box_type == b'moof':
+                moof = data
+            elif box_type == b'mdat' and moof is not None:
+                self.publish('fragment', moof + data, fragment_is_keyframe(moof), process)
+                moof = None
+
+    def publish(self, kind, data, keyframe, process=None):
+        """Hand one init segment or fragment to every viewer; output still draining from a
+        replaced or closed encoder (process is not the current one) is dropped"""
+        with self.condition:
+            if process is not None and process is not self.process:
+                return
+            if kind == 'init':
+                self.init, self.mime, self.gop = data, codec_mime(data), []
+            elif keyframe:
+                self.gop = [data]
+            else:
+                self.gop.append(data)
+            listeners = list(self.listeners)
+        for listener in listeners:
+            try:
+                listener(kind, data, keyframe)
+            except Exception as e:
+                print(f"H.264 Listener Error: {e}")
+
+
+# One viewer's queue on the event loop. Inter-coded frames can't be skipped one by one,
+# so a viewer that falls too far behind drops its backlog and resumes at the next keyframe.
+class H264Client:
+    def __init__(self, loop, max_backlog=2 * 1024 * 1024):
+        self.loop = loop
+        self.max_backlog = max_backlog
+        self.queue = asyncio.Queue()
+        self.backlog = 0
+        self.waiting_for_keyframe = False
+        self.dropped = 0
+
+    def on_fragment(self, kind, data, keyframe):
+        """Called on the reader thread"""
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.push, kind, data, keyframe)
+
+    def push(self, kind, data, keyframe):
+        if kind == 'init':
+            # New encoder: start over from its init segment
+            self.clear()
+            self.waiting_for_keyframe = False
+        elif self.waiting_for_keyframe and not keyframe:
+            self.dropped += 1
+            return
+        elif self.backlog + len(data) > self.max_backlog:
+            self.clear()
+            if not keyframe:
+                self.dropped += 1
+                self.waiting_for_keyframe = True
+                return
+        self.waiting_for_keyframe = False
+        self.queue.put_nowait((kind, data))
+        self.backlog += len(data)
+
+    def clear(self):
+        """Drop queued fragments; a pending init segment stays, the player can't start without it"""
+        kept = []
+        while not self.queue.empty():
+            kind, data = self.queue.get_nowait()
+            if kind == 'init':
+                kept.append((kind, data))
+            else:
+                self.dropped += 1
+                self.backlog -= len(data)
+        for item in kept:
+            self.queue.put_nowait(item)
+
+    async def get(self):
+        kind, data = await self.queue.get()
+        self.backlog -= len(data)
+        return kind, data
+
+
+async def websocket_h264(stream, scope, receive, send):
+    """Send one WebSocket client a codec description (text JSON), the init segment and
+    then fMP4 fragments as they are encoded"""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if not stream.start():
+        await send({'type': 'websocket.close', 'code': 1011})
+        return
+    await send({'type': 'websocket.accept'})
+
+    client = H264Client(asyncio.get_running_loop())
+    init, mime, gop = stream.add_listener(client.on_fragment)
+    if init is not None:
+        client.push('init', init, True)
+        for index, fragment in enumerate(gop):
+            client.push('fragment', fragment, index == 0)
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'websocket.disconnect':
+            pass
+
+    disconnected = asyncio.ensure_future(wait_for_disconnect())
+    try:
+        while not disconnected.done():
+            getter = asyncio.ensure_future(client.get())
+            await asyncio.wait([getter, disconnected], return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                break
+            kind, data = getter.result()
+            if kind == 'init':
+                await send({'type': 'websocket.send', 'text': json.dumps({'mime': codec_mime(data)})})
+            await send({'type': 'websocket.send', 'bytes': data})
+    except (OSError, asyncio.CancelledError):
+        pass
+    finally:
+        stream.remove_listener(client.on_fragment)
+        disconnected.cancel()
+
+
+# Browser side: plays the fMP4 fragments from /ws/h264 through Media Source Extensions in a
+# <video> inside the element with the given elem_id, staying at the live edge
+H264_JS = """
+() => {
+    const root = document.getElementById('%(elem_id)s');
+    if (!root || !window.MediaSource) return;
+    let video = root.querySelector('video.live-feed');
+    if (!video) {
+        video = document.createElement('video');
+        video.className = 'live-feed';
+        video.muted = true;
+        video.autoplay = true;
+        video.playsInline = true;
+        video.style.cssText = 'width:100%%;display:block;';
+        root.appendChild(video);
+    }
+    const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+    const connect = () => {
+        const ws = new WebSocket(scheme + '://' + location.hostname + ':%(port)d/ws/h264');
+        ws.binaryType = 'arraybuffer';
+        let source = null, buffer = null, queue = [];
+        const pump = () => {
+            if (!buffer || buffer.updating || !queue.length) return;
+            buffer.appendBuffer(queue.shift());
+        };
+        const live = () => {
+            const ranges = video.buffered;
+            if (!ranges.length) return;
+            const end = ranges.end(ranges.length - 1);
+            // Jump to the live edge when we drift behind, and keep ~30 s of buffer
+            if (end - video.currentTime > 1.0) video.currentTime = end - 0.1;
+            if (!buffer.updating && video.currentTime - ranges.start(0) > 30) {
+                buffer.remove(ranges.start(0), video.currentTime - 10);
+            }
+            if (video.paused) video.play().catch(() => {});
+        };
+        ws.onmessage = (event) => {
+            if (typeof event.data === 'string') {
+                // New encoder: fresh MediaSource with its codec
+                const mime = JSON.parse(event.data).mime;
+                queue = [];
+                source = new MediaSource();
+                buffer = null;
+                source.addEventListener('sourceopen', () => {
+                    buffer = source.addSourceBuffer(mime);
+                    buffer.mode = 'sequence';
+                    buffer.addEventListener('updateend', () => { live(); pump(); });
+                    pump();
+                });
+                video.src = URL.createObjectURL(source);
+                return;
+            }
+            queue.push(event.data);
+            pump();
+        };
+        ws.onclose = () => setTimeout(connect, 1000);
+    };
+    connect();
+}
+"""
+
+
+def h264_js(elem_id, port=7861):
+    """H264_JS bound to one element and push server port"""
+    return H264_JS % {'elem_id': elem_id, 'port': port}
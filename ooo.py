@@ -1,105 +1,61 @@
-import airsim
-import numpy as np
-import cv2
-import threading
-import queue
-import time
+import os
 import gradio as gr
 from IPython.display import IFrame
-from ultralytics import RTDETR
-
-# Load the YOLO model
-model = RTDETR("rtdetr.pt")
-
-# AirSim Camera Handler Class
-class AirSimCameraHandler:
-    def __init__(self):
-        self.frame_queue = queue.Queue(maxsize=1)
-        self.stop_event = threading.Event()
-        self.thread = None
-        self.client = None
-
-    def connect_airsim(self):
-        """Establish connection to AirSim"""
-        try:
-            self.client = airsim.MultirotorClient()
-            self.client.confirmConnection()
-            print("AirSim Connected Successfully")
-            return True
-        except Exception as e:
-            print(f"AirSim Connection Error: {e}")
-            return False
-
-    def capture_frames(self):
-        """Thread function to capture frames"""
-        try:
-            while not self.stop_event.is_set():
-                # Capture frame from AirSim
-                responses = self.client.simGetImages([airsim.ImageRequest(
-                    '0', airsim.ImageType.Scene, False, False
-                )])
-
-                if responses and len(responses) > 0:
-                    response = responses[0]
-                    
-                    # Convert to numpy array
-                    img1d = np.frombuffer(response.image_data_uint8, dtype=np.uint8)
-                    
-                    # Reshape and convert color
-                    img_rgb = cv2.cvtColor(
-                        img1d.reshape(response.height, response.width, 3), 
-                        cv2.COLOR_BGR2RGB
-                    )
-                    
-                    # Clear queue if full
-                    try:
-                        self.frame_queue.get_nowait()
-                    except queue.Empty:
-                        pass
-                    
-                    self.frame_queue.put(img_rgb)
-                
-                time.sleep(0.1)  # Prevent overwhelming
-        except Exception as e:
-            print(f"Frame Capture Error: {e}")
-
-    def start_capture(self):
-        """Start the camera capture thread"""
-        # Ensure AirSim connection is established
-        if not self.client:
-            if not self.connect_airsim():
-                return False
-        
-        # If thread is already running, don't start again
-        if self.thread and self.thread.is_alive():
-            return True
-        
-        # Clear any existing stop event
-        self.stop_event.clear()
-        
-        # Create and start the thread
-        self.thread = threading.Thread(target=self.capture_frames)
-        self.thread.daemon = True
-        self.thread.start()
-        return True
-
-    def stop_capture(self):
-        """Stop the camera capture thread"""
-        if self.thread:
-            self.stop_event.set()
-            self.thread.join()
-            self.thread = None
-
-    def get_latest_frame(self):
-        """Get the latest frame from the queue"""
-        try:
-            return self.frame_queue.get_nowait()
-        except queue.Empty:
-            return None
+
+from airsim_camera import AirSimCameraHandler
+from change_gate import ChangeGate
+from detector_backends import BackgroundModel
+from detection_overlay import detection_payload, overlay_js
+from detection_worker import DetectionWorker
+from frame_broadcast import RingBroadcaster
+from flight_recorder import FlightRecorder
+from frame_push import PushServer, push_js
+from h264_stream import H264Stream, h264_js
+from geolocation import Geolocator
+from people_registry import PEOPLE_HEADERS, PeopleRegistry, apply_changes, table_rows
+from pipeline_latency import pipeline_latency
+from tracker import Tracker
+
+# Detector (backend from $DETECTOR_BACKEND: pytorch, onnx, onnx-int8, ...); it loads and
+# warms up in the background once the UI is serving, frames pass through un-annotated until then
+model = BackgroundModel()
 
 # Global AirSim handler
 airsim_handler = AirSimCameraHandler()
 
+# Frames are JPEG-encoded once and pushed to every browser over a WebSocket (port 7861).
+# FEED_CODEC=h264 streams H.264 through a local ffmpeg instead, for constrained links.
+feed_codec = os.environ.get('FEED_CODEC', 'jpeg')
+feed_broadcaster = RingBroadcaster(airsim_handler)
+h264_stream = H264Stream(airsim_handler, keyframe_interval=2.0, max_bitrate='1M') if feed_codec == 'h264' else None
+push_server = PushServer(feed_broadcaster, h264=h264_stream)
+
+# Frames, GPS and detections of the whole mission go to rolling segment files for replay
+# (python flight_recorder.py info recordings)
+recorder = FlightRecorder(os.environ.get('FLIGHT_RECORD_DIR', 'recordings'), airsim_handler)
+
+# Person detection runs on its own thread against the freshest captured frame.
+# The tracker follows people on every frame and calls the model every 5th frame (sooner if
+# a track fades); while hovering over an unchanged scene the model is skipped for up to 2 s.
+# conf=0.1 keeps weak detections for the tracker's second association pass.
+# Boxes are drawn by the browser over the plain feed, so the worker never annotates frames.
+# The detector keeps capture active, and at burst rate while it is following someone.
+# Every box is projected to lat/lon from the drone's GPS and camera pose, and sightings of
+# the same person (across frames and drones) are merged into one People Found record.
+tracker = Tracker(detect_every=5)
+geolocator = Geolocator(airsim_handler.connection)
+people_registry = PeopleRegistry()
+
+def on_detection(result):
+    """Merge a detection result into People Found and the flight recording"""
+    people_registry.add_result(result, 'Drone-1')
+    recorder.record_detections(result, model.status())
+
+detector = DetectionWorker(
+    model, airsim_handler.frame_ring, classes=[0], gate=ChangeGate(max_age=2.0), tracker=tracker,
+    annotate=False, geolocator=geolocator, on_result=on_detection, demand=airsim_handler, conf=0.1
+)  # Assuming class 0 for detection
+
 def create_interactive_map():
     """Generate an OpenStreetMap HTML iframe"""
     iframe = IFrame(
@@ -109,33 +65,51 @@ def create_interactive_map():
     )
     return iframe._repr_html_()
 
-def update_camera_feed():
-    """Update camera feed and run detection on it"""
+def start_pipeline():
+    """Ensure AirSim capture, the detector, the frame push server and the recorder are started"""
     try:
-        # Ensure AirSim capture is started
         airsim_handler.start_capture()
-        
-        # Get latest frame
-        latest_frame = airsim_handler.get_latest_frame()
-        
-        if latest_frame is not None:
-            # Run object detection on the frame
-            results = model.predict(latest_frame, show=True, classes=[0])  # Assuming class 0 for detection
-            
-            # Process the result, add annotations (bounding boxes, etc.) to the frame
-            annotated_frame = results[0].plot()  # Assuming results is a list of detections
-            return annotated_frame
-        
-        return None
+        model.start()
+        detector.start()
+        push_server.start()
+        recorder.start()
     except Exception as e:
-        print(f"Error updating camera feed: {e}")
-        return None
+        print(f"Error starting camera feed: {e}")
+
+def update_detections(delivered_seq):
+    """Latest detections as a compact box list for the browser overlay; a result counts as
+    delivered once per client, not on every poll that finds it unchanged"""
+    try:
+        airsim_handler.mark_read()
+        result = detector.latest()
+        if result is not None and result.seq != delivered_seq:
+            pipeline_latency.record_delivery(result.meta)
+            delivered_seq = result.seq
+        return detection_payload(result, model.status()), delivered_seq
+    except Exception as e:
+        print(f"Error updating detections: {e}")
+        return detection_payload(None, 'error'), delivered_seq
+
+def update_people_found(people):
+    """Merged people rows, sent only when a record changed since this client's last update;
+    each client keeps its own copy and folds in just the changed records"""
+    try:
+        changes = people_registry.changes_since(people['version'])
+        if changes['version'] == people['version']:
+            return gr.update(), people
+        apply_changes(people['records'], changes)
+        people['version'] = changes['version']
+        return table_rows(people['records']), people
+    except Exception as e:
+        print(f"Error updating people found: {e}")
+        return gr.update(), people
 
 def main():
     # Create Gradio interface
     with gr.Blocks() as demo:
         with gr.Row():  # Use a Row for side-by-side layout
-            camera_feed = gr.Image(label="Drone Camera Feed", elem_id="camera_feed")
+            # Filled by the pushed frames, not by a Gradio output
+            camera_feed = gr.HTML(label="Drone Camera Feed", elem_id="camera_feed")
             interactive_map_html = gr.HTML(label="Interactive Map", elem_id="interactive_map")
         
         drone_status = gr.Dataframe(
@@ -145,10 +119,10 @@ def main():
         )
 
         people_found = gr.Dataframe(
-            headers=["Name", "Location"],
-            value=[["John", "Sector 1"], ["Anna", "Sector 2"]],
+            headers=PEOPLE_HEADERS,
             label="People Found"
         )
+        people_state = gr.State({'version': 0, 'records': {}})
 
 
         update_map_btn = gr.Button("Update Map")
@@ -157,10 +131,32 @@ def main():
             outputs=interactive_map_html
         )
 
-        demo.load(update_camera_feed, outputs=camera_feed, every=1)
-
-    # Launch the demo
-    demo.launch(server_name='127.0.0.1', server_port=7860)
+        # Per-stage pipeline latency (also served as JSON at /api/latency)
+        latency_table = gr.Dataframe(
+            headers=["Stage", "Frames", "p50 (ms)", "p95 (ms)", "p99 (ms)"],
+            label="Pipeline Latency"
+        )
+        latency_json = gr.JSON(visible=False)
+
+        # Detections stream on their own, faster tick and are drawn client-side
+        detections_json = gr.JSON(visible=False)
+        delivered_seq = gr.State(-1)
+        detections_json.change(None, inputs=detections_json, js=overlay_js("camera_feed"))
+
+        demo.load(None, js=h264_js("camera_feed") if h264_stream else push_js("camera_feed"))
+        # Retries the AirSim connection if the simulator was not up yet
+        demo.load(start_pipeline, every=5)
+        demo.load(update_detections, inputs=delivered_seq, outputs=[detections_json, delivered_seq],
+                  every=0.2, api_name="detections")
+        demo.load(update_people_found, inputs=people_state, outputs=[people_found, people_state], every=1)
+        demo.load(pipeline_latency.summary_rows, outputs=latency_table, every=2)
+        demo.load(pipeline_latency.snapshot, outputs=latency_json, every=2, api_name="latency")
+
+    # Launch the demo, then load the model while the UI is already up
+    push_server.start()
+    demo.launch(server_name='127.0.0.1', server_port=7860, prevent_thread_lock=True)
+    start_pipeline()
+    demo.block_thread()
 
 if __name__ == "__main__":
     main()
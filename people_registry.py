@@ -0,0 +1,234 @@
+import collections
+import math
+import threading
+import time
+import numpy as np
+
+# Metres per degree of latitude (and of longitude at the equator)
+METRES_PER_DEGREE = 111320.0
+
+# Columns of the People Found table
+PEOPLE_HEADERS = ["Name", "Location", "Confidence", "Sightings", "Drones", "Last Seen"]
+
+
+def person_row(person):
+    """People Found table row for a person dict (PersonRecord.as_dict / changes_since)"""
+    return [
+        f"Person {person['id']}",
+        f"{person['latitude']:.6f}, {person['longitude']:.6f}",
+        round(person['confidence'], 2),
+        person['sightings'],
+        ", ".join(v for v in person['vehicles'] if v),
+        time.strftime('%H:%M:%S', time.localtime(person['last_seen'])),
+    ]
+
+
+def apply_changes(people, changes):
+    """Fold a changes_since() delta into a consumer's {person id: person dict} copy"""
+    if changes['full']:
+        people.clear()
+    for person_id in changes['removed']:
+        people.pop(person_id, None)
+    for person in changes['people']:
+        people[person['id']] = person
+    return people
+
+
+def table_rows(people):
+    """People Found rows from a {person id: person dict} copy, most recently seen first"""
+    return [person_row(person) for person in sorted(people.values(), key=lambda person: -person['last_seen'])]
+
+
+# One merged person: running position estimate plus bookkeeping
+class PersonRecord:
+    def __init__(self, person_id, latitude, longitude, score, vehicle, timestamp):
+        self.person_id = person_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.weight = score
+        self.confidence = score
+        self.sightings = 1
+        self.vehicles = {vehicle}
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.version = 0
+
+    def merge(self, latitude, longitude, score, vehicle, timestamp):
+        """Fold one sighting in: score-weighted mean position, noisy-OR confidence
+        (repeat sightings are strongly correlated, so each adds a tenth of its evidence)"""
+        total = self.weight + score
+        self.latitude += (latitude - self.latitude) * score / total
+        self.longitude += (longitude - self.longitude) * score / total
+        self.weight = total
+        self.confidence = 1.0 - (1.0 - self.confidence) * (1.0 - min(score, 0.99) * 0.1)
+        self.sightings += 1
+        self.vehicles.add(vehicle)
+        self.last_seen = max(self.last_seen, timestamp)
+
+    def absorb(self, other):
+        """Take over a duplicate record of the same person"""
+        total = self.weight + other.weight
+        self.latitude += (other.latitude - self.latitude) * other.weight / total
+        self.longitude += (other.longitude - self.longitude) * other.weight / total
+        self.weight = total
+        self.confidence = 1.0 - (1.0 - self.confidence) * (1.0 - other.confidence)
+        self.sightings += other.sightings
+        self.vehicles |= other.vehicles
+        self.first_seen = min(self.first_seen, other.first_seen)
+        self.last_seen = max(self.last_seen, other.last_seen)
+
+    def row(self):
+        return person_row(self.as_dict())
+
+    def as_dict(self):
+        return {
+            'id': self.person_id,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'confidence': self.confidence,
+            'sightings': self.sightings,
+            'vehicles': sorted(self.vehicles),
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+        }
+
+
+# Uniform lat/lon grid of people: sightings within merge_distance and merge_window of an
+# existing record are merged into it, so repeated and cross-drone sightings stay one row
+class PeopleRegistry:
+    def __init__(self, merge_distance=10.0, merge_window=120.0, min_score=0.3, max_removed=1024):
+        self.merge_distance = merge_distance
+        self.merge_window = merge_window
+        self.min_score = min_score
+        self.lock = threading.Lock()
+        self.people = {}
+        # (row, col) grid cell of merge_distance metres -> person ids in it
+        self.grid = collections.defaultdict(set)
+        self.cells = {}
+        # (vehicle, track id) -> person id, so one track keeps feeding one record
+        self.tracks = {}
+        self.metres_per_lon = None
+        self.next_id = 1
+        self.version = 0
+        # (version, id) of records merged away, newest last, so incremental consumers can
+        # drop them; only the latest max_removed are kept
+        self.removed = collections.deque()
+        self.max_removed = max_removed
+        # Consumers older than this may have missed a removal and get a full copy
+        self.removed_floor = 0
+
+    def _project(self, latitude, longitude):
+        """Local metres (east, north); the longitude scale is fixed at the first sighting"""
+        if self.metres_per_lon is None:
+            self.metres_per_lon = METRES_PER_DEGREE * math.cos(math.radians(latitude))
+        return longitude * self.metres_per_lon, latitude * METRES_PER_DEGREE
+
+    def _cell(self, east, north):
+        return int(east // self.merge_distance), int(north // self.merge_distance)
+
+    def _neighbours(self, east, north, timestamp, exclude=None):
+        """(distance, person) for recent people within merge_distance, from the 3x3 neighbouring cells"""
+        col, row = self._cell(east, north)
+        found = []
+        for d_col in (-1, 0, 1):
+            for d_row in (-1, 0, 1):
+                for person_id in self.grid.get((col + d_col, row + d_row), ()):
+                    person = self.people[person_id]
+                    if person_id == exclude or timestamp - person.last_seen > self.merge_window:
+                        continue
+                    p_east, p_north = self._project(person.latitude, person.longitude)
+                    distance = math.hypot(p_east - east, p_north - north)
+                    if distance <= self.merge_distance:
+                        found.append((distance, person))
+        return found
+
+    def _nearest(self, east, north, timestamp):
+        """Closest recent person within merge_distance"""
+        found = self._neighbours(east, north, timestamp)
+        return min(found, key=lambda item: item[0])[1] if found else None
+
+    def _consolidate(self, person, timestamp):
+        """Fold records that drifted within merge_distance of `person` into the heavier one"""
+        east, north = self._project(person.latitude, person.longitude)
+        for _, other in self._neighbours(east, north, timestamp, exclude=person.person_id):
+            keep, drop = (person, other) if person.weight >= other.weight else (other, person)
+            keep.absorb(drop)
+            del self.people[drop.person_id]
+            self.grid[self.cells.pop(drop.person_id)].discard(drop.person_id)
+            for key, person_id in self.tracks.items():
+                if person_id == drop.person_id:
+                    self.tracks[key] = keep.person_id
+            self.version += 1
+            self.removed.append((self.version, drop.person_id))
+            if len(self.removed) > self.max_removed:
+                self.removed_floor = self.removed.popleft()[0]
+            person = keep
+            self._reindex(person)
+        return person
+
+    def _reindex(self, person):
+        cell = self._cell(*self._project(person.latitude, person.longitude))
+        old = self.cells.get(person.person_id)
+        if old != cell:
+            if old is not None:
+                self.grid[old].discard(person.person_id)
+            self.grid[cell].add(person.person_id)
+            self.cells[person.person_id] = cell
+
+    def add(self, latitude, longitude, score, vehicle='', track_id=None, timestamp=None):
+        """Merge one sighting; returns the person id it was assigned to (None if rejected)"""
+        if score < self.min_score or not np.isfinite(latitude) or not np.isfinite(longitude):
+            return None
+        timestamp = time.time() if timestamp is None else timestamp
+        east, north = self._project(latitude, longitude)
+        person = None
+        if track_id is not None:
+            person = self.people.get(self.tracks.get((vehicle, track_id)))
+        if person is None:
+            person = self._nearest(east, north, timestamp)
+        if person is None:
+            person = PersonRecord(self.next_id, latitude, longitude, score, vehicle, timestamp)
+            self.people[person.person_id] = person
+            self.next_id += 1
+        else:
+            person.merge(latitude, longitude, score, vehicle, timestamp)
+        self._reindex(person)
+        person = self._consolidate(person, timestamp)
+        if track_id is not None:
+            self.tracks[(vehicle, track_id)] = person.person_id
+        self.version += 1
+        person.version = self.version
+        return person.person_id
+
+    def add_result(self, result, vehicle=''):
+        """Merge every geolocated box of a DetectionResult that came from a detector run"""
+        if result.locations is None or not len(result.locations):
+            return []
+        meta = result.meta
+        # Tracker-predicted and gate-reused frames only repeat earlier evidence; merging
+        # them would raise confidence with frame count instead of detections
+        if meta is not None and not meta['inference_end']:
+            return []
+        timestamp = meta['sim_time'] if meta is not None and meta['sim_time'] else time.time()
+        track_ids = result.track_ids if result.track_ids is not None else [None] * len(result.locations)
+        with self.lock:
+            return [
+                self.add(lat, lon, float(score), vehicle, None if track_id is None else int(track_id), timestamp)
+                for (lat, lon), score, track_id in zip(result.locations, result.scores, track_ids)
+            ]
+
+    def changes_since(self, version=0):
+        """Records updated and ids removed after `version`, plus the version to ask from
+        next time; full=True (every record) when removals that old were already pruned"""
+        with self.lock:
+            full = version < self.removed_floor
+            if full:
+                version = 0
+            changed = [person.as_dict() for person in self.people.values() if person.version > version]
+            removed = [person_id for removed_at, person_id in self.removed if removed_at > version and not full]
+            return {'version': self.version, 'people': changed, 'removed': removed, 'full': full}
+
+    def rows(self):
+        """People Found table rows, most recently seen first"""
+        with self.lock:
+            return table_rows({person.person_id: person.as_dict() for person in self.people.values()})
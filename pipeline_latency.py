@@ -0,0 +1,124 @@
+import threading
+import time
+import numpy as np
+
+# Per-frame timestamps carried through the pipeline (wall-clock seconds, 0 = not reached)
+FRAME_META_DTYPE = np.dtype([
+    ('sim_time', 'f8'),         # AirSim ImageResponse.time_stamp
+    ('rpc_start', 'f8'),        # simGetImages issued
+    ('rpc_end', 'f8'),          # simGetImages returned
+    ('decoded', 'f8'),          # RGB frame committed to the ring
+    ('inference_start', 'f8'),  # detector picked the frame up
+    ('inference_end', 'f8'),    # detections ready
+])
+
+STAGES = (
+    'sim_to_capture',   # sim render timestamp -> RPC returned
+    'rpc',              # simGetImages round trip
+    'decode',           # RPC returned -> frame in the ring
+    'inference',        # detector time on the frame
+    'delivery',         # frame (or detections) ready -> handed to a viewer
+    'glass_to_glass',   # sim render timestamp -> handed to a viewer
+)
+
+# Log-spaced bucket edges from 0.1 ms to 100 s
+BUCKET_EDGES = np.logspace(-4, 2, 61)
+
+
+# Fixed-bucket latency histogram; cheap to record from any thread
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = np.zeros(len(BUCKET_EDGES) + 1, dtype=np.int64)
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def record(self, seconds):
+        self.counts[np.searchsorted(BUCKET_EDGES, seconds)] += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    def percentile(self, q):
+        """Upper edge of the bucket holding the q-th percentile, in seconds"""
+        count = self.counts.sum()
+        if not count:
+            return None
+        index = int(np.searchsorted(np.cumsum(self.counts), q / 100.0 * count))
+        return float(BUCKET_EDGES[min(index, len(BUCKET_EDGES) - 1)])
+
+    def summary(self):
+        count = int(self.counts.sum())
+        to_ms = lambda seconds: None if seconds is None else round(seconds * 1000.0, 2)
+        return {
+            'count': count,
+            'mean_ms': to_ms(self.total / count) if count else None,
+            'p50_ms': to_ms(self.percentile(50)),
+            'p95_ms': to_ms(self.percentile(95)),
+            'p99_ms': to_ms(self.percentile(99)),
+            'max_ms': to_ms(self.maximum) if count else None,
+            'buckets_ms': [round(edge * 1000.0, 3) for edge in BUCKET_EDGES],
+            'counts': self.counts.tolist(),
+        }
+
+
+# Per-stage histograms for one process
+class PipelineLatency:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self.started = time.time()
+
+    def record(self, stage, seconds):
+        if seconds < 0:
+            # Clocks disagree (sim on another host); don't poison the histogram
+            return
+        with self.lock:
+            self.histograms[stage].record(seconds)
+
+    def record_capture(self, meta):
+        """Producer side: once per frame, after it is committed"""
+        if meta['sim_time'] and meta['rpc_end']:
+            self.record('sim_to_capture', meta['rpc_end'] - meta['sim_time'])
+        if meta['rpc_start'] and meta['rpc_end']:
+            self.record('rpc', meta['rpc_end'] - meta['rpc_start'])
+        if meta['rpc_end'] and meta['decoded']:
+            self.record('decode', meta['decoded'] - meta['rpc_end'])
+
+    def record_inference(self, meta):
+        """Detector side: once per inferred frame"""
+        if meta['inference_start'] and meta['inference_end']:
+            self.record('inference', meta['inference_end'] - meta['inference_start'])
+
+    def record_delivery(self, meta, delivered=None):
+        """Consumer side: once per frame handed to a viewer"""
+        if meta is None:
+            return
+        delivered = time.time() if delivered is None else delivered
+        ready = meta['inference_end'] or meta['decoded']
+        if ready:
+            self.record('delivery', delivered - ready)
+        if meta['sim_time']:
+            self.record('glass_to_glass', delivered - meta['sim_time'])
+
+    def snapshot(self, histograms=False):
+        """Machine-readable per-stage summary (bucket counts only if asked)"""
+        with self.lock:
+            stages = {}
+            for stage, histogram in self.histograms.items():
+                summary = histogram.summary()
+                if not histograms:
+                    summary.pop('buckets_ms')
+                    summary.pop('counts')
+                stages[stage] = summary
+        return {'since': self.started, 'stages': stages}
+
+    def summary_rows(self):
+        """[stage, count, p50, p95, p99] rows for a dashboard table"""
+        stages = self.snapshot()['stages']
+        return [
+            [stage, s['count'], s['p50_ms'], s['p95_ms'], s['p99_ms']]
+            for stage, s in stages.items()
+        ]
+
+
+# Process-wide latency registry shared by capture, detection and display
+pipeline_latency = PipelineLatency()
@@ -1,105 +1,19 @@
-import airsim
-import numpy as np
-import cv2
-import threading
-import queue
-import time
 import gradio as gr
 from IPython.display import IFrame
-from ultralytics import RTDETR
 
-# Load the YOLO model
-model = RTDETR("rtdetr.pt")
+from airsim_camera import AirSimCameraHandler
+from detector_backends import BackgroundModel
+from detection_worker import DetectionWorker
 
-# AirSim Camera Handler Class
-class AirSimCameraHandler:
-    def __init__(self):
-        self.frame_queue = queue.Queue(maxsize=1)
-        self.stop_event = threading.Event()
-        self.thread = None
-        self.client = None
-
-    def connect_airsim(self):
-        """Establish connection to AirSim"""
-        try:
-            self.client = airsim.MultirotorClient()
-            self.client.confirmConnection()
-            print("AirSim Connected Successfully")
-            return True
-        except Exception as e:
-            print(f"AirSim Connection Error: {e}")
-            return False
-
-    def capture_frames(self):
-        """Thread function to capture frames"""
-        try:
-            while not self.stop_event.is_set():
-                # Capture frame from AirSim
-                responses = self.client.simGetImages([airsim.ImageRequest(
-                    '0', airsim.ImageType.Scene, False, False
-                )])
-
-                if responses and len(responses) > 0:
-                    response = responses[0]
-                    
-                    # Convert to numpy array
-                    img1d = np.frombuffer(response.image_data_uint8, dtype=np.uint8)
-                    
-                    # Reshape and convert color
-                    img_rgb = cv2.cvtColor(
-                        img1d.reshape(response.height, response.width, 3), 
-                        cv2.COLOR_BGR2RGB
-                    )
-                    
-                    # Clear queue if full
-                    try:
-                        self.frame_queue.get_nowait()
-                    except queue.Empty:
-                        pass
-                    
-                    self.frame_queue.put(img_rgb)
-                
-                time.sleep(0.1)  # Prevent overwhelming
-        except Exception as e:
-            print(f"Frame Capture Error: {e}")
-
-    def start_capture(self):
-        """Start the camera capture thread"""
-        # Ensure AirSim connection is established
-        if not self.client:
-            if not self.connect_airsim():
-                return False
-        
-        # If thread is already running, don't start again
-        if self.thread and self.thread.is_alive():
-            return True
-        
-        # Clear any existing stop event
-        self.stop_event.clear()
-        
-        # Create and start the thread
-        self.thread = threading.Thread(target=self.capture_frames)
-        self.thread.daemon = True
-        self.thread.start()
-        return True
-
-    def stop_capture(self):
-        """Stop the camera capture thread"""
-        if self.thread:
-            self.stop_event.set()
-            self.thread.join()
-            self.thread = None
-
-    def get_latest_frame(self):
-        """Get the latest frame from the queue"""
-        try:
-            return self.frame_queue.get_nowait()
-        except queue.Empty:
-            return None
+# Detector loads and warms up in the background once the UI is serving
+model = BackgroundModel()
 
 # Global AirSim handler
 airsim_handler = AirSimCameraHandler()
 
+# Detection runs on its own thread; frames pass through un-annotated until the model is ready
+detector = DetectionWorker(model, airsim_handler.frame_ring, classes=[0], demand=airsim_handler)  # Assuming class 0 for detection
+
 def create_interactive_map():
     """Generate an OpenStreetMap HTML iframe"""
     iframe = IFrame(
@@ -110,21 +24,19 @@ def create_interactive_map():
     return iframe._repr_html_()
 
 def update_camera_feed():
-    """Update camera feed and run detection on it"""
+    """Return the newest annotated frame; detection runs in the background"""
     try:
-        # Ensure AirSim capture is started
+        # Ensure AirSim capture, the model load and the detector are started
         airsim_handler.start_capture()
+        model.start()
+        detector.start()
+        airsim_handler.mark_read()
         
-        # Get latest frame
-        latest_frame = airsim_handler.get_latest_frame()
+        # Latest finished detection (or un-annotated frame while loading)
+        result = detector.latest()
         
-        if latest_frame is not None:
-            # Run object detection on the frame
-            results = model.predict(latest_frame, show=True, classes=[0])  # Assuming class 0 for detection
-            
-            # Process the result, add annotations (bounding boxes, etc.) to the frame
-            annotated_frame = results[0].plot()  # Assuming results is a list of detections
-            return annotated_frame
+        if result is not None:
+            return result.annotated
         
         return None
     except Exception as e:
@@ -164,8 +76,10 @@ def main():
 
         demo.load(update_camera_feed, outputs=camera_feed, every=1)
 
-    # Launch the demo
-    demo.launch(server_name='127.0.0.1', server_port=7860)
+    # Launch the demo, then load the model while the UI is already up
+    demo.launch(server_name='127.0.0.1', server_port=7860, prevent_thread_lock=True)
+    model.start()
+    demo.block_thread()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# Shared modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def standin():
+    """AirSim stand-in with three drones on a free port, stopped after the test"""
+    from airsim_standin import AirSimStandin
+    server = AirSimStandin(port=0, vehicles=('Drone-1', 'Drone-2', 'Drone-3'), width=64, height=48).start()
+    yield server
+    server.stop()
@@ -0,0 +1,43 @@
+import airsim
+
+from airsim_camera import AirSimCameraHandler
+
+
+def image_response(width, height):
+    response = airsim.ImageResponse()
+    response.width, response.height = width, height
+    response.image_data_uint8 = bytes(width * height * 3)
+    response.compress = False
+    return response
+
+
+# Answers with empty images for the first few calls, like a camera warming up
+class WarmingUpConnection:
+    def __init__(self, empty_calls=3):
+        self.empty_calls = empty_calls
+        self.calls = 0
+
+    def connect(self):
+        return True
+
+    def backoff(self, stop_event=None):
+        pass
+
+    def call(self, method, requests):
+        self.calls += 1
+        if self.calls <= self.empty_calls:
+            return [image_response(0, 0)]
+        return [image_response(4, 2)]
+
+
+def test_empty_responses_are_skipped():
+    handler = AirSimCameraHandler(target_fps=200, connection=WarmingUpConnection())
+    handler.start_capture()
+    try:
+        seq, frame = handler.wait_for_frame(timeout=5)
+    finally:
+        handler.stop_capture()
+    assert frame.shape == (2, 4, 3)
+    # The ring was never sized for a 0x0 frame
+    assert handler.frame_ring.shape == (2, 4, 3)
+    assert handler.frame_ring.generation_start == 0
@@ -0,0 +1,39 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'web'))
+import asgi_server
+from frame_broadcast import FrameBroadcaster
+
+
+def test_video_feed_leaves_when_the_client_does_while_the_sim_is_stalled(monkeypatch):
+    # No capture thread: the broadcaster never publishes, as with the simulator down
+    stalled = FrameBroadcaster()
+    monkeypatch.setattr(stalled, 'start', lambda: None)
+    monkeypatch.setattr(asgi_server, 'broadcaster', stalled)
+    monkeypatch.setattr(asgi_server, 'feed', None)
+    sent = []
+
+    async def run():
+        gone = asyncio.Event()
+
+        async def receive():
+            await gone.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'GET', 'path': '/video_feed', 'query_string': b''}
+        stream = asyncio.ensure_future(asgi_server.app(scope, receive, send))
+        await asyncio.sleep(0.1)
+        assert len(stalled.subscribers) == 1
+        gone.set()
+        # Well inside the subscriber's 1 s frame timeout
+        done, _ = await asyncio.wait({stream}, timeout=0.5)
+        assert stream in done
+
+    asyncio.run(run())
+    assert stalled.subscribers == set()
+    assert sent[0]['status'] == 200
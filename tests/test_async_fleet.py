@@ -0,0 +1,56 @@
+import time
+
+from airsim_standin import AirSimStandin
+from async_fleet import AsyncFleetEngine
+
+
+# Sends one truncated raw image for the first request, then behaves
+class CorruptOnceStandin(AirSimStandin):
+    def simGetImages(self, requests, vehicle_name='', external=False):
+        responses = super().simGetImages(requests, vehicle_name, external)
+        if self.calls == 1:
+            responses[0]['image_data_uint8'] = responses[0]['image_data_uint8'][:5]
+        return responses
+
+
+def test_every_drone_gets_frames_and_telemetry(standin):
+    engine = AsyncFleetEngine(list(standin.vehicles), port=standin.port, fps=50, telemetry_fps=20)
+    engine.start()
+    try:
+        frames = {vehicle: engine.wait_for_frame(vehicle, timeout=10) for vehicle in standin.vehicles}
+        # Telemetry lands on its own, slower tick
+        seq, frame = engine.wait_for_frame('Drone-1', frames['Drone-1'][0] + 5, timeout=10)
+    finally:
+        engine.stop()
+    for seq, frame in frames.values():
+        assert frame.shape == (48, 64, 3)
+    assert frame is not None
+    gps, state = engine.get_telemetry('Drone-1')
+    assert gps.gnss.geo_point.latitude != 0
+
+
+def test_corrupt_frame_does_not_end_the_vehicle_task():
+    server = CorruptOnceStandin(port=0, width=64, height=48).start()
+    engine = AsyncFleetEngine(['Drone-1'], port=server.port, fps=50, telemetry_fps=0)
+    engine.start()
+    try:
+        seq, frame = engine.wait_for_frame('Drone-1', timeout=10)
+    finally:
+        engine.stop()
+        server.stop()
+    assert frame is not None
+
+
+def test_stop_after_the_loop_closed():
+    # Nothing listens on this port, so the engine only retries until stopped
+    engine = AsyncFleetEngine(['Drone-1'], port=1, fps=10, telemetry_fps=0, timeout=0.1)
+    engine.start()
+    deadline = time.monotonic() + 5
+    while engine.stopped is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # run() ends on its own and the loop closes behind it
+    engine.loop.call_soon_threadsafe(engine.stopped.set)
+    engine.thread.join(timeout=5)
+    assert engine.loop.is_closed()
+    engine.stop()
+    assert engine.thread is None
@@ -0,0 +1,106 @@
+import time
+import numpy as np
+
+from batch_inference import BatchInferenceServer
+from frame_ring import FrameRing
+
+
+# One person box per image; records every batch size it was called with
+class FakeBoxes:
+    def __init__(self):
+        self.xyxy = np.array([[1, 1, 5, 5]], np.float32)
+        self.conf = np.array([0.9], np.float32)
+        self.cls = np.array([0], np.int64)
+
+
+class FakeResult:
+    boxes = FakeBoxes()
+
+
+class FakeBatchModel:
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, images, **kwargs):
+        self.batches.append(len(images))
+        return [FakeResult() for _ in images]
+
+
+def frame(value):
+    return np.full((8, 8, 3), value, np.uint8)
+
+
+def test_frames_of_several_drones_share_one_model_call():
+    streams = {name: FrameRing(4) for name in ('Drone-1', 'Drone-2', 'Drone-3')}
+    for index, ring in enumerate(streams.values()):
+        ring.write(frame(index))
+    model = FakeBatchModel()
+    routed = {}
+    server = BatchInferenceServer(model, streams, annotate=False, on_result=lambda key, result: routed.setdefault(key, result))
+    # A first batch measured the per-frame cost, so the next may hold every drone
+    server.frame_time = 0.001
+    server.start()
+    try:
+        results = [server.wait_for_result(key, timeout=5) for key in streams]
+    finally:
+        server.stop()
+    assert model.batches[0] == 3
+    assert set(routed) == set(streams)
+    assert all(len(result.boxes) == 1 for result in results)
+
+
+def test_batch_limit_follows_the_latency_budget():
+    server = BatchInferenceServer(FakeBatchModel(), {}, max_batch=8, latency_budget=0.1)
+    assert server.batch_limit() == 1
+    server.frame_time = 0.03
+    assert server.batch_limit() == 3
+    server.frame_time = 0.001
+    assert server.batch_limit() == 8
+
+
+def test_overwritten_newest_slot_does_not_spin():
+    ring = FrameRing(4)
+    ring.write(frame(1))
+    # A resolution change leaves latest_seq pointing at a slot that no longer holds it
+    ring.begin_write((16, 16, 3))
+    model = FakeBatchModel()
+    server = BatchInferenceServer(model, {'Drone-1': ring}, annotate=False)
+    calls = []
+    ready_streams = server.ready_streams
+    server.ready_streams = lambda: calls.append(1) or ready_streams()
+    server.start()
+    time.sleep(0.3)
+    server.stop()
+    assert model.batches == []
+    # Polls at poll_interval while idle instead of re-reading the stale slot flat out
+    assert len(calls) < 0.3 / server.poll_interval * 2
+
+
+# Model that is still loading: every frame takes the passthrough path
+class LoadingModel(FakeBatchModel):
+    def is_ready(self):
+        return False
+
+    def status(self):
+        return 'loading'
+
+
+def failing_consumer(key, result):
+    raise RuntimeError("consumer failed")
+
+
+def test_a_failing_callback_keeps_the_thread_and_the_batch_going():
+    for model in (LoadingModel(), FakeBatchModel()):
+        streams = {name: FrameRing(4) for name in ('Drone-1', 'Drone-2', 'Drone-3')}
+        for index, ring in enumerate(streams.values()):
+            ring.write(frame(index))
+        server = BatchInferenceServer(model, streams, annotate=False, on_result=failing_consumer)
+        server.frame_time = 0.001
+        server.start()
+        try:
+            results = [server.wait_for_result(key, timeout=5) for key in streams]
+            alive = server.thread.is_alive()
+        finally:
+            server.stop()
+        assert alive
+        assert all(result is not None for result in results)
@@ -0,0 +1,67 @@
+import threading
+import time
+
+from capture_pacing import CapturePacer, next_deadline
+
+
+def test_modes_follow_reads_and_bursts():
+    pacer = CapturePacer(target_fps=20, idle_fps=2, idle_after=5.0, burst_fps=50)
+    now = time.monotonic()
+    assert pacer.mode(now) == 'active'
+    assert pacer.period(now) == 1 / 20
+    assert pacer.mode(now + 6) == 'idle'
+    assert pacer.period(now + 6) == 1 / 2
+    pacer.request_burst(1.0)
+    assert pacer.mode() == 'burst'
+    assert pacer.period() == 1 / 50
+    # The burst ends back in active mode: it counts as a read
+    assert pacer.mode(time.monotonic() + 1.5) == 'active'
+
+
+def test_unlimited_burst_does_not_wait():
+    pacer = CapturePacer(target_fps=1, burst_fps=0)
+    pacer.request_burst(5.0)
+    assert pacer.period() == 0.0
+    started = time.monotonic()
+    assert pacer.wait(threading.Event())
+    assert pacer.wait(threading.Event())
+    assert time.monotonic() - started < 0.5
+
+
+def test_wait_sleeps_one_period():
+    pacer = CapturePacer(target_fps=20)
+    stop = threading.Event()
+    pacer.wait(stop)
+    started = time.monotonic()
+    assert pacer.wait(stop)
+    assert 0.03 <= time.monotonic() - started < 0.5
+
+
+def test_read_after_idle_cuts_the_idle_sleep_short():
+    pacer = CapturePacer(target_fps=20, idle_fps=0.1, idle_after=0.0)
+    time.sleep(0.01)
+    assert pacer.mode() == 'idle'
+    stop = threading.Event()
+    reader = threading.Timer(0.05, pacer.mark_read)
+    reader.start()
+    started = time.monotonic()
+    pacer.wait(stop)
+    reader.join()
+    # The idle period is 10 s
+    assert time.monotonic() - started < 2.0
+
+
+def test_wait_returns_false_once_stopped():
+    pacer = CapturePacer(target_fps=1)
+    stop = threading.Event()
+    stop.set()
+    assert not pacer.wait(stop)
+
+
+def test_deadlines_advance_by_a_period_and_resync_when_far_behind():
+    assert next_deadline(None, 0.25, 5.0) == 5.25
+    assert next_deadline(5.25, 0.25, 5.3) == 5.5
+    # A slow RPC within one period is caught up on the next tick
+    assert next_deadline(5.25, 0.25, 5.7) == 5.5
+    # More than a period behind: restart from now instead of bursting to catch up
+    assert next_deadline(5.25, 0.25, 6.0) == 6.0
@@ -0,0 +1,69 @@
+import numpy as np
+
+from change_gate import ChangeGate, thumbnail
+
+
+def scene(seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (240, 320, 3), dtype=np.uint8)
+
+
+def test_thumbnail_averages_blocks():
+    frame = np.zeros((256, 256, 3), np.uint8)
+    frame[:128] = 100
+    thumb = thumbnail(frame, grid=16, stride=4)
+    assert thumb.shape == (16, 16)
+    assert thumb[:8].tolist() == [[100.0] * 16] * 8
+    assert not thumb[8:].any()
+
+
+def test_first_frame_is_inferred_and_repeats_are_skipped():
+    gate = ChangeGate(max_age=60)
+    frame = scene()
+    assert gate.needs_inference(frame)
+    gate.mark_inferred()
+    assert not gate.needs_inference(frame.copy())
+    assert gate.skip_ratio() == 0.5
+
+
+def test_changed_scene_is_inferred():
+    gate = ChangeGate(max_age=60)
+    gate.needs_inference(scene(0))
+    gate.mark_inferred()
+    assert gate.needs_inference(scene(1))
+
+
+def test_small_local_change_is_inferred():
+    gate = ChangeGate(max_age=60)
+    frame = scene()
+    gate.needs_inference(frame)
+    gate.mark_inferred()
+    # A person-sized patch appearing still changes a few thumbnail cells
+    moved = frame.copy()
+    moved[100:130, 150:170] = 255
+    assert gate.needs_inference(moved)
+
+
+def test_sensor_noise_is_ignored():
+    gate = ChangeGate(max_age=60)
+    frame = scene()
+    gate.needs_inference(frame)
+    gate.mark_inferred()
+    noise = np.random.default_rng(1).integers(-3, 4, frame.shape)
+    assert not gate.needs_inference(np.clip(frame + noise, 0, 255).astype(np.uint8))
+
+
+def test_reference_expires_after_max_age():
+    gate = ChangeGate(max_age=0.0)
+    frame = scene()
+    gate.needs_inference(frame)
+    gate.mark_inferred()
+    assert gate.needs_inference(frame)
+
+
+def test_reset_forces_inference():
+    gate = ChangeGate(max_age=60)
+    frame = scene()
+    gate.needs_inference(frame)
+    gate.mark_inferred()
+    gate.reset()
+    assert gate.needs_inference(frame)
@@ -0,0 +1,41 @@
+import json
+
+import numpy as np
+
+from detection_overlay import detection_payload
+from detection_worker import DetectionResult
+
+
+def result(track_ids=None, locations=None):
+    boxes = np.array([[10.4, 20.6, 50.5, 80.2], [0, 0, 639.7, 479.9]], np.float32)
+    scores = np.array([0.876, 0.3049], np.float32)
+    return DetectionResult(42, boxes, scores, np.zeros(2, np.int64), None, None, track_ids, (480, 640), locations)
+
+
+def test_ready_payload_has_pixel_boxes_with_the_frame_size_labels_and_scores():
+    locations = np.array([[47.61234567, -122.1], [np.nan, np.nan]])
+    payload = detection_payload(result(np.array([7, 9]), locations), 'ready')
+    assert payload['status'] == 'ready'
+    assert payload['seq'] == 42
+    # The client scales boxes by its own size over width/height
+    assert (payload['width'], payload['height']) == (640, 480)
+    assert payload['boxes'] == [[10, 21, 50, 80], [0, 0, 640, 480]]
+    assert payload['scores'] == [0.88, 0.3]
+    assert payload['ids'] == [7, 9]
+    assert payload['locations'] == [[47.612346, -122.1], None]
+    # Goes over the wire as plain JSON
+    assert json.loads(json.dumps(payload)) == payload
+
+
+def test_untracked_result_has_no_ids_or_locations():
+    payload = detection_payload(result(), 'ready')
+    assert payload['ids'] == [] and payload['locations'] == []
+    assert len(payload['boxes']) == len(payload['scores']) == 2
+
+
+def test_missing_result_carries_only_the_status():
+    payload = detection_payload(None, 'loading')
+    assert payload['status'] == 'loading'
+    assert payload['seq'] == -1
+    assert payload['boxes'] == payload['scores'] == payload['ids'] == payload['locations'] == []
+    assert detection_payload(None)['status'] == 'ready'
@@ -0,0 +1,41 @@
+import numpy as np
+
+from detection_worker import DetectionResult, DetectionWorker, reuse_result
+
+
+def cached_result(track_ids=None):
+    boxes = np.array([[10, 10, 30, 40]], np.float32)
+    scores = np.array([0.8], np.float32)
+    classes = np.zeros(1, np.int64)
+    stale_image = np.full((60, 80, 3), 50, np.uint8)
+    return DetectionResult(3, boxes, scores, classes, stale_image, None, track_ids, (60, 80))
+
+
+def test_reused_boxes_are_drawn_on_the_current_frame():
+    current = np.full((60, 80, 3), 200, np.uint8)
+    result = reuse_result(cached_result(), 7, current.copy(), None)
+    assert result.seq == 7
+    # Background comes from the new frame, not the cached annotated one
+    assert result.annotated[55, 75].tolist() == [200, 200, 200]
+    assert result.annotated[10, 20].tolist() != [200, 200, 200]
+
+
+def test_reused_tracks_keep_their_ids():
+    result = reuse_result(cached_result(np.array([4])), 7, np.zeros((60, 80, 3), np.uint8), None)
+    assert result.track_ids.tolist() == [4]
+    assert result.annotated is not None
+
+
+def test_reuse_without_annotation_keeps_only_boxes():
+    result = reuse_result(cached_result(), 7, np.zeros((60, 80, 3), np.uint8), None, annotate=False)
+    assert result.annotated is None
+    assert result.boxes.tolist() == [[10, 10, 30, 40]]
+
+
+def test_a_failing_result_callback_does_not_stop_the_worker():
+    def broken(result):
+        raise RuntimeError("consumer failed")
+
+    worker = DetectionWorker(None, None, on_result=broken)
+    worker.publish(cached_result())
+    assert worker.latest().seq == 3
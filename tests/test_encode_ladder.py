@@ -0,0 +1,78 @@
+from encode_ladder import EncodeLadder
+from frame_broadcast import UPGRADE_AFTER, FrameBroadcaster, Subscriber, pick_rung
+
+FPS = 10
+
+
+def ladder():
+    """Three rungs measured at 100 kB, 25 kB and 6 kB per frame"""
+    ladder = EncodeLadder(workers=1, headroom=0.8)
+    for index, size in enumerate((100_000, 25_000, 6_000)):
+        ladder.record_size(index, size)
+    return ladder
+
+
+def subscriber(rung=None):
+    return Subscriber(FrameBroadcaster(target_fps=FPS, ladder=ladder()), max_fps=FPS, rung=rung)
+
+
+def test_choose_picks_the_best_rung_that_fits():
+    rungs = ladder()
+    # Needs 1 MB/s, 250 kB/s, 60 kB/s at 10 fps, with 20 % headroom
+    assert rungs.choose(2_000_000, FPS) == 0
+    assert rungs.choose(400_000, FPS) == 1
+    assert rungs.choose(100_000, FPS) == 2
+    # Nothing fits: the smallest rung rather than nothing
+    assert rungs.choose(1_000, FPS) == 2
+
+
+def test_unmeasured_rungs_are_estimated_from_the_top_one():
+    rungs = EncodeLadder(workers=1)
+    assert rungs.size(1) == 0.0
+    rungs.record_size(0, 100_000)
+    assert rungs.size(1) == 25_000
+    assert rungs.size(2) == 6_250
+
+
+def test_slow_viewer_drops_at_once_and_climbs_back_one_rung_at_a_time():
+    viewer = subscriber()
+    assert viewer.rung == 0
+    # 100 kB/s: only the bottom rung fits, and the viewer goes straight there
+    viewer.record_send(100_000, 1.0)
+    assert viewer.rung == 2
+    # The link recovers: each better rung needs UPGRADE_AFTER good sends in a row
+    for send in range(1, 2 * UPGRADE_AFTER + 5):
+        viewer.record_send(100_000, 0.01)
+        if send < UPGRADE_AFTER:
+            assert viewer.rung == 2
+        elif send < 2 * UPGRADE_AFTER:
+            assert viewer.rung == 1
+    # Top of the ladder: nowhere further to climb
+    assert viewer.rung == 0
+
+
+def test_a_bad_send_resets_the_climb():
+    viewer = subscriber()
+    viewer.record_send(100_000, 1.0)
+    for _ in range(UPGRADE_AFTER - 1):
+        viewer.record_send(100_000, 0.01)
+    viewer.throughput = 0.0
+    viewer.record_send(60_000, 1.0)
+    assert viewer.rung == 2 and viewer.upgrades == 0
+    viewer.record_send(100_000, 0.01)
+    assert viewer.rung == 2
+
+
+def test_pinned_rung_ignores_throughput():
+    viewer = subscriber(rung=1)
+    viewer.record_send(1_000, 1.0)
+    assert viewer.rung == 1
+    assert subscriber(rung=99).rung == 2
+
+
+def test_pick_rung_falls_back_to_the_nearest_encoded_rung():
+    frames = {0: ('big', b''), 2: ('small', b'')}
+    assert pick_rung(frames, 0) == ('big', b'')
+    # Equally near: the smaller image
+    assert pick_rung(frames, 1) == ('small', b'')
+    assert pick_rung({0: ('big', b'')}, 2) == ('big', b'')
@@ -0,0 +1,59 @@
+import airsim
+import numpy as np
+import pytest
+
+from airsim_connection import ConnectionManager
+from fleet_capture import FleetCaptureEngine
+
+
+def test_every_drone_stream_fills_its_own_ring(standin):
+    vehicles = list(standin.vehicles)
+    engine = FleetCaptureEngine(vehicles, target_fps=100, connection=ConnectionManager(port=standin.port))
+    engine.start_capture()
+    try:
+        frames = {vehicle: engine.wait_for_frame(vehicle, timeout=10) for vehicle in vehicles}
+    finally:
+        engine.stop_capture()
+    for vehicle, (seq, frame) in frames.items():
+        assert seq >= 0
+        assert frame.shape == (48, 64, 3)
+    # The stand-in renders each drone's view differently
+    assert not np.array_equal(frames['Drone-1'][1], frames['Drone-2'][1])
+
+
+def test_depth_streams_are_float(standin):
+    engine = FleetCaptureEngine(
+        ['Drone-1'], image_types=(airsim.ImageType.Scene, airsim.ImageType.DepthPlanar),
+        connection=ConnectionManager(port=standin.port),
+    )
+    assert engine.fetch_vehicle('Drone-1') == 2
+    seq, depth = engine.stream('Drone-1', image_type=airsim.ImageType.DepthPlanar).read_latest()
+    assert depth.dtype == np.float32
+    assert depth.shape == (48, 64)
+
+
+# Returns one truncated raw image per drone, then good ones
+class CorruptOnceConnection:
+    def __init__(self):
+        self.calls = 0
+
+    def call(self, method, requests, vehicle_name=''):
+        self.calls += 1
+        response = airsim.ImageResponse()
+        response.width, response.height = 4, 2
+        response.compress = False
+        response.image_data_uint8 = bytes(5 if self.calls == 1 else 24)
+        return [response]
+
+
+def test_corrupt_response_costs_one_frame():
+    engine = FleetCaptureEngine(['Drone-1'], connection=CorruptOnceConnection())
+    assert engine.fetch_vehicle('Drone-1') == 0
+    assert engine.fetch_vehicle('Drone-1') == 1
+    assert engine.stream('Drone-1').read_latest()[1].shape == (2, 4, 3)
+
+
+def test_adaptive_transfer_is_rejected():
+    # One batched RPC per vehicle has no per-frame transfer mode to adapt
+    with pytest.raises(ValueError):
+        FleetCaptureEngine(['Drone-1'], transfer_mode='auto')
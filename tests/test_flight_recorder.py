@@ -0,0 +1,105 @@
+import time
+import types
+
+import numpy as np
+
+from detection_worker import DetectionResult
+from flight_recorder import KIND_FRAME, KIND_TELEMETRY, SCAN_WINDOW, FlightReader, FlightRecorder
+from frame_ring import FrameRing
+from pipeline_latency import FRAME_META_DTYPE
+
+
+def frame(value):
+    return np.full((24, 32, 3), value, np.uint8)
+
+
+def test_frames_and_telemetry_read_back_at_any_moment(tmp_path):
+    recorder = FlightRecorder(str(tmp_path), bucket=0.1)
+    for step in range(50):
+        recorder.record_frame(frame(step * 5), timestamp=1000.0 + step * 0.1)
+        if step % 10 == 0:
+            recorder.record_telemetry({'step': step}, timestamp=1000.0 + step * 0.1)
+    recorder.close()
+
+    reader = FlightReader(str(tmp_path))
+    assert reader.span() == (1000.0, 1000.0 + 49 * 0.1)
+    timestamp, image = reader.frame_at(1002.03)
+    assert abs(timestamp - 1002.0) < 1e-9
+    assert abs(int(image[0, 0, 0]) - 100) <= 3
+    assert reader.telemetry_at(1003.5)[1] == {'step': 30}
+    assert reader.frame_at(999.0) is None
+    assert reader.detections_at(1003.0) is None
+    reader.close()
+
+
+def test_sparse_kind_is_found_behind_many_dense_records(tmp_path):
+    recorder = FlightRecorder(str(tmp_path), bucket=0.1)
+    recorder.record_telemetry({'fix': 1}, timestamp=1000.0)
+    dense = SCAN_WINDOW + 500
+    for step in range(dense):
+        recorder.append(KIND_FRAME, 1000.0 + (step + 1) * 1e-4, b'jpeg')
+    recorder.close()
+
+    reader = FlightReader(str(tmp_path))
+    assert reader.count == dense + 1
+    assert reader.telemetry_at(1000.0 + dense * 1e-4)[1] == {'fix': 1}
+    assert reader.locate(1000.0 + dense * 1e-4, KIND_TELEMETRY) == 0
+    reader.close()
+
+
+def test_recording_resumes_after_a_restart(tmp_path):
+    first = FlightRecorder(str(tmp_path))
+    first.record_telemetry({'leg': 1}, timestamp=1000.0)
+    first.close()
+    second = FlightRecorder(str(tmp_path))
+    second.record_telemetry({'leg': 2}, timestamp=1010.0)
+    second.close()
+
+    reader = FlightReader(str(tmp_path))
+    assert reader.count == 2
+    assert reader.telemetry_at(1005.0)[1] == {'leg': 1}
+    assert reader.telemetry_at(1010.0)[1] == {'leg': 2}
+    # Each session writes its own segment
+    assert reader.index['segment'].tolist() == [0, 1]
+    reader.close()
+
+
+def test_old_segments_roll_off(tmp_path):
+    recorder = FlightRecorder(str(tmp_path), segment_seconds=1.0, max_segments=2)
+    for step in range(6):
+        recorder.record_telemetry({'step': step}, timestamp=1000.0 + step)
+    recorder.close()
+
+    reader = FlightReader(str(tmp_path))
+    assert sorted(p.name for p in tmp_path.glob('segment_*.bin'))[0] != 'segment_000000.bin'
+    # Indexed still, but its bytes are gone
+    assert reader.telemetry_at(1000.5) is None
+    assert reader.telemetry_at(1005.0)[1] == {'step': 5}
+    reader.close()
+
+
+def test_recording_thread_writes_queued_detections_without_marking_reads(tmp_path):
+    ring = FrameRing(4, meta_dtype=FRAME_META_DTYPE)
+    ring.write(frame(80))
+    marked = []
+    handler = types.SimpleNamespace(
+        frame_ring=ring,
+        read_latest=lambda: marked.append(True) or ring.read_latest(),
+    )
+    recorder = FlightRecorder(str(tmp_path), handler, record_fps=50, telemetry_every=0)
+    recorder.start()
+    boxes = np.array([[1, 2, 10, 12]], np.float32)
+    result = DetectionResult(0, boxes, np.array([0.9], np.float32), np.zeros(1, np.int64), None, None,
+                             shape=(24, 32))
+    assert recorder.record_detections(result, 'loading') is None
+    deadline = time.monotonic() + 5
+    while recorder.count < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    recorder.close()
+
+    assert marked == []
+    reader = FlightReader(str(tmp_path))
+    found = [payload for _, kind, payload in reader.records(0, time.time() + 1) if kind != KIND_FRAME]
+    assert len(found) == 1
+    assert b'"status": "loading"' in found[0]
+    reader.close()
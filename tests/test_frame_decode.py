@@ -0,0 +1,50 @@
+import airsim
+import numpy as np
+
+from frame_decode import DecodePipeline, write_response
+from frame_ring import FrameRing
+from pipeline_latency import FRAME_META_DTYPE
+
+
+def rgb_response(bgr):
+    response = airsim.ImageResponse()
+    response.height, response.width = bgr.shape[:2]
+    response.image_data_uint8 = bgr.tobytes()
+    response.compress = False
+    response.pixels_as_float = False
+    response.time_stamp = 2_000_000_000
+    return response
+
+
+def depth_response(depth):
+    response = airsim.ImageResponse()
+    response.height, response.width = depth.shape
+    response.image_data_float = depth.ravel().tolist()
+    response.compress = False
+    response.pixels_as_float = True
+    response.time_stamp = 2_000_000_000
+    return response
+
+
+def test_rgb_and_depth_decode_into_the_ring():
+    ring = FrameRing(4, meta_dtype=FRAME_META_DTYPE)
+    bgr = np.zeros((4, 6, 3), np.uint8)
+    bgr[..., 0] = 200
+    seq = write_response(ring, rgb_response(bgr), 1.0, 2.0)
+    # BGR from the simulator, RGB in the ring
+    assert ring.read(seq)[0, 0].tolist() == [0, 0, 200]
+    assert ring.read_meta(seq)['sim_time'] == 2.0
+
+    depth = np.arange(12, dtype=np.float32).reshape(3, 4)
+    ring = FrameRing(4, dtype=np.float32)
+    seq = write_response(ring, depth_response(depth))
+    assert np.array_equal(ring.read(seq), depth)
+
+
+def test_pipeline_decodes_depth_through_the_same_routine():
+    ring = FrameRing(4, dtype=np.float32)
+    pipeline = DecodePipeline(ring, workers=2)
+    depth = np.full((3, 4), 1.5, np.float32)
+    seq = pipeline.submit(depth_response(depth))
+    pipeline.shutdown()
+    assert np.array_equal(ring.read(seq), depth)
@@ -0,0 +1,84 @@
+import asyncio
+
+from frame_broadcast import AsyncFrameFeed, AsyncSubscriber, FrameBroadcaster
+from frame_push import FRAME_HEADER, websocket_feed
+
+
+# In-process WebSocket peer for websocket_feed: queues what it says, collects what it gets
+class FakeClient:
+    def __init__(self):
+        self.inbox = asyncio.Queue()
+        self.inbox.put_nowait({'type': 'websocket.connect'})
+        self.frames = []
+
+    async def receive(self):
+        return await self.inbox.get()
+
+    async def send(self, message):
+        if message['type'] == 'websocket.send':
+            self.frames.append(FRAME_HEADER.unpack_from(message['bytes'])[0])
+
+    def say(self, text):
+        self.inbox.put_nowait({'type': 'websocket.receive', 'text': text})
+
+    def leave(self):
+        self.inbox.put_nowait({'type': 'websocket.disconnect', 'code': 1000})
+
+
+def run_feed(monkeypatch, script):
+    """Drive websocket_feed against a broadcaster fed by hand; script(client, publish) is a coroutine"""
+    broadcaster = FrameBroadcaster()
+    monkeypatch.setattr(broadcaster, 'start', lambda: None)
+
+    async def main():
+        feed = AsyncFrameFeed(broadcaster)
+        client = FakeClient()
+        server = asyncio.ensure_future(websocket_feed(feed, {'query_string': b''}, client.receive, client.send, window=2))
+
+        async def publish(data):
+            broadcaster.publish(data)
+            await asyncio.sleep(0.05)
+
+        await asyncio.sleep(0.05)
+        await script(client, publish)
+        client.leave()
+        await asyncio.wait_for(server, 5)
+        feed.close()
+
+    asyncio.run(main())
+
+
+def test_server_waits_for_acks_once_the_window_is_full(monkeypatch):
+    async def script(client, publish):
+        for index in range(4):
+            await publish(b'frame %d' % index)
+        # Two frames out unanswered: the rest wait
+        assert client.frames == [0, 1]
+        client.say(f'ack {client.frames[0]}')
+        await asyncio.sleep(0.05)
+        # The freed credit goes to the newest frame, not the next in line
+        assert client.frames == [0, 1, 3]
+
+    run_feed(monkeypatch, script)
+
+
+def test_acks_are_matched_to_their_frame_when_a_pending_one_is_replaced(monkeypatch):
+    samples = []
+    record_send = AsyncSubscriber.record_send
+    monkeypatch.setattr(AsyncSubscriber, 'record_send',
+                        lambda self, size, seconds: samples.append(size) or record_send(self, size, seconds))
+
+    async def script(client, publish):
+        await publish(b'a' * 10)
+        await publish(b'b' * 1000)
+        assert client.frames == [0, 1]
+        # The client replaced frame 0 before drawing it, then drew frame 1
+        client.say('drop 0')
+        client.say('ack 1')
+        await asyncio.sleep(0.05)
+        await publish(b'c' * 10)
+        assert client.frames == [0, 1, 2]
+
+    run_feed(monkeypatch, script)
+    # Only the drawn frame is a throughput sample
+    assert samples == [1000]
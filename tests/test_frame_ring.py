@@ -0,0 +1,97 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from frame_ring import FrameRing
+from pipeline_latency import FRAME_META_DTYPE
+
+
+def frame(value, shape=(4, 6, 3)):
+    return np.full(shape, value, np.uint8)
+
+
+def test_needs_two_slots():
+    with pytest.raises(ValueError):
+        FrameRing(1)
+
+
+def test_latest_frame_is_read_only_and_tracks_seq():
+    ring = FrameRing(3)
+    assert ring.read_latest() == (-1, None)
+    for value in range(5):
+        seq = ring.write(frame(value))
+    latest_seq, latest = ring.read_latest()
+    assert latest_seq == seq == 4
+    assert latest[0, 0, 0] == 4
+    with pytest.raises(ValueError):
+        latest[0, 0, 0] = 9
+
+
+def test_overwritten_slots_become_invalid():
+    ring = FrameRing(2, meta_dtype=FRAME_META_DTYPE)
+    first = ring.write(frame(1))
+    assert ring.is_valid(first) and ring.read(first) is not None
+    assert ring.read_meta(first) is not None
+    ring.write(frame(2))
+    ring.write(frame(3))
+    assert not ring.is_valid(first)
+    assert ring.read(first) is None
+    assert ring.read_meta(first) is None
+
+
+def test_reserved_slot_is_invalid_until_committed():
+    ring = FrameRing(2)
+    seq, slot = ring.begin_write((4, 6, 3))
+    slot[:] = 7
+    assert not ring.is_valid(seq)
+    assert ring.read_latest() == (-1, None)
+    ring.commit(seq)
+    assert ring.read_latest()[0] == seq
+
+
+def test_resolution_change_drops_frames_reserved_before_it():
+    ring = FrameRing(4)
+    stale, _ = ring.begin_write((4, 6, 3))
+    fresh = ring.write(frame(5, (8, 10, 3)))
+    # The older-resolution slot committed late must not be published
+    ring.commit(stale)
+    assert not ring.is_valid(stale)
+    seq, latest = ring.read_latest()
+    assert seq == fresh and latest.shape == (8, 10, 3)
+
+
+def test_wait_for_frame_wakes_on_commit_and_times_out():
+    ring = FrameRing(2)
+    assert ring.wait_for_frame(-1, timeout=0.01) == (-1, None)
+    writer = threading.Timer(0.05, ring.write, (frame(3),))
+    writer.start()
+    seq, latest = ring.wait_for_frame(-1, timeout=5)
+    writer.join()
+    assert seq == 0 and latest[0, 0, 0] == 3
+    assert ring.wait_for_frame(seq, timeout=0.01) == (seq, None)
+
+
+def test_reader_waits_for_the_commit_while_the_newest_slot_is_rewritten():
+    ring = FrameRing(2)
+    ring.write(frame(1))
+    # Resizing invalidates every slot, including the newest, until the next commit
+    seq, slot = ring.begin_write((8, 10, 3))
+    slot[:] = 9
+    writer = threading.Timer(0.1, ring.commit, (seq,))
+    writer.start()
+    started = time.monotonic()
+    found_seq, latest = ring.wait_for_frame(-1, timeout=5)
+    writer.join()
+    assert time.monotonic() - started >= 0.05
+    assert found_seq == seq and latest[0, 0, 0] == 9
+
+
+def test_invalid_newest_slot_blocks_until_the_timeout():
+    ring = FrameRing(2)
+    ring.write(frame(1))
+    ring.begin_write((8, 10, 3))
+    started = time.monotonic()
+    assert ring.wait_for_frame(-1, timeout=0.1) == (-1, None)
+    assert time.monotonic() - started >= 0.09
@@ -0,0 +1,68 @@
+import math
+
+import numpy as np
+
+from geolocation import EARTH_RADIUS, CameraPose, Geolocator, project_to_ground, quaternion_to_matrix
+
+LATITUDE, LONGITUDE = 47.6, -122.1
+# 640x480 frame, 90 degree horizontal FOV: focal length 320 px
+WIDTH, HEIGHT, FOV = 640, 480, 90
+
+
+def pose(rotation, height=100.0):
+    return CameraPose(LATITUDE, LONGITUDE, height, rotation, FOV, 0.0)
+
+
+def pitch(degrees):
+    half = math.radians(degrees) / 2
+    return quaternion_to_matrix(math.cos(half), 0.0, math.sin(half), 0.0)
+
+
+def metres(latitude, longitude):
+    """(north, east) metres from the camera's position"""
+    north = np.radians(latitude - LATITUDE) * EARTH_RADIUS
+    east = np.radians(longitude - LONGITUDE) * EARTH_RADIUS * math.cos(math.radians(LATITUDE))
+    return north, east
+
+
+def test_quaternion_to_matrix():
+    assert np.allclose(quaternion_to_matrix(1, 0, 0, 0), np.eye(3))
+    # 90 degree yaw turns forward (north) into east
+    half = math.radians(90) / 2
+    yaw = quaternion_to_matrix(math.cos(half), 0, 0, math.sin(half))
+    assert np.allclose(yaw @ [1, 0, 0], [0, 1, 0])
+    assert np.allclose(yaw @ yaw.T, np.eye(3))
+    # Pitching down 90 degrees points the camera at the ground (+z in NED)
+    assert np.allclose(pitch(-90) @ [1, 0, 0], [0, 0, 1])
+
+
+def test_nadir_centre_pixel_is_the_point_below_the_camera():
+    points = np.array([[WIDTH / 2, HEIGHT / 2], [WIDTH, HEIGHT / 2]])
+    latitude, longitude = project_to_ground(points, WIDTH, HEIGHT, pose(pitch(-90)))
+    north, east = metres(latitude, longitude)
+    assert np.allclose([north[0], east[0]], 0, atol=1e-6)
+    # Right edge of a 90 degree FOV from 100 m: 100 m to the east
+    assert np.allclose([north[1], east[1]], [0, 100], atol=1e-3)
+
+
+def test_oblique_ray_from_a_level_camera():
+    # Bottom-centre pixel: ray (320, 0, 240) meets the ground 100 m down after 320 * 100 / 240 m
+    latitude, longitude = project_to_ground(np.array([[WIDTH / 2, HEIGHT]]), WIDTH, HEIGHT, pose(np.eye(3)))
+    north, east = metres(latitude, longitude)
+    assert np.allclose(north, 320 * 100 / 240, atol=1e-3)
+    assert np.allclose(east, 0, atol=1e-6)
+
+
+def test_rays_at_or_above_the_horizon_have_no_ground_point():
+    points = np.array([[WIDTH / 2, HEIGHT / 2], [WIDTH / 2, 0]])
+    latitude, longitude = project_to_ground(points, WIDTH, HEIGHT, pose(np.eye(3)))
+    assert np.isnan(latitude).all() and np.isnan(longitude).all()
+
+
+def test_locate_uses_the_bottom_centre_of_each_box():
+    geolocator = Geolocator(connection=object())
+    latitude, longitude = geolocator.locate([[300, 400, 340, 480]], (HEIGHT, WIDTH), pose(np.eye(3)))
+    north, east = metres(latitude, longitude)
+    assert np.allclose(north, 320 * 100 / 240, atol=1e-3)
+    empty = geolocator.locate(np.zeros((0, 4)), (HEIGHT, WIDTH), pose(np.eye(3)))
+    assert len(empty[0]) == 0
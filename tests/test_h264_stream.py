@@ -0,0 +1,73 @@
+import io
+import struct
+import types
+
+from h264_stream import H264Stream, NON_SYNC_SAMPLE, codec_mime, fragment_is_keyframe
+
+
+def box(box_type, payload):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def full_box(box_type, flags, payload):
+    return box(box_type, struct.pack('>I', flags) + payload)
+
+
+def moof(tfhd=None, trun=None):
+    boxes = [box(b'mfhd', struct.pack('>II', 0, 1))]
+    traf = (tfhd or full_box(b'tfhd', 0, struct.pack('>I', 1))) + (trun or b'')
+    return box(b'moof', b''.join(boxes) + box(b'traf', traf))
+
+
+def test_keyframe_from_first_sample_flags():
+    # data offset present, then first_sample_flags
+    trun = full_box(b'trun', 0x1 | 0x4, struct.pack('>IiI', 1, 100, 0))
+    assert fragment_is_keyframe(moof(trun=trun))
+    trun = full_box(b'trun', 0x1 | 0x4, struct.pack('>IiI', 1, 100, NON_SYNC_SAMPLE))
+    assert not fragment_is_keyframe(moof(trun=trun))
+
+
+def test_keyframe_from_per_sample_flags():
+    # duration and size come before each sample's flags
+    for sample_flags, expected in ((0, True), (NON_SYNC_SAMPLE, False)):
+        trun = full_box(b'trun', 0x100 | 0x200 | 0x400, struct.pack('>IIII', 1, 3000, 512, sample_flags))
+        assert fragment_is_keyframe(moof(trun=trun)) is expected
+
+
+def test_keyframe_from_track_fragment_defaults():
+    # tfhd: track id, default duration, default size, default flags
+    for sample_flags, expected in ((0, True), (NON_SYNC_SAMPLE, False)):
+        tfhd = full_box(b'tfhd', 0x8 | 0x10 | 0x20, struct.pack('>IIII', 1, 3000, 512, sample_flags))
+        trun = full_box(b'trun', 0x1, struct.pack('>Ii', 1, 100))
+        assert fragment_is_keyframe(moof(tfhd, trun)) is expected
+
+
+def test_fragment_without_sample_info_counts_as_keyframe():
+    assert fragment_is_keyframe(box(b'moof', box(b'mfhd', struct.pack('>II', 0, 1))))
+
+
+def test_codec_mime_reads_avcc_profile_and_level():
+    avcc = box(b'avcC', bytes([1, 0x64, 0x00, 0x28, 0xff]))
+    init = box(b'ftyp', b'isom') + box(b'moov', box(b'avc1', avcc))
+    assert codec_mime(init) == 'video/mp4; codecs="avc1.640028"'
+    assert codec_mime(box(b'ftyp', b'isom')) == 'video/mp4; codecs="avc1.42E01E"'
+
+
+def test_output_of_a_replaced_encoder_is_dropped():
+    trun = full_box(b'trun', 0x4, struct.pack('>II', 1, 0))
+    output = box(b'ftyp', b'isom') + box(b'moov', b'') + moof(trun=trun) + box(b'mdat', b'frame')
+    stream = H264Stream(camera_handler=None)
+    seen = []
+    stream.add_listener(lambda kind, data, keyframe: seen.append(kind))
+
+    old = types.SimpleNamespace(stdout=io.BytesIO(output))
+    stream.process = object()
+    stream.read_fragments(old)
+    assert seen == [] and stream.init is None and stream.gop == []
+
+    current = types.SimpleNamespace(stdout=io.BytesIO(output))
+    stream.process = current
+    stream.read_fragments(current)
+    assert seen == ['init', 'fragment']
+    assert stream.init.startswith(box(b'ftyp', b'isom'))
+    assert len(stream.gop) == 1
@@ -0,0 +1,116 @@
+import numpy as np
+
+from detection_worker import DetectionResult
+from people_registry import METRES_PER_DEGREE, PeopleRegistry, apply_changes, table_rows
+from pipeline_latency import FRAME_META_DTYPE
+
+LAT, LON = 28.6139, 77.2090
+
+
+def north(metres):
+    """Latitude `metres` north of the origin"""
+    return LAT + metres / METRES_PER_DEGREE
+
+
+def result(locations, scores, inferred=True, track_ids=None):
+    meta = np.zeros((), FRAME_META_DTYPE)
+    meta['sim_time'] = 1000.0
+    if inferred:
+        meta['inference_start'], meta['inference_end'] = 1000.0, 1000.1
+    count = len(locations)
+    return DetectionResult(
+        1, np.zeros((count, 4), np.float32), np.asarray(scores, np.float32), np.zeros(count, np.int64),
+        None, meta, track_ids, (480, 640), np.asarray(locations, np.float64),
+    )
+
+
+def test_nearby_sightings_merge_and_distant_ones_do_not():
+    registry = PeopleRegistry(merge_distance=10.0)
+    first = registry.add(LAT, LON, 0.8, 'Drone-1', timestamp=0)
+    assert registry.add(north(4), LON, 0.8, 'Drone-2', timestamp=1) == first
+    assert registry.add(north(50), LON, 0.8, 'Drone-1', timestamp=2) != first
+    person = registry.people[first]
+    assert person.sightings == 2
+    assert person.vehicles == {'Drone-1', 'Drone-2'}
+
+
+def test_old_records_do_not_absorb_new_sightings():
+    registry = PeopleRegistry(merge_window=60.0)
+    first = registry.add(LAT, LON, 0.8, timestamp=0)
+    assert registry.add(LAT, LON, 0.8, timestamp=100) != first
+
+
+def test_weak_and_unlocated_sightings_are_rejected():
+    registry = PeopleRegistry(min_score=0.3)
+    assert registry.add(LAT, LON, 0.1) is None
+    assert registry.add(float('nan'), LON, 0.9) is None
+    assert not registry.people
+
+
+def test_a_track_keeps_feeding_its_record():
+    registry = PeopleRegistry(merge_distance=10.0)
+    first = registry.add(LAT, LON, 0.8, 'Drone-1', track_id=7, timestamp=0)
+    # Walked well past merge_distance, still the same track
+    assert registry.add(north(30), LON, 0.8, 'Drone-1', track_id=7, timestamp=5) == first
+
+
+def test_records_that_drift_together_are_consolidated():
+    registry = PeopleRegistry(merge_distance=10.0)
+    a = registry.add(LAT, LON, 0.9, timestamp=0)
+    b = registry.add(north(12), LON, 0.5, timestamp=0)
+    version = registry.version
+    # Merging into b pulls it within merge_distance of a; b is then the heavier record
+    registry.add(north(8), LON, 0.9, timestamp=1)
+    assert list(registry.people) == [b]
+    assert registry.people[b].sightings == 3
+    changes = registry.changes_since(version)
+    assert changes['removed'] == [a]
+    assert [person['id'] for person in changes['people']] == [b]
+
+
+def test_changes_since_is_incremental():
+    registry = PeopleRegistry()
+    a = registry.add(LAT, LON, 0.8, timestamp=0)
+    version = registry.version
+    b = registry.add(north(100), LON, 0.8, timestamp=0)
+    changes = registry.changes_since(version)
+    assert [person['id'] for person in changes['people']] == [b]
+    assert changes['removed'] == [] and not changes['full']
+    assert registry.changes_since(changes['version'])['people'] == []
+    assert a != b
+
+
+def test_pruned_removals_force_a_full_copy():
+    registry = PeopleRegistry(merge_distance=10.0, max_removed=1)
+    for offset in (0, 200, 400):
+        registry.add(north(offset), LON, 0.9, timestamp=0)
+        registry.add(north(offset + 12), LON, 0.5, timestamp=0)
+        registry.add(north(offset + 8), LON, 0.9, timestamp=0)
+    assert len(registry.removed) == 1
+    changes = registry.changes_since(0)
+    assert changes['full']
+    assert sorted(person['id'] for person in changes['people']) == sorted(registry.people)
+    # A consumer that kept up only sees the removal it has not applied yet
+    assert not registry.changes_since(registry.removed_floor)['full']
+
+
+def test_consumer_copy_matches_the_registry():
+    registry = PeopleRegistry(merge_distance=10.0)
+    people, version = {}, 0
+    for step, offset in enumerate((0, 12, 8, 100, 300, 104)):
+        registry.add(north(offset), LON, 0.5 + step * 0.05, timestamp=step)
+        changes = registry.changes_since(version)
+        apply_changes(people, changes)
+        version = changes['version']
+    assert table_rows(people) == registry.rows()
+
+
+def test_only_detector_runs_are_merged():
+    registry = PeopleRegistry()
+    registry.add_result(result([(LAT, LON)], [0.9]))
+    confidence = registry.people[1].confidence
+    # Tracker-predicted or gate-reused frames carry no inference stamps
+    for _ in range(20):
+        assert registry.add_result(result([(LAT, LON)], [0.9], inferred=False)) == []
+    assert registry.people[1].confidence == confidence
+    assert registry.people[1].sightings == 1
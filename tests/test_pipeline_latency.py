@@ -0,0 +1,68 @@
+import numpy as np
+
+from pipeline_latency import BUCKET_EDGES, FRAME_META_DTYPE, LatencyHistogram, PipelineLatency
+
+
+def meta(**stamps):
+    record = np.zeros((), FRAME_META_DTYPE)
+    for name, value in stamps.items():
+        record[name] = value
+    return record
+
+
+def test_percentiles_are_bucket_upper_edges():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    for _ in range(90):
+        histogram.record(0.010)
+    for _ in range(10):
+        histogram.record(1.0)
+    p50, p99 = histogram.percentile(50), histogram.percentile(99)
+    # The reported value bounds the sample from above, within one log bucket
+    ratio = BUCKET_EDGES[1] / BUCKET_EDGES[0]
+    assert 0.010 <= p50 < 0.010 * ratio
+    assert 1.0 <= p99 < 1.0 * ratio
+    summary = histogram.summary()
+    assert summary['count'] == 100
+    assert summary['max_ms'] == 1000.0
+    assert abs(summary['mean_ms'] - 109.0) < 1e-6
+
+
+def test_samples_beyond_the_last_edge_report_the_last_edge():
+    histogram = LatencyHistogram()
+    histogram.record(1000.0)
+    assert histogram.percentile(50) == BUCKET_EDGES[-1]
+
+
+def test_each_stage_is_recorded_from_the_frame_stamps():
+    latency = PipelineLatency()
+    frame = meta(sim_time=100.0, rpc_start=100.01, rpc_end=100.03, decoded=100.035,
+                 inference_start=100.04, inference_end=100.09)
+    latency.record_capture(frame)
+    latency.record_inference(frame)
+    latency.record_delivery(frame, delivered=100.1)
+    stages = latency.snapshot()['stages']
+    assert all(stages[stage]['count'] == 1 for stage in stages)
+    assert abs(stages['rpc']['max_ms'] - 20.0) < 1e-3
+    assert abs(stages['inference']['max_ms'] - 50.0) < 1e-3
+    # Detections were ready at inference_end
+    assert abs(stages['delivery']['max_ms'] - 10.0) < 1e-3
+    assert abs(stages['glass_to_glass']['max_ms'] - 100.0) < 1e-3
+    assert 'counts' not in stages['rpc']
+    assert len(latency.snapshot(histograms=True)['stages']['rpc']['counts']) == len(BUCKET_EDGES) + 1
+
+
+def test_missing_stamps_and_clock_skew_are_skipped():
+    latency = PipelineLatency()
+    # Sim clock ahead of ours: a negative latency is not a sample
+    latency.record_capture(meta(sim_time=200.0, rpc_start=100.0, rpc_end=100.02))
+    latency.record_delivery(None)
+    latency.record_delivery(meta(decoded=100.0), delivered=100.05)
+    stages = latency.snapshot()['stages']
+    assert stages['sim_to_capture']['count'] == 0
+    assert stages['rpc']['count'] == 1
+    assert stages['decode']['count'] == 0
+    # Undetected frames are delivered from their decode time
+    assert stages['delivery']['count'] == 1
+    assert stages['glass_to_glass']['count'] == 0
+    assert latency.summary_rows()[1][:2] == ['rpc', 1]
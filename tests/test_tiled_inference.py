@@ -0,0 +1,94 @@
+import numpy as np
+
+import detector_backends
+from detector_backends import BackgroundModel
+from detection_worker import draw_boxes
+from tiled_inference import TiledDetector, TiledResult, suppress, tile_origins
+
+
+# Records the crops it sees; one fixed box per crop
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, images, **kwargs):
+        self.calls.append([image.shape for image in images])
+        return [FakeResult() for _ in images]
+
+
+class FakeBoxes:
+    def __init__(self):
+        self.xyxy = np.array([[10, 10, 20, 30]], np.float32)
+        self.conf = np.array([0.9], np.float32)
+        self.cls = np.array([0], np.int64)
+
+    def __len__(self):
+        return 1
+
+
+class FakeResult:
+    def __init__(self):
+        self.boxes = FakeBoxes()
+
+
+def textured(height, width):
+    return np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+
+def test_tile_origins_cover_the_edge():
+    assert tile_origins(100, 640, 512) == [0]
+    assert tile_origins(1000, 640, 512) == [0, 360]
+    assert tile_origins(1920, 640, 512) == [0, 512, 1024, 1280]
+
+
+def test_intersection_over_smaller_merges_a_cut_person():
+    boxes = np.array([[0, 0, 10, 40], [0, 0, 10, 20], [50, 50, 60, 60]], np.float32)
+    scores = np.array([0.9, 0.8, 0.7], np.float32)
+    classes = np.zeros(3, np.int64)
+    kept, kept_scores, _ = suppress(boxes, scores, classes)
+    # The half box lies entirely inside the whole one (IoU only 0.5)
+    assert kept.tolist() == [[0, 0, 10, 40], [50, 50, 60, 60]]
+    assert np.allclose(kept_scores, [0.9, 0.7])
+
+
+def test_suppression_is_per_class():
+    boxes = np.array([[0, 0, 10, 10], [0, 0, 10, 10]], np.float32)
+    kept, _, _ = suppress(boxes, np.array([0.9, 0.8], np.float32), np.array([0, 1]))
+    assert len(kept) == 2
+
+
+def test_blank_tiles_never_reach_the_model():
+    model = FakeModel()
+    detector = TiledDetector(model, tile=64, overlap=0.0)
+    image = np.zeros((64, 128, 3), np.uint8)
+    image[:, 64:] = textured(64, 64)
+    result = detector.predict(image)[0]
+    assert (result.tiles, result.skipped) == (1, 1)
+    # Box offset into frame coordinates of the right-hand tile
+    assert result.boxes.xyxy.tolist() == [[74, 10, 84, 30]]
+
+
+def test_warmup_reaches_every_tile_model():
+    models = [FakeModel(), FakeModel()]
+    TiledDetector(models, tile=64).warmup()
+    assert [model.calls for model in models] == [[[(64, 64, 3)]], [[(64, 64, 3)]]]
+
+
+def test_background_model_warms_tiled_models(monkeypatch):
+    models = [FakeModel(), FakeModel()]
+    monkeypatch.setattr(detector_backends, 'load_detector', lambda **kwargs: TiledDetector(models, tile=64))
+    background = BackgroundModel()
+    background.start()
+    assert background.wait(5)
+    assert background.status() == 'ready'
+    assert all(model.calls for model in models)
+
+
+def test_plot_draws_the_merged_boxes_like_the_worker():
+    image = np.zeros((60, 80, 3), np.uint8)
+    boxes = np.array([[10, 10, 30, 40]], np.float32)
+    scores = np.array([0.8], np.float32)
+    result = TiledResult(image, boxes, scores, np.zeros(1, np.int64), 1, 0)
+    plotted = result.plot()
+    assert np.array_equal(plotted, draw_boxes(image.copy(), boxes, scores))
+    assert plotted.any() and not image.any()
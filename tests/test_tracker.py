@@ -0,0 +1,74 @@
+import numpy as np
+
+from tracker import Tracker, box_iou, greedy_match
+
+
+def box(x, y, size=20):
+    return [x, y, x + size, y + size]
+
+
+def step(tracker, boxes, scores, timestamp):
+    return tracker.update(np.array(boxes, np.float32).reshape(-1, 4), np.array(scores, np.float32),
+                          np.zeros(len(scores), np.int64), timestamp=timestamp)
+
+
+def test_box_iou_and_greedy_match():
+    a = np.array([box(0, 0), box(100, 100)], np.float32)
+    b = np.array([box(100, 100), box(10, 0)], np.float32)
+    iou = box_iou(a, b)
+    assert np.isclose(iou[0, 1], 200 / 600) and np.isclose(iou[1, 0], 1.0)
+    assert iou[0, 0] == 0
+    # Highest overlap first, each row and column used once
+    assert sorted(greedy_match(iou, 0.3)) == [(0, 1), (1, 0)]
+    assert greedy_match(iou, 0.5) == [(1, 0)]
+
+
+def test_track_is_confirmed_and_keeps_its_id_while_moving():
+    tracker = Tracker(min_hits=2)
+    ids, boxes, _, _ = step(tracker, [box(50, 50)], [0.9], 0.0)
+    # Tentative until its second detection
+    assert len(ids) == 0
+    for frame in range(1, 6):
+        ids, boxes, scores, _ = step(tracker, [box(50 + 4 * frame, 50)], [0.9], frame / 30)
+    assert ids.tolist() == [1]
+    assert abs(boxes[0, 0] - 70) < 3
+
+
+def test_prediction_follows_the_estimated_velocity():
+    tracker = Tracker(min_hits=1)
+    for frame in range(10):
+        step(tracker, [box(50 + 3 * frame, 50)], [0.9], frame / 30)
+    ids, boxes, _, _ = tracker.predict(10 / 30)
+    # 3 px per frame keeps going while the detector is skipped
+    assert abs(boxes[0, 0] - 80) < 3
+    assert tracker.confidence()[0] < 0.9
+
+
+def test_weak_detections_keep_tracks_but_do_not_start_them():
+    tracker = Tracker(min_hits=1, max_missed=1)
+    step(tracker, [box(50, 50)], [0.9], 0.0)
+    ids, _, _, _ = step(tracker, [box(51, 50), box(200, 200)], [0.2, 0.2], 1 / 30)
+    assert ids.tolist() == [1]
+    ids, _, _, _ = step(tracker, [box(52, 50)], [0.2], 2 / 30)
+    assert ids.tolist() == [1]
+    assert tracker.next_id == 2
+
+
+def test_unmatched_tracks_are_dropped_after_max_missed():
+    tracker = Tracker(min_hits=1, max_missed=2)
+    step(tracker, [box(50, 50)], [0.9], 0.0)
+    for frame in range(1, 3):
+        ids, _, _, _ = step(tracker, [], [], frame / 30)
+        assert ids.tolist() == [1]
+    ids, _, _, _ = step(tracker, [], [], 3 / 30)
+    assert len(ids) == 0
+
+
+def test_detector_runs_every_nth_frame():
+    tracker = Tracker(detect_every=3, min_hits=1)
+    step(tracker, [box(50, 50)], [0.9], 0.0)
+    tracker.predict(1 / 30)
+    assert not tracker.needs_detection()
+    tracker.predict(2 / 30)
+    # Frame 3 is the next detection round
+    assert tracker.needs_detection()
@@ -0,0 +1,143 @@
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from detection_worker import draw_boxes, to_numpy
+
+# Numpy stand-in for an ultralytics Boxes object (xyxy, conf, cls arrays)
+TiledBoxes = collections.namedtuple('TiledBoxes', ['xyxy', 'conf', 'cls'])
+
+
+def tile_origins(length, tile, step):
+    """Tile start offsets along one axis; the last tile is flush with the edge"""
+    if length <= tile:
+        return [0]
+    origins = list(range(0, length - tile, step))
+    return origins + [length - tile]
+
+
+def texture(tile, stride=4):
+    """Mean absolute gradient of a strided green-channel sample: ~0 on sky, water, bare field"""
+    sample = tile[::stride, ::stride]
+    if sample.ndim == 3:
+        sample = sample[..., 1]
+    sample = sample.astype(np.int16)
+    return (np.abs(np.diff(sample, axis=0)).mean() + np.abs(np.diff(sample, axis=1)).mean()) / 2
+
+
+def suppress(boxes, scores, classes, threshold=0.6):
+    """Class-aware NMS on intersection-over-smaller, so a person cut by a tile border
+    is merged with the whole box from the neighbouring tile"""
+    order = np.argsort(-scores)
+    boxes, scores, classes = boxes[order], scores[order], classes[order]
+    areas = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    keep = np.ones(len(boxes), bool)
+    for i in range(len(boxes)):
+        if not keep[i]:
+            continue
+        rest = np.flatnonzero(keep[i + 1:]) + i + 1
+        if not len(rest):
+            break
+        top_left = np.maximum(boxes[i, :2], boxes[rest, :2])
+        bottom_right = np.minimum(boxes[i, 2:], boxes[rest, 2:])
+        inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+        overlap = inter / (np.minimum(areas[i], areas[rest]) + 1e-9)
+        keep[rest[(overlap >= threshold) & (classes[rest] == classes[i])]] = False
+    return boxes[keep], scores[keep], classes[keep]
+
+
+# Merged detections for one frame; quacks like the ultralytics result the workers expect
+class TiledResult:
+    def __init__(self, image, boxes, scores, classes, tiles, skipped):
+        self.orig_img = image
+        self.boxes = TiledBoxes(boxes, scores, classes)
+        self.tiles = tiles
+        self.skipped = skipped
+
+    def __len__(self):
+        return len(self.boxes.xyxy)
+
+    def plot(self):
+        """Frame copy with the merged boxes drawn on it"""
+        return draw_boxes(self.orig_img.copy(), self.boxes.xyxy, self.boxes.conf)
+
+
+# Slices frames into overlapping tiles, skips featureless ones, infers the rest and merges.
+# Pass a list of model instances to spread tiles across threads (ultralytics predictors
+# are not safe to share between threads, so each worker needs its own).
+class TiledDetector:
+    def __init__(self, model, tile=640, overlap=0.2, min_texture=2.0, full_frame=False,
+                 merge_threshold=0.6):
+        self.models = list(model) if isinstance(model, (list, tuple)) else [model]
+        self.tile = tile
+        self.step = max(1, int(tile * (1 - overlap)))
+        # Tiles with less gradient than this are assumed empty and never reach the model
+        self.min_texture = min_texture
+        # Also run the downscaled whole frame, for people too large for one tile
+        self.full_frame = full_frame
+        self.workers = len(self.models)
+        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix='tile-infer') if self.workers > 1 else None
+        self.merge_threshold = merge_threshold
+
+    def tiles(self, image):
+        """(x, y, tile view) for every tile that passes the texture prefilter, plus the skip count"""
+        height, width = image.shape[:2]
+        kept, skipped = [], 0
+        for y in tile_origins(height, self.tile, self.step):
+            for x in tile_origins(width, self.tile, self.step):
+                view = image[y:y + self.tile, x:x + self.tile]
+                if texture(view) < self.min_texture:
+                    skipped += 1
+                    continue
+                kept.append((x, y, view))
+        return kept, skipped
+
+    def warmup(self, **kwargs):
+        """Run one blank tile through every model; a blank frame would fail the texture
+        prefilter and never reach them"""
+        kwargs.setdefault('verbose', False)
+        blank = np.zeros((self.tile, self.tile, 3), np.uint8)
+        if self.executor:
+            futures = [self.executor.submit(self._run, model, [blank], kwargs) for model in self.models]
+            for future in futures:
+                future.result()
+        else:
+            self._run(self.models[0], [blank], kwargs)
+
+    def _run(self, model, images, kwargs):
+        return model.predict(images, **kwargs) if images else []
+
+    def predict(self, source, **kwargs):
+        """Same call shape as model.predict for one frame or a list; returns TiledResults"""
+        kwargs.setdefault('verbose', False)
+        images = source if isinstance(source, list) else [source]
+        return [self.predict_one(image, kwargs) for image in images]
+
+    def predict_one(self, image, kwargs):
+        tiles, skipped = self.tiles(image)
+        crops = [view for _, _, view in tiles]
+        offsets = [(x, y) for x, y, _ in tiles]
+        if self.full_frame and len(tiles) + skipped > 1:
+            crops.append(image)
+            offsets.append((0, 0))
+
+        # One batched call, or the batch split across the worker pool
+        if self.executor and len(crops) > 1:
+            chunk = -(-len(crops) // self.workers)
+            futures = [
+                self.executor.submit(self._run, model, crops[i:i + chunk], kwargs)
+                for model, i in zip(self.models, range(0, len(crops), chunk))
+            ]
+            results = [result for future in futures for result in future.result()]
+        else:
+            results = self._run(self.models[0], crops, kwargs)
+
+        boxes, scores, classes = [np.zeros((0, 4), np.float32)], [np.zeros(0, np.float32)], [np.zeros(0, np.int64)]
+        for (x, y), result in zip(offsets, results):
+            if result.boxes is None or len(result.boxes) == 0:
+                continue
+            boxes.append(to_numpy(result.boxes.xyxy).astype(np.float32) + np.float32([x, y, x, y]))
+            scores.append(to_numpy(result.boxes.conf).astype(np.float32))
+            classes.append(to_numpy(result.boxes.cls).astype(np.int64))
+        merged = suppress(np.concatenate(boxes), np.concatenate(scores), np.concatenate(classes), self.merge_threshold)
+        return TiledResult(image, *merged, tiles=len(tiles), skipped=skipped)
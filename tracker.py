@@ -0,0 +1,219 @@
+import time
+import numpy as np
+import cv2
+
+# Kalman noise as a fraction of box size (as in SORT/ByteTrack)
+STD_POSITION = 1.0 / 20
+STD_VELOCITY = 1.0 / 160
+# Noise is specified per nominal capture frame; longer gaps scale it up
+NOMINAL_DT = 1.0 / 30
+
+
+def box_iou(a, b):
+    """Pairwise IoU of two (N, 4) / (M, 4) xyxy box arrays"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def greedy_match(iou, threshold):
+    """One-to-one (row, col) pairs, highest IoU first, ignoring pairs below threshold"""
+    iou = iou.copy()
+    pairs = []
+    while iou.size and iou.max() >= threshold:
+        row, col = np.unravel_index(iou.argmax(), iou.shape)
+        pairs.append((row, col))
+        iou[row, :] = 0
+        iou[:, col] = 0
+    return pairs
+
+
+def xyxy_to_cxcywh(boxes):
+    size = boxes[:, 2:] - boxes[:, :2]
+    return np.concatenate([boxes[:, :2] + size / 2, size], axis=1)
+
+
+def cxcywh_to_xyxy(boxes):
+    half = boxes[:, 2:] / 2
+    return np.concatenate([boxes[:, :2] - half, boxes[:, :2] + half], axis=1)
+
+
+def box_noise(sizes, position, velocity):
+    """Per-track diagonal noise [x, y, w, h, vx, vy, vw, vh] scaled by box width/height"""
+    w, h = sizes[:, 0:1], sizes[:, 1:2]
+    # Velocity noise is given per nominal frame; the state holds pixels per second
+    velocity = velocity / NOMINAL_DT
+    std = np.concatenate([position * w, position * h, position * w, position * h,
+                          velocity * w, velocity * h, velocity * w, velocity * h], axis=1)
+    return std ** 2
+
+
+def draw_tracks(image, boxes, track_ids, scores=None):
+    """Draw tracked boxes with their IDs onto an RGB image in place"""
+    for index, (box, track_id) in enumerate(zip(boxes.astype(int), track_ids)):
+        x1, y1, x2, y2 = box
+        cv2.rectangle(image, (x1, y1), (x2, y2), (255, 64, 64), 2)
+        label = f"#{track_id}" if scores is None else f"#{track_id} {scores[index]:.2f}"
+        cv2.putText(image, label, (x1, max(y1 - 4, 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 64, 64), 1)
+    return image
+
+
+# Constant-velocity Kalman tracker with ByteTrack-style two-stage IoU association,
+# vectorised over all tracks: it can predict on every frame while detections arrive every Nth
+class Tracker:
+    def __init__(self, detect_every=5, high_threshold=0.5, low_threshold=0.1, iou_threshold=0.3,
+                 low_iou_threshold=0.5, min_hits=2, max_missed=3, refresh_confidence=0.35,
+                 confidence_decay=0.97):
+        self.detect_every = detect_every
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.iou_threshold = iou_threshold
+        self.low_iou_threshold = low_iou_threshold
+        # Detection rounds a new track needs before it is shown
+        self.min_hits = min_hits
+        # Detection rounds a track may go unmatched before it is dropped
+        self.max_missed = max_missed
+        # A confirmed track below this confidence asks for an early detection
+        self.refresh_confidence = refresh_confidence
+        self.confidence_decay = confidence_decay
+
+        self.next_id = 1
+        self.ids = np.zeros(0, np.int64)
+        self.mean = np.zeros((0, 8))
+        self.cov = np.zeros((0, 8, 8))
+        self.score = np.zeros(0)
+        self.cls = np.zeros(0, np.int64)
+        self.hits = np.zeros(0, np.int64)
+        self.missed = np.zeros(0, np.int64)
+        # Frames predicted since the track was last matched to a detection
+        self.coasted = np.zeros(0, np.int64)
+        self.frames_since_detection = 0
+        self.last_time = None
+
+    def _advance(self, timestamp):
+        """Kalman predict step for every track up to `timestamp`"""
+        timestamp = time.time() if timestamp is None else timestamp
+        dt = NOMINAL_DT if self.last_time is None else max(timestamp - self.last_time, 1e-3)
+        self.last_time = timestamp
+        if not len(self.ids):
+            return
+        transition = np.eye(8)
+        transition[:4, 4:] = dt * np.eye(4)
+        noise = box_noise(self.mean[:, 2:4], STD_POSITION, STD_VELOCITY) * (dt / NOMINAL_DT)
+        self.mean = self.mean @ transition.T
+        self.cov = transition @ self.cov @ transition.T
+        self.cov[:, np.arange(8), np.arange(8)] += noise
+        # Boxes cannot shrink through zero while coasting
+        self.mean[:, 2:4] = np.maximum(self.mean[:, 2:4], 1.0)
+
+    def _correct(self, rows, boxes):
+        """Kalman update of the given tracks with measured xyxy boxes"""
+        measured = xyxy_to_cxcywh(boxes)
+        mean, cov = self.mean[rows], self.cov[rows]
+        noise = box_noise(mean[:, 2:4], STD_POSITION, STD_VELOCITY)[:, :4]
+        innovation_cov = cov[:, :4, :4].copy()
+        innovation_cov[:, np.arange(4), np.arange(4)] += noise
+        # gain = P H^T S^-1 with H selecting the first four states
+        gain = cov[:, :, :4] @ np.linalg.inv(innovation_cov)
+        self.mean[rows] = mean + np.einsum('nij,nj->ni', gain, measured - mean[:, :4])
+        self.cov[rows] = cov - gain @ cov[:, :4, :]
+
+    def _spawn(self, boxes, scores, classes):
+        count = len(boxes)
+        if not count:
+            return
+        mean = np.zeros((count, 8))
+        mean[:, :4] = xyxy_to_cxcywh(boxes)
+        cov = np.zeros((count, 8, 8))
+        variance = box_noise(mean[:, 2:4], 2 * STD_POSITION, 10 * STD_VELOCITY)
+        cov[:, np.arange(8), np.arange(8)] = variance
+        self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + count)])
+        self.next_id += count
+        self.mean = np.concatenate([self.mean, mean])
+        self.cov = np.concatenate([self.cov, cov])
+        self.score = np.concatenate([self.score, scores])
+        self.cls = np.concatenate([self.cls, classes])
+        self.hits = np.concatenate([self.hits, np.ones(count, np.int64)])
+        self.missed = np.concatenate([self.missed, np.zeros(count, np.int64)])
+        self.coasted = np.concatenate([self.coasted, np.zeros(count, np.int64)])
+
+    def _keep(self, mask):
+        for name in ('ids', 'mean', 'cov', 'score', 'cls', 'hits', 'missed', 'coasted'):
+            setattr(self, name, getattr(self, name)[mask])
+
+    def confidence(self):
+        """Per-track confidence: last detector score, decayed while coasting"""
+        return self.score * self.confidence_decay ** self.coasted
+
+    def needs_detection(self):
+        """True when the detector should run on the next frame"""
+        if self.frames_since_detection + 1 >= self.detect_every:
+            return True
+        # Only tracks that faded while coasting count; ones that were weak to begin with
+        # wait for the regular refresh
+        faded = (self.confidence() < self.refresh_confidence) & (self.score >= self.refresh_confidence)
+        return bool(np.any(faded & (self.hits >= self.min_hits)))
+
+    def predict(self, timestamp=None):
+        """Track-only step for a frame the detector skipped"""
+        self._advance(timestamp)
+        self.frames_since_detection += 1
+        self.coasted += 1
+        return self.tracks()
+
+    def update(self, boxes, scores, classes, timestamp=None):
+        """Predict, then associate a frame's detections (xyxy, score, class) with the tracks"""
+        self._advance(timestamp)
+        self.frames_since_detection = 0
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float64)
+        classes = np.asarray(classes, dtype=np.int64)
+
+        high = scores >= self.high_threshold
+        low = ~high & (scores >= self.low_threshold)
+        predicted = cxcywh_to_xyxy(self.mean[:, :4])
+        matched_tracks, matched_high = [], []
+
+        # First pass: confident detections against every track
+        high_index = np.flatnonzero(high)
+        for row, col in greedy_match(box_iou(predicted, boxes[high_index]), self.iou_threshold):
+            matched_tracks.append(row)
+            matched_high.append(high_index[col])
+
+        # Second pass: weak detections only rescue tracks the first pass left unmatched
+        remaining = np.setdiff1d(np.arange(len(self.ids)), matched_tracks)
+        low_index = np.flatnonzero(low)
+        for row, col in greedy_match(box_iou(predicted[remaining], boxes[low_index]), self.low_iou_threshold):
+            matched_tracks.append(remaining[row])
+            matched_high.append(low_index[col])
+
+        rows = np.asarray(matched_tracks, dtype=np.int64)
+        detections = np.asarray(matched_high, dtype=np.int64)
+        if len(rows):
+            self._correct(rows, boxes[detections])
+            self.score[rows] = scores[detections]
+            self.hits[rows] += 1
+            self.missed[rows] = 0
+            self.coasted[rows] = 0
+
+        unmatched = np.ones(len(self.ids), bool)
+        unmatched[rows] = False
+        self.missed[unmatched] += 1
+        self.coasted[unmatched] += 1
+        self._keep(self.missed <= self.max_missed)
+
+        # Unclaimed confident detections start new tracks
+        spawn = np.setdiff1d(high_index, detections)
+        self._spawn(boxes[spawn], scores[spawn], classes[spawn])
+        return self.tracks()
+
+    def tracks(self):
+        """Confirmed tracks as (ids, xyxy boxes, confidences, classes)"""
+        confirmed = self.hits >= self.min_hits
+        ids = self.ids[confirmed]
+        boxes = cxcywh_to_xyxy(self.mean[confirmed, :4]).astype(np.float32)
+        confidence = self.confidence()[confirmed].astype(np.float32)
+        return ids, boxes, confidence, self.cls[confirmed]
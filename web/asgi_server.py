@@ -0,0 +1,163 @@
+"""Async server for the dashboard: same routes as server.py without a thread per viewer,
+plus /ws/video pushing binary frames over a WebSocket.
+
+Every /video_feed stream is a coroutine reading one shared AsyncFrameFeed, so hundreds of
+viewers cost one capture loop and a few sockets. Plain ASGI, no framework:
+
+    uvicorn web.asgi_server:app --host 0.0.0.0 --port 5000
+    python web/asgi_server.py
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Shared modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frame_broadcast import AsyncFrameFeed, AsyncSubscriber, FrameBroadcaster
+from encode_ladder import encode_ladder
+from frame_push import query_value, websocket_feed
+from pipeline_latency import pipeline_latency
+
+WEB_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Path -> (file in web/, content type); nothing else is served from disk
+STATIC_FILES = {
+    '/': ('index.html', b'text/html; charset=utf-8'),
+    '/index.html': ('index.html', b'text/html; charset=utf-8'),
+    '/script.js': ('script.js', b'application/javascript; charset=utf-8'),
+    '/styles.css': ('styles.css', b'text/css; charset=utf-8'),
+}
+
+# One capture loop shared by every viewer, as in server.py
+broadcaster = FrameBroadcaster(camera_name="0", ladder=encode_ladder)  # Assuming camera 0
+feed = None
+static_cache = {}
+
+
+def frame_feed():
+    """This event loop's view of the broadcaster, created on first use"""
+    global feed
+    if feed is None:
+        feed = AsyncFrameFeed(broadcaster)
+    return feed
+
+
+async def send_response(send, status, body, content_type):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, value):
+    await send_response(send, 200, json.dumps(value).encode(), b'application/json')
+
+
+async def send_static(send, path):
+    """Serve one whitelisted file from web/, read from disk once"""
+    name, content_type = STATIC_FILES[path]
+    body = static_cache.get(name)
+    if body is None:
+        with open(os.path.join(WEB_DIR, name), 'rb') as f:
+            body = static_cache[name] = f.read()
+    await send_response(send, 200, body, content_type)
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def video_feed(scope, receive, send):
+    """MJPEG stream for one viewer; ?fps=N caps its rate, ?rung=N pins its quality"""
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'multipart/x-mixed-replace; boundary=frame'),
+            (b'cache-control', b'no-cache'),
+        ],
+    })
+    shared = frame_feed()
+    subscriber = AsyncSubscriber(shared, query_value(scope, 'fps'), timeout=1.0, rung=query_value(scope, 'rung', int))
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    next_frame = None
+    broadcaster.add_subscriber(subscriber)
+    try:
+        while True:
+            # Race the next frame against the client leaving, so a stalled simulator
+            # can't keep a gone viewer subscribed
+            next_frame = asyncio.ensure_future(subscriber.next_frame())
+            await asyncio.wait({next_frame, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                break
+            frame = next_frame.result()
+            if frame is None:
+                continue
+            started = time.monotonic()
+            await send({'type': 'http.response.body', 'body': frame[2], 'more_body': True})
+            subscriber.record_send(len(frame[2]), time.monotonic() - started)
+    except (OSError, asyncio.CancelledError):
+        pass
+    finally:
+        broadcaster.remove_subscriber(subscriber)
+        disconnected.cancel()
+        if next_frame is not None:
+            next_frame.cancel()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            frame_feed()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            # stop() joins the capture thread; keep the loop free meanwhile
+            await asyncio.get_running_loop().run_in_executor(None, broadcaster.stop)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] == 'websocket':
+        if scope['path'] == '/ws/video':
+            # Binary frames pushed as they arrive, acked by the client
+            await websocket_feed(frame_feed(), scope, receive, send)
+        else:
+            await send({'type': 'websocket.close', 'code': 1008})
+        return
+    if scope['type'] != 'http':
+        return
+    path = scope['path']
+    if scope['method'] not in ('GET', 'HEAD'):
+        await send_response(send, 405, b'Method Not Allowed', b'text/plain')
+    elif path == '/video_feed':
+        await video_feed(scope, receive, send)
+    elif path == '/latency':
+        # Per-stage latency histograms for this process, machine-readable
+        await send_json(send, pipeline_latency.snapshot(histograms=True))
+    elif path == '/stream_stats':
+        await send_json(send, broadcaster.stats())
+    elif path in STATIC_FILES:
+        await send_static(send, path)
+    else:
+        await send_response(send, 404, b'Not Found', b'text/plain')
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        print("Error: the async server needs uvicorn (pip install uvicorn)")
+        sys.exit(1)
+    uvicorn.run(app, host='127.0.0.1', port=5000, log_level='warning')
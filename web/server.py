@@ -1,32 +1,40 @@
-import airsim
-import time
-import base64
-from flask import Flask, render_template, Response
+import os
+import sys
+from flask import Flask, render_template, Response, jsonify, request
+
+# Shared modules live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from encode_ladder import encode_ladder
+from frame_broadcast import FrameBroadcaster
+from pipeline_latency import pipeline_latency
 
 app = Flask(__name__)
 
-# Connect to the AirSim simulator
-client = airsim.MultirotorClient()
-client.confirmConnection()
-
-def gen():
-    while True:
-        # Capture the image from the drone's camera
-        response = client.simGetImage("0", airsim.ImageType.Scene)  # Assuming camera 0
-        if response:
-            # Convert image to base64 encoding
-            img_str = base64.b64encode(response).decode('utf-8')
-            # Convert base64 back to image and send it as a MJPEG stream
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + base64.b64decode(img_str) + b'\r\n')
+# One capture loop shared by every viewer; it connects to AirSim on its own thread
+# when the first viewer arrives and idles when the last one leaves. Slow viewers get
+# smaller rungs of the shared encode ladder.
+broadcaster = FrameBroadcaster(camera_name="0", ladder=encode_ladder)  # Assuming camera 0
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/latency')
+def latency():
+    # Per-stage latency histograms for this process, machine-readable
+    return jsonify(pipeline_latency.snapshot(histograms=True))
+
+@app.route('/stream_stats')
+def stream_stats():
+    # Viewers on the shared feed and how many frames each one skipped
+    return jsonify(broadcaster.stats())
+
 @app.route('/video_feed')
 def video_feed():
-    return Response(gen(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    # ?fps=N caps this viewer's rate, ?rung=N pins its quality (0 = full size)
+    max_fps = request.args.get('fps', type=float)
+    rung = request.args.get('rung', type=int)
+    return Response(broadcaster.subscribe(max_fps, rung=rung), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 if __name__ == '__main__':
     app.run(debug=True, threaded=True)